@@ -0,0 +1,160 @@
+"""
+运维命令行
+
+    python -m app.cli migrate [--dry-run] [--baseline 0011]
+    python -m app.cli migrate status
+    python -m app.cli check-plans [--strict]
+    python -m app.cli export [--out data/exports] [--start-date 2025-01-01] [--end-date 2025-01-31] [--incremental]
+    python -m app.cli partitions list
+    python -m app.cli partitions ensure [--months-ahead 3]
+    python -m app.cli partitions detach [--retain-months 24] [--archive-schema archive | --drop] [--dry-run]
+
+建议由定时任务每天执行一次 `partitions ensure`，保证写入时目标月分区已存在（否则落入默认分区）。
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import date
+
+from app.config import settings
+from app.db import engine, read_engine
+
+
+async def _partitions(args: argparse.Namespace) -> int:
+    from app.services.partition_service import list_partitions, ensure_partitions, detach_old_partitions
+
+    if args.action == "list":
+        for parent, months in (await list_partitions()).items():
+            span = f"{months[0]:%Y-%m} ~ {months[-1]:%Y-%m}" if months else "-"
+            print(f"{parent:<16} {len(months):>4} 个月分区  {span}")
+        return 0
+
+    if args.action == "ensure":
+        created = await ensure_partitions(args.months_ahead)
+        print(f"新建 {len(created)} 个分区" + (f"：{', '.join(created)}" if created else ""))
+        return 0
+
+    retain_months = args.retain_months or settings.PARTITION_RETAIN_MONTHS
+    if retain_months < 1:
+        print("未设置保留月数（--retain-months 或 PARTITION_RETAIN_MONTHS），不分离任何分区")
+        return 1
+
+    archive_schema = None if args.drop else args.archive_schema
+    months = await detach_old_partitions(retain_months, archive_schema, dry_run=args.dry_run)
+    target = "删除" if archive_schema is None else f"归档到 schema {archive_schema}"
+    prefix = "[dry-run] 将" if args.dry_run else "已"
+    print(f"{prefix}{target}的月份：{', '.join(f'{m:%Y-%m}' for m in months) or '无'}")
+    return 0
+
+
+def _migration_version(value: str) -> str:
+    from app.services.migration_service import parse_migration_version
+
+    try:
+        return f"{parse_migration_version(value):04d}"
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+async def _migrate(args: argparse.Namespace) -> int:
+    from app.services.migration_service import migrate, migration_status
+
+    if args.action == "status":
+        rows = await migration_status()
+        for r in rows:
+            applied_at = f"{r['applied_at']:%Y-%m-%d %H:%M:%S}" if r["applied_at"] else ""
+            print(f"{r['version']}  {r['status']:<8}  {applied_at:<19}  {r['name']}")
+        return 1 if any(r["status"] == "modified" for r in rows) else 0
+
+    versions = await migrate(baseline=args.baseline, dry_run=args.dry_run)
+    prefix = "[dry-run] 将执行" if args.dry_run else "已执行"
+    print(f"{prefix} {len(versions)} 个迁移" + (f"：{', '.join(versions)}" if versions else ""))
+    return 0
+
+
+async def _check_plans(args: argparse.Namespace) -> int:
+    from app.services.plan_check_service import check_plans
+
+    checked, problems = await check_plans(strict=args.strict)
+    for p in problems:
+        if p["kind"] == "missing":
+            print(f"[{p['scenario']}] 期望的语句未执行，未能检查：{p['statement']}\n")
+        else:
+            print(f"[{p['scenario']}] Seq Scan on {', '.join(p['relations'])}:\n  {p['statement']}\n")
+    seq_scans = sum(p["kind"] == "seq_scan" for p in problems)
+    print(f"检查了 {checked} 条语句，{seq_scans} 条存在大表顺序扫描，{len(problems) - seq_scans} 个场景未捕获到期望的语句")
+    return 1 if problems else 0
+
+
+async def _export(args: argparse.Namespace) -> int:
+    from app.services.export_service import ParquetExport
+
+    export = ParquetExport(
+        args.out,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        tables=args.tables,
+        incremental=args.incremental,
+        batch_size=args.batch_size,
+    )
+    while await export.step():
+        print(f"\r已导出 {sum(export.rows.values())} 行", end="", flush=True)
+    summary = "，".join(f"{t} {n} 行" for t, n in export.rows.items()) or "无变更"
+    print(f"\r导出完成 {export.run_id}：{summary}")
+    return 0
+
+
+async def _run(args: argparse.Namespace) -> int:
+    try:
+        return await args.handler(args)
+    finally:
+        await engine.dispose()
+        if read_engine is not engine:
+            await read_engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="news-analytics 运维命令")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="按顺序执行 migrations/ 下尚未执行的迁移")
+    migrate.set_defaults(handler=_migrate)
+    migrate.add_argument("action", nargs="?", choices=["up", "status"], default="up")
+    migrate.add_argument("--baseline", type=_migration_version, help="把编号不大于该值的迁移标记为已执行（此前手工执行过迁移的库）")
+    migrate.add_argument("--dry-run", action="store_true")
+
+    check = commands.add_parser(
+        "check-plans", help="EXPLAIN 各 DAO 语句，大表出现顺序扫描或期望的语句未执行时以非零状态退出"
+    )
+    check.set_defaults(handler=_check_plans)
+    check.add_argument("--strict", action="store_true", help="依赖数据的场景（如向量近邻）未执行时也视为失败")
+
+    export = commands.add_parser("export", help="导出 news_item / news_keywords 到 Parquet（按月分目录）")
+    export.set_defaults(handler=_export)
+    export.add_argument("--out", default=settings.EXPORT_DIR, help="输出目录，默认 EXPORT_DIR")
+    export.add_argument("--start-date", type=date.fromisoformat, help="published_at 下界（含）")
+    export.add_argument("--end-date", type=date.fromisoformat, help="published_at 上界（含）")
+    export.add_argument("--tables", nargs="+", choices=["news_item", "news_keywords"])
+    export.add_argument("--incremental", action="store_true", help="从输出目录中记录的水位线继续，只导出之后变更的行")
+    export.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+
+    partitions = commands.add_parser("partitions", help="news_item / news_keywords 月分区维护")
+    partitions.set_defaults(handler=_partitions)
+    actions = partitions.add_subparsers(dest="action", required=True)
+    actions.add_parser("list", help="列出已挂载的月分区")
+    ensure = actions.add_parser("ensure", help="创建当月及未来月份的分区")
+    ensure.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    detach = actions.add_parser("detach", help="分离早于保留期的分区")
+    detach.add_argument("--retain-months", type=int, help="保留的月份数（含当月），默认 PARTITION_RETAIN_MONTHS")
+    detach.add_argument("--archive-schema", default=settings.PARTITION_ARCHIVE_SCHEMA)
+    detach.add_argument("--drop", action="store_true", help="直接删除分离的分区，不归档")
+    detach.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import logging
+import uuid
+
+from sqlalchemy import Table, select, table, column, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _dedupe(rows: list[dict], index_elements: list[str]) -> list[dict]:
+    """
+     按冲突键去重，保留最后一条（同一条 INSERT ... ON CONFLICT 不能两次更新同一行）
+    """
+    seen = {}
+    for row in rows:
+        seen[tuple(row.get(c) for c in index_elements)] = row
+    return list(seen.values())
+
+
+def _upsert_stmt(target: Table, source, columns: list[str], index_elements: list[str], set_: dict):
+    """
+     构建 INSERT ... ON CONFLICT DO UPDATE，source 为 None 时用于 executemany
+    """
+    stmt = insert(target)
+    if source is not None:
+        stmt = stmt.from_select(columns, select(*[source.c[c] for c in columns]))
+
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            c: literal_column(f"excluded.{c}") if v is None else v
+            for c, v in set_.items()
+        },
+    )
+
+
+async def _asyncpg_connection(session):
+    """取底层 asyncpg 连接，非 asyncpg 驱动时返回 None"""
+    conn = await session.connection()
+    raw = await conn.get_raw_connection()
+    driver_conn = raw.driver_connection
+    return driver_conn if hasattr(driver_conn, "copy_records_to_table") else None
+
+
+async def _copy_upsert(session, driver_conn, target: Table, rows: list[dict], columns: list[str],
+                       index_elements: list[str], set_: dict) -> None:
+    """
+     COPY 到临时表，再用一条 INSERT ... SELECT ... ON CONFLICT 合并到目标表
+    临时表 ON COMMIT DROP，必须在调用方事务中执行
+    """
+    stage_name = f"_stage_{target.name}_{uuid.uuid4().hex[:8]}"
+    column_list = ", ".join(columns)
+
+    # 通过 session 执行 DDL，确保底层事务已开启，COPY 与合并处于同一事务
+    await session.execute(text(
+        f"CREATE TEMP TABLE {stage_name} ON COMMIT DROP AS "
+        f"SELECT {column_list} FROM {target.name} WITH NO DATA"
+    ))
+
+    await driver_conn.copy_records_to_table(
+        stage_name,
+        records=[tuple(row.get(c) for c in columns) for row in rows],
+        columns=columns,
+    )
+
+    stage = table(stage_name, *[column(c) for c in columns])
+    await session.execute(_upsert_stmt(target, stage, columns, index_elements, set_))
+
+
+async def bulk_upsert(session, target: Table, rows: list[dict], index_elements: list[str],
+                      set_: dict) -> None:
+    """
+     批量 upsert
+    - 行数 >= BULK_COPY_THRESHOLD 且驱动为 asyncpg：COPY 到临时表后一次性合并
+    - 否则：同一条预编译语句按 BULK_INSERT_CHUNK_SIZE 分块 executemany，
+      不会触发 32767 参数上限，也不会每次都编译一条巨大的 SQL
+    :param session: 调用方事务中的 session
+    :param target: 目标表
+    :param rows: 待写入的行（只写入目标表中存在的列）
+    :param index_elements: 冲突键
+    :param set_: 冲突时更新的列，值为 None 表示取 excluded 中的同名列，否则为自定义表达式
+    :return:
+    """
+    if not rows:
+        return
+
+    rows = _dedupe(rows, index_elements)
+    columns = [c for c in dict.fromkeys(k for row in rows for k in row) if c in target.c]
+
+    if len(rows) >= settings.BULK_COPY_THRESHOLD:
+        driver_conn = await _asyncpg_connection(session)
+        if driver_conn is not None:
+            await _copy_upsert(session, driver_conn, target, rows, columns, index_elements, set_)
+            return
+        logger.debug("COPY not supported by driver, falling back to chunked upsert.")
+
+    stmt = _upsert_stmt(target, None, columns, index_elements, set_)
+    chunk_size = settings.BULK_INSERT_CHUNK_SIZE
+    for i in range(0, len(rows), chunk_size):
+        chunk = [{c: row.get(c) for c in columns} for row in rows[i:i + chunk_size]]
+        await session.execute(stmt, chunk)
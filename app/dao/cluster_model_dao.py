@@ -0,0 +1,111 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import cluster_model_state, cluster_model_pending
+
+
+async def lock_cluster_model_state(session, cluster_method: str) -> dict:
+    """
+     在调用方事务中锁定模型状态行（不存在时先创建），并发写入新闻items的事务在此串行，直到提交或回滚
+    只读取版本信息，质心由 fetch_cluster_model_centers 按需读取
+    :param session:
+    :param cluster_method:
+    :return: {"version", "revision", "fitted"}
+    """
+    await session.execute(
+        insert(cluster_model_state)
+        .values(cluster_method=cluster_method)
+        .on_conflict_do_nothing(index_elements=["cluster_method"])
+    )
+    s = cluster_model_state.c
+    row = (await session.execute(
+        select(s.version, s.revision, s.centers.is_not(None).label("fitted"))
+        .where(s.cluster_method == cluster_method)
+        .with_for_update()
+    )).one()
+    return {"version": row.version, "revision": row.revision, "fitted": row.fitted}
+
+
+async def fetch_cluster_model_centers(session, cluster_method: str) -> tuple[bytes, list[int]]:
+    """
+     读取质心矩阵（float32 字节）与各簇累计样本数
+    :return: (centers, counts)
+    """
+    s = cluster_model_state.c
+    row = (await session.execute(
+        select(s.centers, s.counts).where(s.cluster_method == cluster_method)
+    )).one()
+    return row.centers, row.counts
+
+
+async def save_cluster_model_state(session, cluster_method: str, centers: bytes, counts: list[int]) -> str:
+    """
+     在调用方事务中写入模型状态（须先 lock_cluster_model_state），版本号加一
+    :return: 新的 revision
+    """
+    revision = str(uuid.uuid4())
+    await session.execute(
+        update(cluster_model_state)
+        .where(cluster_model_state.c.cluster_method == cluster_method)
+        .values(
+            centers=centers,
+            counts=counts,
+            version=cluster_model_state.c.version + 1,
+            revision=revision,
+            updated_at=func.current_timestamp(),
+        )
+    )
+    return revision
+
+
+async def add_cluster_model_pending(session, cluster_method: str, items: list[dict]) -> None:
+    """
+     在调用方事务中把预热阶段的新闻加入缓冲区；同一条新闻（重试、重新提取）只登记一次
+    :param items: [{"item_id", "published_at", "title", "url", "title_tokens"}]
+    """
+    if not items:
+        return
+
+    rows = {
+        (item["item_id"], item["published_at"]): {
+            "cluster_method": cluster_method,
+            "item_id": item["item_id"],
+            "published_at": item["published_at"],
+            "title": item.get("title"),
+            "url": item.get("url"),
+            "title_tokens": item["title_tokens"],
+        }
+        for item in items
+    }
+    stmt = insert(cluster_model_pending).on_conflict_do_nothing(
+        index_elements=["cluster_method", "item_id", "published_at"]
+    )
+    await session.execute(stmt, list(rows.values()))
+
+
+async def fetch_cluster_model_pending(session, cluster_method: str) -> list[dict]:
+    """预热缓冲区中的全部新闻（不超过 n_clusters 条）"""
+    p = cluster_model_pending.c
+    rows = await session.execute(
+        select(p.item_id, p.published_at, p.title, p.url, p.title_tokens)
+        .where(p.cluster_method == cluster_method)
+        .order_by(p.created_at, p.item_id)
+    )
+    return [dict(r) for r in rows.mappings()]
+
+
+async def delete_cluster_model_pending(session, cluster_method: str) -> None:
+    """首次拟合后清空预热缓冲区"""
+    await session.execute(
+        delete(cluster_model_pending).where(cluster_model_pending.c.cluster_method == cluster_method)
+    )
+
+
+async def delete_cluster_model_pending_before(session, before: date) -> None:
+    """归档分区时删除预热缓冲区中 published_at 早于 before 的新闻（所在分区已分离，不再补分配）"""
+    await session.execute(
+        delete(cluster_model_pending).where(cluster_model_pending.c.published_at < before)
+    )
@@ -0,0 +1,322 @@
+import json
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import select, case, delete, func, literal_column, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db import AsyncReadSessionLocal
+from app.models import news_cluster_summary, news_item
+
+# 摘要中保留的标题高频词数量
+TOP_KEYWORDS_LIMIT = 50
+
+# 合并已有与本批次的词频，保留前 TOP_KEYWORDS_LIMIT 个
+_MERGE_TOP_KEYWORDS = literal_column(f"""(
+    SELECT coalesce(jsonb_object_agg(k, n), '{{}}'::jsonb)
+    FROM (
+        SELECT k, sum(v::bigint) AS n
+        FROM (
+            SELECT * FROM jsonb_each_text(news_cluster_summary.top_keywords)
+            UNION ALL
+            SELECT * FROM jsonb_each_text(excluded.top_keywords)
+        ) AS kv(k, v)
+        GROUP BY k
+        ORDER BY n DESC
+        LIMIT {TOP_KEYWORDS_LIMIT}
+    ) AS merged
+)""")
+
+
+# 从簇摘要中减去移出的新闻：大小、词频（只保留前 TOP_KEYWORDS_LIMIT 个，移出的词不在其中时无法扣减），
+# 移出的是代表新闻时清空代表，之后分配进来的第一条新闻成为新的代表
+_REMOVE_FROM_SUMMARY = text("""
+UPDATE news_cluster_summary
+SET size = greatest(size - :removed, 0),
+    top_keywords = (
+        SELECT coalesce(jsonb_object_agg(k, n), '{}'::jsonb)
+        FROM (
+            SELECT k, v::bigint - coalesce((CAST(:removed_keywords AS jsonb) ->> k)::bigint, 0) AS n
+            FROM jsonb_each_text(news_cluster_summary.top_keywords) AS kv(k, v)
+        ) AS remaining
+        WHERE n > 0
+    ),
+    representative_item_id = CASE WHEN representative_item_id = ANY(:removed_item_ids)
+                                  THEN NULL ELSE representative_item_id END,
+    representative_title = CASE WHEN representative_item_id = ANY(:removed_item_ids)
+                                THEN NULL ELSE representative_title END,
+    representative_url = CASE WHEN representative_item_id = ANY(:removed_item_ids)
+                              THEN NULL ELSE representative_url END,
+    representative_distance = CASE WHEN representative_item_id = ANY(:removed_item_ids)
+                                   THEN NULL ELSE representative_distance END,
+    updated_at = CURRENT_TIMESTAMP
+WHERE cluster_method = :cluster_method AND cluster_id = :cluster_id
+""")
+
+
+async def fetch_news_item_clusters(session, items: list[dict]) -> dict[tuple, tuple[str | None, int | None]]:
+    """本批新闻在库中已有的簇分配（走 uq_news_date），新新闻不在结果中"""
+    keys = list({(item["item_id"], item["published_at"]) for item in items if item.get("published_at")})
+    if not keys:
+        return {}
+
+    stmt = select(
+        news_item.c.item_id, news_item.c.published_at, news_item.c.cluster_method, news_item.c.cluster_id,
+    ).where(tuple_(news_item.c.item_id, news_item.c.published_at).in_(keys))
+    rows = (await session.execute(stmt)).all()
+    return {(r.item_id, r.published_at): (r.cluster_method, r.cluster_id) for r in rows}
+
+
+def _removals(items: list[dict], previous: dict[tuple, tuple[str | None, int | None]]) -> list[dict]:
+    """
+     重新写入且簇分配发生变化的新闻，按原簇汇总成要扣减的量
+    原标题的分词结果不可得，词频按本次标题扣减（同一 item 的标题通常不变）
+    """
+    removed = []
+    for item in items:
+        old_method, old_id = previous.get((item["item_id"], item.get("published_at")), (None, None))
+        if old_id is None or (old_method, old_id) == (item.get("cluster_method"), item.get("cluster_id")):
+            continue
+        removed.append({**item, "cluster_method": old_method, "cluster_id": old_id})
+    return _removal_rows(removed)
+
+
+def _removal_rows(items: list[dict]) -> list[dict]:
+    """把要移出的新闻按 (cluster_method, cluster_id) 汇总成 _REMOVE_FROM_SUMMARY 的参数"""
+    groups: dict[tuple[str, int], dict] = {}
+    for item in items:
+        key = (item["cluster_method"], item["cluster_id"])
+        group = groups.setdefault(key, {
+            "cluster_method": key[0],
+            "cluster_id": key[1],
+            "removed": 0,
+            "keywords": Counter(),
+            "removed_item_ids": [],
+        })
+        group["removed"] += 1
+        group["keywords"].update(item.get("title_tokens") or [])
+        group["removed_item_ids"].append(item["item_id"])
+
+    return [
+        {
+            "cluster_method": group["cluster_method"],
+            "cluster_id": group["cluster_id"],
+            "removed": group["removed"],
+            "removed_keywords": json.dumps(group["keywords"], ensure_ascii=False),
+            "removed_item_ids": group["removed_item_ids"],
+        }
+        for _, group in sorted(groups.items())
+    ]
+
+
+def _batch_summaries(items: list[dict]) -> list[dict]:
+    """
+     将本批次的新闻items按 (cluster_method, cluster_id) 汇总成摘要增量
+    只处理带 cluster_distance 的在线聚类结果（批量重拟合的 cluster_id 跨批次无意义）
+    """
+    groups: dict[tuple[str, int], dict] = {}
+    keywords: dict[tuple[str, int], Counter] = {}
+
+    for item in items:
+        if item.get("cluster_id") is None or item.get("cluster_distance") is None:
+            continue
+
+        key = (item["cluster_method"], item["cluster_id"])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                "cluster_method": key[0],
+                "cluster_id": key[1],
+                "size": 0,
+                "representative_distance": None,
+                "first_published_at": None,
+                "last_published_at": None,
+            }
+            keywords[key] = Counter()
+
+        group["size"] += 1
+        keywords[key].update(item.get("title_tokens") or [])
+
+        if group["representative_distance"] is None or item["cluster_distance"] < group["representative_distance"]:
+            group.update(
+                representative_item_id=item.get("item_id"),
+                representative_title=item.get("title"),
+                representative_url=item.get("url"),
+                representative_distance=item["cluster_distance"],
+            )
+
+        if published_at := item.get("published_at"):
+            if group["first_published_at"] is None or published_at < group["first_published_at"]:
+                group["first_published_at"] = published_at
+            if group["last_published_at"] is None or published_at > group["last_published_at"]:
+                group["last_published_at"] = published_at
+
+    for key, group in groups.items():
+        group["top_keywords"] = dict(keywords[key].most_common(TOP_KEYWORDS_LIMIT))
+
+    # 按主键排序，并发事务以相同顺序加行锁
+    return [groups[key] for key in sorted(groups)]
+
+
+async def update_cluster_summaries(session, items: list[dict]) -> None:
+    """
+     在调用方事务中增量更新簇摘要（须在 save_news_items 之前调用，需要读取新闻原来的簇分配）：
+    - 新新闻、换了簇的新闻：累加大小、扩展时间跨度、合并词频，距质心更近的新闻替换代表新闻
+    - 换了簇的新闻先从原簇扣减（见 _REMOVE_FROM_SUMMARY）
+    - 簇分配未变的新闻（重复导入）不再计数
+    :param session:
+    :param items: 已聚类的新闻items（见 cluster_news_items）
+    :return:
+    """
+    # 同一批次中 (item_id, published_at) 重复时保留最后一条，与 save_news_items 一致
+    items = list({(item["item_id"], item.get("published_at")): item for item in items}.values())
+    previous = await fetch_news_item_clusters(session, items)
+
+    removals = _removals(items, previous)
+    if removals:
+        await session.execute(_REMOVE_FROM_SUMMARY, removals)
+
+    def changed(item: dict) -> bool:
+        key = (item["item_id"], item.get("published_at"))
+        return previous.get(key) != (item.get("cluster_method"), item.get("cluster_id"))
+
+    rows = _batch_summaries([item for item in items if changed(item)])
+    if not rows:
+        return
+
+    s = news_cluster_summary.c
+    closer = (s.representative_distance.is_(None)) | (
+        literal_column("excluded.representative_distance") < s.representative_distance
+    )
+
+    def _pick(col: str):
+        return case((closer, literal_column(f"excluded.{col}")), else_=s[col])
+
+    stmt = insert(news_cluster_summary).on_conflict_do_update(
+        index_elements=["cluster_method", "cluster_id"],
+        set_={
+            "size": s.size + literal_column("excluded.size"),
+            "representative_item_id": _pick("representative_item_id"),
+            "representative_title": _pick("representative_title"),
+            "representative_url": _pick("representative_url"),
+            "representative_distance": _pick("representative_distance"),
+            "top_keywords": _MERGE_TOP_KEYWORDS,
+            "first_published_at": literal_column(
+                "least(news_cluster_summary.first_published_at, excluded.first_published_at)"
+            ),
+            "last_published_at": literal_column(
+                "greatest(news_cluster_summary.last_published_at, excluded.last_published_at)"
+            ),
+            "updated_at": func.current_timestamp(),
+        },
+    )
+    await session.execute(stmt, rows)
+
+
+async def remove_from_cluster_summaries(session, items: list[dict]) -> None:
+    """
+     在调用方事务中把新闻从所在簇的摘要中扣减（归档分区时，见 partition_service）
+    :param session:
+    :param items: [{"item_id", "cluster_method", "cluster_id", "title_tokens"}]
+    """
+    rows = _removal_rows([item for item in items if item.get("cluster_id") is not None])
+    if rows:
+        await session.execute(_REMOVE_FROM_SUMMARY, rows)
+
+
+async def trim_cluster_summaries(session, first_published_from: date) -> None:
+    """
+     归档分区后收尾：删除已经没有新闻的簇摘要；
+    first_published_at 早于 first_published_from 的推进到该日期（早于它的月分区都已分离，是剩余新闻的下界）
+    """
+    s = news_cluster_summary.c
+    await session.execute(delete(news_cluster_summary).where(s.size <= 0))
+    await session.execute(
+        update(news_cluster_summary)
+        .where(s.first_published_at < first_published_from)
+        .values(first_published_at=first_published_from, updated_at=func.current_timestamp())
+    )
+
+
+async def fetch_cluster_summaries(cluster_method: str, limit: int = 20, offset: int = 0) -> list[dict]:
+    """
+     按簇大小倒序分页查询簇摘要
+    :param cluster_method:
+    :param limit:
+    :param offset: 簇数量有限（<= CLUSTER_N_CLUSTERS），OFFSET 翻页代价可以忽略
+    :return:
+    """
+    stmt = (
+        select(news_cluster_summary)
+        .where(news_cluster_summary.c.cluster_method == cluster_method)
+        .order_by(news_cluster_summary.c.size.desc(), news_cluster_summary.c.cluster_id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+    async with AsyncReadSessionLocal() as session:
+        rows = (await session.execute(stmt)).mappings().all()
+
+    return [
+        {
+            "cluster_method": r["cluster_method"],
+            "cluster_id": r["cluster_id"],
+            "size": r["size"],
+            "representative": {
+                "item_id": r["representative_item_id"],
+                "title": r["representative_title"],
+                "url": r["representative_url"],
+            },
+            "top_keywords": [
+                word for word, _ in sorted(r["top_keywords"].items(), key=lambda x: x[1], reverse=True)[:10]
+            ],
+            "first_published_at": r["first_published_at"].isoformat() if r["first_published_at"] else None,
+            "last_published_at": r["last_published_at"].isoformat() if r["last_published_at"] else None,
+        }
+        for r in rows
+    ]
+
+
+async def fetch_cluster_members(
+        cluster_method: str,
+        cluster_id: int,
+        limit: int = 20,
+        before_id: int | None = None,
+) -> list[dict]:
+    """
+     按 id 倒序分页查询簇内新闻（走 ix_news_item_cluster）
+    :param cluster_method:
+    :param cluster_id:
+    :param limit:
+    :param before_id: 上一页最后一条的 id
+    :return:
+    """
+    stmt = (
+        select(
+            news_item.c.id,
+            news_item.c.title,
+            news_item.c.url,
+            news_item.c.source,
+            news_item.c.published_at,
+        )
+        .where(news_item.c.cluster_method == cluster_method)
+        .where(news_item.c.cluster_id == cluster_id)
+        .order_by(news_item.c.id.desc())
+        .limit(limit)
+    )
+    if before_id is not None:
+        stmt = stmt.where(news_item.c.id < before_id)
+
+    async with AsyncReadSessionLocal() as session:
+        rows = (await session.execute(stmt)).all()
+
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "url": r.url,
+            "source": r.source,
+            "published_at": r.published_at.isoformat() if r.published_at else None,
+        }
+        for r in rows
+    ]
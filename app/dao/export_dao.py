@@ -0,0 +1,83 @@
+from datetime import date, datetime
+
+from sqlalchemy import select, func, tuple_
+
+from app.db import AsyncReadSessionLocal
+from app.models import news_item, news_keywords
+
+# 导出的表及列（向量、全文索引等派生列不导出）
+EXPORT_COLUMNS = {
+    "news_item": [
+        news_item.c.id,
+        news_item.c.item_id,
+        news_item.c.news_info_id,
+        news_item.c.title,
+        news_item.c.url,
+        news_item.c.published_at,
+        news_item.c.source,
+        news_item.c.content,
+        news_item.c.cluster_method,
+        news_item.c.cluster_id,
+        news_item.c.created_at,
+        news_item.c.updated_at,
+    ],
+    "news_keywords": [
+        news_keywords.c.id,
+        news_keywords.c.news_id,
+        news_keywords.c.published_at,
+        news_keywords.c.keyword,
+        news_keywords.c.keyword_norm,
+        news_keywords.c.weight,
+        news_keywords.c.method,
+        news_keywords.c.created_at,
+        news_keywords.c.updated_at,
+    ],
+}
+_TABLES = {"news_item": news_item, "news_keywords": news_keywords}
+
+
+async def fetch_db_now() -> datetime:
+    """数据库当前时间（水位线以数据库时钟为准，不受应用服务器时钟偏差影响）"""
+    async with AsyncReadSessionLocal() as session:
+        return (await session.execute(select(func.now()))).scalar_one()
+
+
+async def fetch_export_batch(
+        table_name: str,
+        start_date: date | None,
+        end_date: date | None,
+        after: tuple[datetime, int] | None,
+        until: datetime,
+        batch_size: int,
+) -> list[dict]:
+    """
+     按 (updated_at, id) keyset 读取一批待导出的行（只读库）
+    - published_at 范围条件直接比较分区键，只扫描范围内的月分区
+    - 每批一个短会话，不持有长事务；批大小已由 LIMIT 限定，直接 execute 一次取回
+    :param table_name: news_item / news_keywords
+    :param start_date: published_at 下界（含）
+    :param end_date: published_at 上界（含）
+    :param after: 上一批最后一行（或水位线）的 (updated_at, id)
+    :param until: updated_at 上界（不含）
+    :param batch_size:
+    :return:
+    """
+    table = _TABLES[table_name]
+    conditions = [table.c.updated_at < until]
+    if start_date:
+        conditions.append(table.c.published_at >= start_date)
+    if end_date:
+        conditions.append(table.c.published_at <= end_date)
+    if after is not None:
+        conditions.append(tuple_(table.c.updated_at, table.c.id) > tuple_(*after))
+
+    stmt = (
+        select(*EXPORT_COLUMNS[table_name])
+        .where(*conditions)
+        .order_by(table.c.updated_at, table.c.id)
+        .limit(batch_size)
+    )
+
+    async with AsyncReadSessionLocal() as session:
+        result = await session.execute(stmt)
+        return [dict(r) for r in result.mappings()]
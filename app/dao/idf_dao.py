@@ -0,0 +1,126 @@
+from collections import Counter
+
+from sqlalchemy import select, update, delete, bindparam, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+from app.dao.bulk_dao import bulk_upsert
+from app.db import AsyncReadSessionLocal
+from app.models import idf_document, idf_term, idf_corpus
+
+
+async def fetch_idf_stats(terms: list[str], news_ids: list[int]) -> tuple[dict[str, int], int, set[int]]:
+    """
+     查询一批文档用到的词的 DF（主键查找，只读库）
+    :param terms: 本批文档中出现的词
+    :param news_ids: 本批新闻 id，用于判断哪些已经计入 DF
+    :return: ({term: doc_freq}，文档总数，已计入 DF 的 news_id)
+    """
+    async with AsyncReadSessionLocal() as session:
+        doc_freq = {}
+        if terms:
+            rows = await session.execute(
+                select(idf_term.c.term, idf_term.c.doc_freq).where(idf_term.c.term.in_(terms))
+            )
+            doc_freq = {r.term: r.doc_freq for r in rows}
+
+        n_docs = (await session.execute(select(idf_corpus.c.n_docs))).scalar_one_or_none() or 0
+
+        known = set()
+        if news_ids:
+            known = set((await session.execute(
+                select(idf_document.c.news_id).where(idf_document.c.news_id.in_(news_ids))
+            )).scalars())
+
+    return doc_freq, n_docs, known
+
+
+async def fetch_top_idf_terms(limit: int) -> tuple[dict[str, int], int]:
+    """
+     DF 最高的 limit 个词（拟合向量模型时的词表快照，只读库）
+    :return: ({term: doc_freq}，文档总数)
+    """
+    async with AsyncReadSessionLocal() as session:
+        rows = await session.execute(
+            select(idf_term.c.term, idf_term.c.doc_freq).order_by(idf_term.c.doc_freq.desc()).limit(limit)
+        )
+        doc_freq = {r.term: r.doc_freq for r in rows}
+        n_docs = (await session.execute(select(idf_corpus.c.n_docs))).scalar_one_or_none() or 0
+    return doc_freq, n_docs
+
+
+async def merge_idf_doc_freq(session, doc_terms: dict[int, list[str]]) -> int:
+    """
+     在调用方事务中把一批文档合并进 DF，与关键词一起提交或回滚
+    - 先登记 news_id，已登记过的新闻（重试、重新提取）不再计数
+    - 词按字典序写入，并发合并时按相同顺序加行锁，不会互相死锁
+    :param session:
+    :param doc_terms: {news_id: 分词结果}
+    :return: 本次新计入的文档数
+    """
+    if not doc_terms:
+        return 0
+
+    stmt = (
+        insert(idf_document)
+        .values([{"news_id": news_id} for news_id in doc_terms])
+        .on_conflict_do_nothing(index_elements=["news_id"])
+        .returning(idf_document.c.news_id)
+    )
+    new_ids = list((await session.execute(stmt)).scalars())
+    if not new_ids:
+        return 0
+
+    counts = Counter()
+    for news_id in new_ids:
+        counts.update(set(doc_terms[news_id]))
+
+    await bulk_upsert(
+        session,
+        idf_term,
+        [{"term": term, "doc_freq": df} for term, df in sorted(counts.items())],
+        index_elements=["term"],
+        set_={"doc_freq": idf_term.c.doc_freq + literal_column("excluded.doc_freq")},
+    )
+    await session.execute(
+        update(idf_corpus).where(idf_corpus.c.id == 1).values(n_docs=idf_corpus.c.n_docs + len(new_ids))
+    )
+    return len(new_ids)
+
+
+async def remove_idf_documents(session, news_ids: list[int]) -> list[int]:
+    """
+     在调用方事务中注销已计入 DF 的新闻（归档分区时），返回实际注销的 news_id
+    只有返回的新闻需要从 DF 中扣减（见 subtract_idf_doc_freq）
+    """
+    if not news_ids:
+        return []
+    stmt = delete(idf_document).where(idf_document.c.news_id.in_(news_ids)).returning(idf_document.c.news_id)
+    return list((await session.execute(stmt)).scalars())
+
+
+async def subtract_idf_doc_freq(session, counts: Counter, n_docs: int) -> None:
+    """
+     在调用方事务中从 DF 中扣减一批已注销的文档（merge_idf_doc_freq 的逆操作），DF 降到 0 的词删除
+    :param session:
+    :param counts: {词: 扣减的文档数}
+    :param n_docs: 扣减的文档总数
+    """
+    if counts:
+        # 按字典序更新，与 merge_idf_doc_freq 加行锁的顺序一致
+        rows = [{"b_term": term, "b_df": df} for term, df in sorted(counts.items())]
+        await session.execute(
+            update(idf_term)
+            .where(idf_term.c.term == bindparam("b_term"))
+            .values(doc_freq=idf_term.c.doc_freq - bindparam("b_df")),
+            rows,
+        )
+        await session.execute(
+            delete(idf_term).where(idf_term.c.term == bindparam("b_term")).where(idf_term.c.doc_freq <= 0),
+            [{"b_term": row["b_term"]} for row in rows],
+        )
+    if n_docs:
+        await session.execute(
+            update(idf_corpus)
+            .where(idf_corpus.c.id == 1)
+            .values(n_docs=func.greatest(idf_corpus.c.n_docs - n_docs, 0))
+        )
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from sqlalchemy import select, update, func, insert
+
+from app.db import AsyncSessionLocal
+from app.models import analysis_job
+
+
+async def create_job(kind: str, params: dict) -> int:
+    """
+     创建后台作业，返回作业 ID
+    :param kind: 作业类型
+    :param params: 作业参数（需可 JSON 序列化）
+    :return:
+    """
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            stmt = insert(analysis_job).values(kind=kind, params=params).returning(analysis_job.c.id)
+            return (await session.execute(stmt)).scalar_one()
+
+
+async def update_job(job_id: int, **values) -> None:
+    """
+     更新作业字段（status / error / started_at / finished_at ...）
+    :param job_id:
+    :param values:
+    :return:
+    """
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(
+                update(analysis_job)
+                .where(analysis_job.c.id == job_id)
+                .values(**values, updated_at=func.current_timestamp())
+            )
+
+
+async def add_job_progress(job_id: int, processed: int) -> None:
+    """
+     累加作业进度（处理行数 + 1 个分块）
+    :param job_id:
+    :param processed:
+    :return:
+    """
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(
+                update(analysis_job)
+                .where(analysis_job.c.id == job_id)
+                .values(
+                    processed=analysis_job.c.processed + processed,
+                    chunks=analysis_job.c.chunks + 1,
+                    updated_at=func.current_timestamp(),
+                )
+            )
+
+
+async def claim_stale_jobs(stale_seconds: int) -> list[dict]:
+    """
+     接管心跳（updated_at）超时的 pending / running 作业：所在进程已退出（崩溃、被杀）
+    单条 UPDATE 原子完成，多个副本同时扫描时每个作业只会被一个副本接管
+    :param stale_seconds:
+    :return: [{"id", "kind", "params"}]
+    """
+    stmt = (
+        update(analysis_job)
+        .where(
+            analysis_job.c.status.in_(["pending", "running"]),
+            analysis_job.c.updated_at < func.current_timestamp() - timedelta(seconds=stale_seconds),
+        )
+        .values(status="pending", updated_at=func.current_timestamp())
+        .returning(analysis_job.c.id, analysis_job.c.kind, analysis_job.c.params)
+    )
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            rows = (await session.execute(stmt)).mappings().all()
+    return [dict(r) for r in rows]
+
+
+async def fetch_job_by_id(job_id: int) -> dict | None:
+    """
+     查询作业状态
+    :param job_id:
+    :return:
+    """
+    async with AsyncSessionLocal() as session:
+        row = (
+            await session.execute(select(analysis_job).where(analysis_job.c.id == job_id))
+        ).mappings().first()
+
+    if row is None:
+        return None
+
+    return {
+        "id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "params": row["params"],
+        "processed": row["processed"],
+        "chunks": row["chunks"],
+        "error": row["error"],
+        "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+        "started_at": row["started_at"].isoformat() if row["started_at"] else None,
+        "finished_at": row["finished_at"].isoformat() if row["finished_at"] else None,
+    }
@@ -0,0 +1,220 @@
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator
+
+from sqlalchemy import select, func, case, literal_column, tuple_, and_
+
+from app.dao.bulk_dao import bulk_upsert
+from app.db import AsyncSessionLocal, AsyncReadSessionLocal
+from app.models import news_keywords, news_item, keyword_daily_stats
+
+
+StatKey = tuple[date, str, str]
+
+
+async def fetch_keyword_stat_contributions(session, news_ids: list[int]) -> dict[StatKey, tuple[int, float]]:
+    """
+     一批新闻的关键词当前计入汇总表的量（在调用方事务中，按 (day, source, keyword) 聚合）
+    :param session:
+    :param news_ids:
+    :return: {(day, source, keyword): (doc_count, weight_sum)}
+    """
+    news_ids = list(set(news_ids))
+    if not news_ids:
+        return {}
+
+    source = func.coalesce(news_item.c.source, "")
+    stmt = (
+        select(
+            news_item.c.published_at.label("day"),
+            source.label("source"),
+            news_keywords.c.keyword_norm.label("keyword"),
+            func.count().label("doc_count"),
+            func.coalesce(func.sum(news_keywords.c.weight), 0).label("weight_sum"),
+        )
+        .select_from(news_keywords)
+        # 带上分区键，每个关键词只探测所属月份的 news_item 分区
+        .join(news_item, and_(
+            news_item.c.id == news_keywords.c.news_id,
+            news_item.c.published_at == news_keywords.c.published_at,
+        ))
+        .where(news_keywords.c.news_id.in_(news_ids))
+        .where(news_item.c.published_at.is_not(None))
+        .where(news_keywords.c.keyword_norm.is_not(None))
+        .group_by(news_item.c.published_at, source, news_keywords.c.keyword_norm)
+    )
+    rows = (await session.execute(stmt)).all()
+    return {(r.day, r.source, r.keyword): (r.doc_count, float(r.weight_sum)) for r in rows}
+
+
+async def rollup_keyword_stats(
+        session,
+        news_ids: list[int],
+        before: dict[StatKey, tuple[int, float]],
+) -> list[dict]:
+    """
+     按一批新闻关键词写入前后的差值累加 keyword_daily_stats，返回本次累加的增量行
+    重新提取时只累加权重的变化量（关键词不变则增量为 0），不会重复计数；
+    增量为加法合并，并发提交的事务之间不会互相覆盖
+    :param session: 调用方事务中的 session（须在关键词写入之后调用）
+    :param news_ids: 本批次提取了关键词的新闻 ID
+    :param before: 写入关键词之前 fetch_keyword_stat_contributions 的结果
+    :return: [{"day", "source", "keyword", "doc_count", "weight_sum"}]
+    """
+    after = await fetch_keyword_stat_contributions(session, news_ids)
+
+    deltas = []
+    for key in after.keys() | before.keys():
+        count_after, weight_after = after.get(key, (0, 0.0))
+        count_before, weight_before = before.get(key, (0, 0.0))
+        doc_count, weight_sum = count_after - count_before, weight_after - weight_before
+        if doc_count == 0 and abs(weight_sum) < 1e-9:
+            continue
+        day, source, keyword = key
+        deltas.append({
+            "day": day, "source": source, "keyword": keyword, "doc_count": doc_count, "weight_sum": weight_sum,
+        })
+
+    await bulk_upsert(
+        session,
+        keyword_daily_stats,
+        deltas,
+        index_elements=["day", "source", "keyword"],
+        set_={
+            "doc_count": keyword_daily_stats.c.doc_count + literal_column("excluded.doc_count"),
+            "weight_sum": keyword_daily_stats.c.weight_sum + literal_column("excluded.weight_sum"),
+            "updated_at": func.current_timestamp(),
+        },
+    )
+    return deltas
+
+
+async def fetch_trending_keywords(
+        end_date: date,
+        window_days: int = 1,
+        baseline_days: int = 7,
+        limit: int = 20,
+        source: str | None = None,
+        min_count: int = 3,
+        smoothing: float = 1.0,
+) -> list[dict]:
+    """
+     基于汇总表计算突发关键词
+    - current: (end_date - window_days, end_date] 内的权重和
+    - expected: 之前 baseline_days 天的日均权重 × window_days
+    - score = (current + smoothing) / (expected + smoothing)
+    :param end_date: 当前窗口的最后一天
+    :param window_days: 当前窗口天数
+    :param baseline_days: 基线天数
+    :param limit:
+    :param source: 只统计指定来源
+    :param min_count: 当前窗口内最少出现的新闻数
+    :param smoothing: 平滑项，避免基线为 0 时分数无穷大
+    :return:
+    """
+    window_start = end_date - timedelta(days=window_days)
+    baseline_start = window_start - timedelta(days=baseline_days)
+    in_window = keyword_daily_stats.c.day > window_start
+
+    current = func.sum(case((in_window, keyword_daily_stats.c.weight_sum), else_=0))
+    current_count = func.sum(case((in_window, keyword_daily_stats.c.doc_count), else_=0))
+    expected = func.sum(case((in_window, 0), else_=keyword_daily_stats.c.weight_sum)) * window_days / baseline_days
+    score = (current + smoothing) / (expected + smoothing)
+
+    stmt = (
+        select(
+            keyword_daily_stats.c.keyword,
+            current.label("current_weight"),
+            current_count.label("current_count"),
+            expected.label("expected_weight"),
+            score.label("score"),
+        )
+        .where(keyword_daily_stats.c.day > baseline_start)
+        .where(keyword_daily_stats.c.day <= end_date)
+        .group_by(keyword_daily_stats.c.keyword)
+        .having(current_count >= min_count)
+        .order_by(score.desc(), current.desc())
+        .limit(limit)
+    )
+    if source:
+        stmt = stmt.where(keyword_daily_stats.c.source == source)
+
+    async with AsyncReadSessionLocal() as session:
+        rows = (await session.execute(stmt)).mappings().all()
+
+    return [
+        {
+            "keyword": r["keyword"],
+            "current_weight": float(r["current_weight"]),
+            "current_count": int(r["current_count"]),
+            "expected_weight": float(r["expected_weight"]),
+            "score": float(r["score"]),
+        }
+        for r in rows
+    ]
+
+
+async def fetch_keyword_weights_by_day(day: date, limit: int = 200) -> dict[str, float]:
+    """
+     查询某一天（所有来源）权重最高的关键词，用于渲染词云
+    :param day:
+    :param limit:
+    :return: {关键词: 权重和}
+    """
+    weight = func.sum(keyword_daily_stats.c.weight_sum)
+    stmt = (
+        select(keyword_daily_stats.c.keyword, weight.label("weight"))
+        .where(keyword_daily_stats.c.day == day)
+        .group_by(keyword_daily_stats.c.keyword)
+        .order_by(weight.desc())
+        .limit(limit)
+    )
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(stmt)).all()
+
+    return {r.keyword: float(r.weight) for r in rows if r.weight > 0}
+
+
+async def stream_keyword_stats(
+        start_date: date,
+        updated_since: datetime | None = None,
+        batch_size: int = 5000,
+) -> AsyncIterator[list[dict]]:
+    """
+     流式读取汇总行（用于加载 / 同步进程内关键词索引），按主键 keyset 翻页
+    :param start_date: 只读取该日期及之后的行
+    :param updated_since: 只读取 updated_at 晚于该时间的行（走 ix_keyword_daily_stats_updated_at），None 为全量
+    :param batch_size:
+    :return:
+    """
+    s = keyword_daily_stats.c
+    conditions = [s.day >= start_date]
+    if updated_since is not None:
+        conditions.append(s.updated_at > updated_since)
+
+    last_key: tuple | None = None
+
+    while True:
+        page_conditions = list(conditions)
+        if last_key is not None:
+            page_conditions.append(tuple_(s.day, s.source, s.keyword) > tuple_(*last_key))
+
+        stmt = (
+            select(s.day, s.source, s.keyword, s.doc_count, s.weight_sum, s.updated_at)
+            .where(*page_conditions)
+            .order_by(s.day, s.source, s.keyword)
+            .limit(batch_size)
+        )
+
+        # 每页一个短会话，页大小由 LIMIT 限定
+        async with AsyncSessionLocal() as session:
+            batch = [dict(r) for r in (await session.execute(stmt)).mappings()]
+
+        if not batch:
+            return
+
+        last_key = (batch[-1]["day"], batch[-1]["source"], batch[-1]["keyword"])
+        yield batch
+
+        if len(batch) < batch_size:
+            return
@@ -0,0 +1,145 @@
+from sqlalchemy import select, update, bindparam, cast, text, Text
+from pgvector.sqlalchemy import Vector
+
+from app.config import settings
+from app.db import AsyncSessionLocal, AsyncReadSessionLocal
+from app.models import news_item
+
+# 向量以 pgvector 文本格式传入并在 SQL 中 CAST，不依赖驱动层的 vector 编解码
+_EMBEDDING_PARAM = cast(bindparam("b_embedding", type_=Text), Vector(settings.EMBEDDING_DIM))
+
+
+async def update_news_item_embeddings(session, items: list[dict]) -> None:
+    """
+     在调用方事务中按 (item_id, published_at) 写入新闻items的向量（见 embed_news_items）
+    :param session:
+    :param items: 带 embedding / embedding_version 的新闻items，没有向量的跳过
+    :return:
+    """
+    rows = [
+        {
+            "b_item_id": item["item_id"],
+            "b_published_at": item["published_at"],
+            "b_embedding": item["embedding"],
+            "b_version": item["embedding_version"],
+        }
+        for item in items
+        if item.get("embedding") is not None
+    ]
+    if not rows:
+        return
+
+    stmt = (
+        update(news_item)
+        .where(news_item.c.item_id == bindparam("b_item_id"))
+        .where(news_item.c.published_at == bindparam("b_published_at"))
+        .values(embedding=_EMBEDDING_PARAM, embedding_version=bindparam("b_version"))
+    )
+    await session.execute(stmt, rows)
+
+
+async def update_news_item_embeddings_by_id(session, rows: list[dict]) -> None:
+    """
+     在调用方事务中按主键 (id, published_at) 写入向量，只访问行所在的月分区
+    :param session:
+    :param rows: [{"id", "published_at", "embedding", "embedding_version"}]
+    :return:
+    """
+    rows = [
+        {
+            "b_id": r["id"],
+            "b_published_at": r["published_at"],
+            "b_embedding": r["embedding"],
+            "b_version": r["embedding_version"],
+        }
+        for r in rows
+    ]
+    if not rows:
+        return
+
+    stmt = (
+        update(news_item)
+        .where(news_item.c.id == bindparam("b_id"))
+        .where(news_item.c.published_at == bindparam("b_published_at"))
+        .values(embedding=_EMBEDDING_PARAM, embedding_version=bindparam("b_version"))
+    )
+    await session.execute(stmt, rows)
+
+
+async def fetch_news_item_titles(limit: int, after_id: int | None = None, latest: bool = False) -> list[dict]:
+    """
+     按主键 keyset 翻页读取 (id, published_at, title, embedding_version, has_title_tsv)
+    :param limit:
+    :param after_id: 上一页最后一条的 id（正序翻页）
+    :param latest: True 时取最新的 limit 条（用于拟合样本）
+    :return:
+    """
+    stmt = select(
+        news_item.c.id,
+        news_item.c.published_at,
+        news_item.c.title,
+        news_item.c.embedding_version,
+        news_item.c.title_tsv.is_not(None).label("has_title_tsv"),
+    ).limit(limit)
+    if latest:
+        stmt = stmt.order_by(news_item.c.id.desc())
+    else:
+        stmt = stmt.order_by(news_item.c.id)
+        if after_id is not None:
+            stmt = stmt.where(news_item.c.id > after_id)
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(stmt)).mappings().all()
+
+    return [dict(r) for r in rows]
+
+
+async def fetch_similar_news(news_id: int, limit: int = 10) -> list[dict] | None:
+    """
+     基于标题向量的近似最近邻（HNSW，余弦距离）
+    查询向量以标量子查询给出（InitPlan），规划器可以走 ix_news_item_embedding_hnsw
+    :param news_id:
+    :param limit:
+    :return: 目标新闻不存在或尚未生成向量时返回 None
+    """
+    target = select(news_item.c.embedding).where(news_item.c.id == news_id).scalar_subquery()
+    distance = news_item.c.embedding.cosine_distance(target)
+
+    stmt = (
+        select(
+            news_item.c.id,
+            news_item.c.title,
+            news_item.c.url,
+            news_item.c.source,
+            news_item.c.published_at,
+            distance.label("distance"),
+        )
+        .where(news_item.c.embedding.is_not(None))
+        .order_by(distance)
+        # 目标新闻自身会出现在结果中，多取一条后过滤
+        .limit(limit + 1)
+    )
+
+    async with AsyncReadSessionLocal() as session:
+        async with session.begin():
+            has_embedding = (await session.execute(
+                select(news_item.c.embedding.is_not(None)).where(news_item.c.id == news_id)
+            )).scalar()
+            if not has_embedding:
+                return None
+
+            await session.execute(text(f"SET LOCAL hnsw.ef_search = {int(settings.EMBEDDING_EF_SEARCH)}"))
+            rows = (await session.execute(stmt)).all()
+
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "url": r.url,
+            "source": r.source,
+            "published_at": r.published_at.isoformat() if r.published_at else None,
+            "score": 1 - r.distance,
+        }
+        for r in rows
+        if r.id != news_id
+    ][:limit]
@@ -1,9 +1,10 @@
-from datetime import date
+from datetime import date, timedelta
 
-from sqlalchemy import select, and_, update, func
+from sqlalchemy import select, and_, or_, update, func
 
+from app.config import settings
 from app.db import AsyncSessionLocal
-from app.models import news_item, news_info
+from app.models import news_info
 
 
 async def fetch_news_info_rows(
@@ -35,12 +36,13 @@ async def fetch_news_info_rows(
         conditions = [news_info.c.extracted == False]  # ⭐ 新闻未提取
 
         if start_date:
-            conditions.append(news_info.c.published_at >= start_date)
+            conditions.append(news_info.c.news_date >= start_date)
         if end_date:
-            conditions.append(news_info.c.published_at <= end_date)
+            conditions.append(news_info.c.news_date <= end_date)
 
         stmt = stmt.where(and_(*conditions))
-        stmt = stmt.order_by(news_info.c.created_at.desc()).limit(limit)
+        # 与 ix_news_info_not_extracted 部分索引的排序一致
+        stmt = stmt.order_by(news_info.c.created_at.desc(), news_info.c.id.desc()).limit(limit)
 
         result = await session.execute(stmt)
         rows = result.mappings().all()
@@ -59,6 +61,110 @@ async def fetch_news_info_rows(
         ]
 
 
+async def claim_news_info_rows(
+        session,
+        start_date: date | None,
+        end_date: date | None,
+        limit: int = 100,
+) -> list[dict]:
+    """
+     在调用方的短事务中认领一批待提取的news_info，认领后应立即提交，处理在事务外进行
+    - FOR UPDATE SKIP LOCKED 保证多个副本并发认领时不会拿到同一行
+    - 认领即写入租约（claimed_until）并累加 attempts；租约过期（认领者崩溃）的行可被重新认领，
+      attempts 达到 JOB_MAX_ATTEMPTS 的行不再认领
+    :param session:
+    :param start_date:
+    :param end_date:
+    :param limit:
+    :return:
+    """
+    conditions = [
+        news_info.c.extracted == False,
+        # 未被认领，或租约已过期（认领者崩溃）
+        or_(news_info.c.claimed_until.is_(None), news_info.c.claimed_until < func.current_timestamp()),
+        news_info.c.attempts < settings.JOB_MAX_ATTEMPTS,
+    ]
+
+    if start_date:
+        conditions.append(news_info.c.news_date >= start_date)
+    if end_date:
+        conditions.append(news_info.c.news_date <= end_date)
+
+    stmt = (
+        select(
+            news_info.c.id,
+            news_info.c.name,
+            news_info.c.news_from,
+            news_info.c.news_date,
+            news_info.c.data,
+        )
+        .where(and_(*conditions))
+        .order_by(news_info.c.created_at.desc(), news_info.c.id.desc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+    rows = [dict(r) for r in (await session.execute(stmt)).mappings().all()]
+    if rows:
+        await session.execute(
+            update(news_info)
+            .where(news_info.c.id.in_([r["id"] for r in rows]))
+            .values(
+                claimed_until=func.current_timestamp() + timedelta(seconds=settings.JOB_CLAIM_LEASE_SECONDS),
+                attempts=news_info.c.attempts + 1,
+            )
+        )
+    return rows
+
+
+async def mark_news_info_extracted(session, news_info_ids: list[int]) -> None:
+    """
+     按 ID 标记news_info已提取（包括没有产出任何item的行，避免被重复认领）
+    :param session:
+    :param news_info_ids:
+    :return:
+    """
+    if not news_info_ids:
+        return
+
+    stmt = (
+        update(news_info)
+        .where(news_info.c.id.in_(news_info_ids))
+        .values(
+            extracted=True,
+            extracted_at=func.current_timestamp(),
+            claimed_until=None,
+            error=None,
+        )
+    )
+    await session.execute(stmt)
+
+
+async def record_news_info_failure(rows: list[dict], error: str) -> None:
+    """
+     记录处理失败的行（独立事务）：写入错误、释放租约，并把尝试次数记满，之后不再认领
+    排查修复后把 attempts 置 0 即可重新处理
+    :param rows: 认领返回的行
+    :param error:
+    :return:
+    """
+    if not rows:
+        return
+
+    stmt = (
+        update(news_info)
+        .where(news_info.c.id.in_([r["id"] for r in rows]))
+        .values(
+            error=error,
+            claimed_until=None,
+            attempts=func.greatest(news_info.c.attempts, settings.JOB_MAX_ATTEMPTS),
+        )
+    )
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(stmt)
+
+
 async def update_news_info_extracted_state(session, items: list[dict]) -> None:
     """
     更新已提取的新闻info的状态
@@ -105,10 +211,10 @@ async def fetch_news_info_by_id(news_info_id: str) -> list[dict]:
             )
         )
 
-        conditions = [news_item.c.id == news_info_id]
+        conditions = [news_info.c.id == news_info_id]
 
         stmt = stmt.where(and_(*conditions))
-        stmt = stmt.order_by(news_item.c.created_at.desc()).limit(1)
+        stmt = stmt.order_by(news_info.c.created_at.desc()).limit(1)
 
         result = await session.execute(stmt)
         rows = result.mappings().all()
@@ -1,88 +1,285 @@
 # helper to query news rows (simple)
-from datetime import date
+from datetime import date, timedelta
 
-from sqlalchemy import select, and_, update, func, or_, literal_column
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import select, and_, update, func, or_, tuple_, union, case, cast, literal, literal_column, \
+    bindparam, Float
 
-from app.db import AsyncSessionLocal
+from app.config import settings
+from app.dao.bulk_dao import bulk_upsert
+from app.db import AsyncSessionLocal, AsyncReadSessionLocal
 from app.models import news_item, news_keywords
+from app.utils import normalize_keyword
+
+
+# 标题全文索引使用的文本搜索配置：中文已在应用侧分词，'simple' 只做小写化、不做词干和停用词处理
+_TS_CONFIG = literal_column("'simple'::regconfig")
+
+
+def _escape_like(value: str) -> str:
+    """转义 LIKE 模式中的通配符"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _keyword_match_condition(keywords: list[str], substring: bool):
+    """
+     构建关键词匹配条件
+    - 精确匹配：keyword_norm IN (...)，走 B-tree 索引
+    - 子串匹配：keyword_norm ILIKE '%k%'，走 pg_trgm GIN 索引
+    """
+    if substring:
+        return or_(*[
+            news_keywords.c.keyword_norm.ilike(f"%{_escape_like(k)}%", escape="\\")
+            for k in keywords
+        ])
+    return news_keywords.c.keyword_norm.in_(keywords)
+
+
+def _published_between(start_date: date | str | None, end_date: date | str | None) -> list:
+    """
+     published_at 日期范围条件（闭区间）
+    直接比较分区键列、参数为 date 类型（不对列做函数 / 类型转换），
+    规划器（或执行期，使用预编译语句的通用计划时）才能裁剪掉范围外的月分区
+    """
+    conditions = []
+    if start_date:
+        conditions.append(news_item.c.published_at >= _as_date(start_date))
+    if end_date:
+        conditions.append(news_item.c.published_at <= _as_date(end_date))
+    return conditions
+
+
+def _as_date(value: date | str) -> date:
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _rows_condition(rows: list[dict]):
+    """
+     按 (id, published_at) 定位行；只按 id 查找会探测每个月分区的主键索引，
+    带上分区键后只访问行所在的分区（published_at 再单独列一次 IN，保证规划器能裁剪）
+    """
+    return and_(
+        tuple_(news_item.c.id, news_item.c.published_at).in_([(r["id"], _as_date(r["published_at"])) for r in rows]),
+        news_item.c.published_at.in_({_as_date(r["published_at"]) for r in rows}),
+    )
+
+
+def encode_search_cursor(score: float, news_id: int) -> str:
+    """
+     将 (score, id) 编码为翻页游标，repr(float) 可无损还原双精度分数
+    """
+    return f"{score!r}_{news_id}"
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, int]:
+    """
+     解析翻页游标，格式错误时抛出 ValueError
+    """
+    score, sep, news_id = cursor.rpartition("_")
+    if not sep:
+        raise ValueError(f"invalid cursor: {cursor}")
+    return float(score), int(news_id)
+
+
+def _title_tsquery(keywords: list[str]):
+    """
+     关键词 → OR 连接的 tsquery；websearch_to_tsquery 与 to_tsvector 使用同一解析器，
+    且不会因用户输入中的特殊字符报错（去掉开头的 '-' 和引号，避免被解析为 NOT / 短语）
+    """
+    terms = [k.lstrip("-").replace('"', " ") for k in keywords]
+    return func.websearch_to_tsquery(_TS_CONFIG, " or ".join(t for t in terms if t.strip()))
+
+
+def _recency_decay():
+    """按 published_at 距今天数做指数衰减（以天为粒度，同一天内分数稳定，游标翻页不漂移）"""
+    half_life = settings.SEARCH_RECENCY_HALF_LIFE_DAYS
+    if half_life <= 0:
+        return literal(1.0)
+    age = func.greatest(cast(func.current_date() - news_item.c.published_at, Float), 0.0)
+    return func.coalesce(func.power(0.5, age / half_life), 1.0)
+
+
+def _source_boost():
+    """settings.SEARCH_SOURCE_BOOSTS 中的来源加权，未列出的来源为 1"""
+    boosts = settings.SEARCH_SOURCE_BOOSTS
+    if not boosts:
+        return literal(1.0)
+    return case(
+        {source: float(boost) for source, boost in boosts.items()},
+        value=news_item.c.source,
+        else_=1.0,
+    )
 
 
 async def fetch_news_item_by_keywords(
         keywords: list[str],
         limit: int = 20,
         offset: int = 0,
-) -> list[dict]:
+        substring: bool | None = None,
+        after: tuple[float, int] | None = None,
+        primary: bool = False,
+) -> dict:
     """
-     通过关键字查询所有新闻
+     通过关键字查询所有新闻（混合检索，单条 SQL）
+    - 候选集：news_keywords 命中（B-tree / pg_trgm 索引）∪ 标题全文命中（ix_news_item_title_tsv GIN 索引）
+    - 打分：(关键词权重和 × SEARCH_KEYWORD_WEIGHT + ts_rank × SEARCH_TEXT_WEIGHT) × 时间衰减 × 来源加权
     :param keywords: 关键字查询条件
     :param limit:
-    :param offset:
-    :return:
+    :param offset: 兼容旧的 OFFSET 翻页，传入 after 时忽略
+    :param substring: 关键词部分是否子串匹配，默认取 settings.SEARCH_SUBSTRING_MATCH
+    :param after: 上一页 next_cursor 解析出的 (score, id)（见 decode_search_cursor），按其做 keyset 翻页
+    :param primary: 从主库查询（刚提交关键词后，只读副本可能尚未同步）
+    :return: {"total": 匹配总数, "items": [...], "next_cursor": 下一页游标或 None}
     """
 
-    # --- 1) 处理关键词，去空格，忽略空字符串 ---
-    keywords = [k.strip() for k in keywords if k.strip()]
+    # --- 1) 处理关键词，归一化后去重，忽略空字符串 ---
+    keywords = list(dict.fromkeys(k for k in map(normalize_keyword, keywords) if k))
     if not keywords:
-        return []
-
-    async with AsyncSessionLocal() as session:
-
-        # --- 2) 聚合 TF-IDF 权重排名 ---
-        conditions = [news_keywords.c.keyword.ilike(f"%{k}%") for k in keywords]
-
-        stmt = (
-            select(
-                news_keywords.c.news_id,
-                func.coalesce(func.sum(news_keywords.c.weight), 0).label("score")
+        return {"total": 0, "items": [], "next_cursor": None}
+
+    if substring is None:
+        substring = settings.SEARCH_SUBSTRING_MATCH
+
+    # --- 2) 候选集：关键词命中（同时聚合 TF-IDF 权重）与标题全文命中取并集 ---
+    tsquery = _title_tsquery(keywords)
+    kw = (
+        select(
+            news_keywords.c.news_id.label("id"),
+            news_keywords.c.published_at,
+            func.sum(news_keywords.c.weight).label("kw_score"),
+        )
+        .where(_keyword_match_condition(keywords, substring))
+        .group_by(news_keywords.c.news_id, news_keywords.c.published_at)
+        .cte("kw")
+    )
+    # 候选集带上分区键 published_at，回表按 (id, published_at) 只访问所在分区
+    candidates = union(
+        select(kw.c.id, kw.c.published_at),
+        select(news_item.c.id, news_item.c.published_at).where(news_item.c.title_tsv.op("@@")(tsquery)),
+    ).subquery("candidates")
+
+    # --- 3) 回表打分；COUNT(*) OVER () 在 LIMIT 之前计算，即匹配的新闻总数 ---
+    relevance = (
+        func.coalesce(kw.c.kw_score, 0) * settings.SEARCH_KEYWORD_WEIGHT
+        + func.coalesce(func.ts_rank(news_item.c.title_tsv, tsquery), 0) * settings.SEARCH_TEXT_WEIGHT
+    )
+    scored = (
+        select(
+            news_item.c.id,
+            news_item.c.title,
+            news_item.c.url,
+            news_item.c.source,
+            news_item.c.published_at,
+            (relevance * _recency_decay() * _source_boost()).label("score"),
+            func.count().over().label("total"),
+        )
+        .select_from(
+            candidates
+            .join(
+                news_item,
+                (news_item.c.id == candidates.c.id) & (news_item.c.published_at == candidates.c.published_at),
             )
-            .where(or_(*conditions))
-            .group_by(news_keywords.c.news_id)
-            .order_by(func.coalesce(func.sum(news_keywords.c.weight), 0).desc())
-            .limit(limit)
-            .offset(offset)
+            .outerjoin(kw, (kw.c.id == candidates.c.id) & (kw.c.published_at == candidates.c.published_at))
         )
+        .subquery("scored")
+    )
+
+    # --- 4) 排序和分页都在数据库完成 ---
+    stmt = (
+        select(scored)
+        .order_by(scored.c.score.desc(), scored.c.id.desc())
+        .limit(limit)
+    )
+
+    if after is not None:
+        # keyset 翻页：窗口函数所在子查询不会被下推外层条件，total 仍是全量计数
+        stmt = stmt.where(tuple_(scored.c.score, scored.c.id) < tuple_(*after))
+    elif offset:
+        stmt = stmt.offset(offset)
 
+    session_factory = AsyncSessionLocal if primary else AsyncReadSessionLocal
+    async with session_factory() as session:
         rows = (await session.execute(stmt)).all()
-        if not rows:
-            return []
+        if rows:
+            total = rows[0].total
+        elif after is not None or offset:
+            # 翻过末尾时本页为空，窗口函数没有行可返回，单独统计候选集
+            total = (await session.execute(select(func.count()).select_from(candidates))).scalar_one()
+        else:
+            total = 0
+
+    # --- 5) 组合结果 ---
+    items = [
+        {
+            "id": r.id,
+            "title": r.title,
+            "url": r.url,
+            "source": r.source,
+            "published_at": r.published_at.isoformat() if r.published_at else None,
+            "score": r.score,
+        }
+        for r in rows
+    ]
 
-        # --- 3) 获取匹配新闻 ID 和对应分数 ---
-        news_ids = [r.news_id for r in rows]
-        score_map = {r.news_id: r.score for r in rows}
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = encode_search_cursor(rows[-1].score, rows[-1].id)
 
-        # --- 4) 回表查新闻详情 ---
-        news_stmt = (
-            select(
-                news_item.c.id,
-                news_item.c.title,
-                news_item.c.url,
-                news_item.c.source,
-                news_item.c.published_at,
-            )
-            .where(news_item.c.id.in_(news_ids))
-        )
+    return {
+        "total": total,
+        "items": items,
+        "next_cursor": next_cursor,
+    }
 
-        news_rows = (await session.execute(news_stmt)).all()
-
-        # --- 5) 组合结果，按 score 排序 ---
-        items = []
-        for r in news_rows:
-            items.append(
-                {
-                    "id": r.id,
-                    "title": r.title,
-                    "url": r.url,
-                    "source": r.source,
-                    "published_at": r.published_at.isoformat() if r.published_at else None,
-                    "score": score_map.get(r.id, 0),
-                }
-            )
 
-        # 保证排序和前面聚合结果一致
-        items.sort(key=lambda x: x["score"], reverse=True)
+async def update_news_item_title_tsv(session, items: list[dict]) -> None:
+    """
+     在调用方事务中按 (item_id, published_at) 写入标题全文索引（分词结果见 prepare_title_tokens）
+    :param session:
+    :param items: 带 title_tokens 的新闻items，没有分词结果的跳过
+    :return:
+    """
+    rows = [
+        {
+            "b_item_id": item["item_id"],
+            "b_published_at": item["published_at"],
+            "b_tokens": " ".join(item["title_tokens"]),
+        }
+        for item in items
+        if item.get("title_tokens") is not None
+    ]
+    if not rows:
+        return
 
-        return items
+    stmt = (
+        update(news_item)
+        .where(news_item.c.item_id == bindparam("b_item_id"))
+        .where(news_item.c.published_at == bindparam("b_published_at"))
+        .values(title_tsv=func.to_tsvector(_TS_CONFIG, bindparam("b_tokens")))
+    )
+    await session.execute(stmt, rows)
+
+
+async def update_news_item_title_tsv_by_id(session, rows: list[dict]) -> None:
+    """
+     在调用方事务中按主键 (id, published_at) 写入标题全文索引，只访问行所在的月分区
+    :param session:
+    :param rows: [{"id", "published_at", "title_tokens"}]
+    :return:
+    """
+    rows = [
+        {"b_id": r["id"], "b_published_at": _as_date(r["published_at"]), "b_tokens": " ".join(r["title_tokens"])}
+        for r in rows
+    ]
+    if not rows:
+        return
+
+    stmt = (
+        update(news_item)
+        .where(news_item.c.id == bindparam("b_id"))
+        .where(news_item.c.published_at == bindparam("b_published_at"))
+        .values(title_tsv=func.to_tsvector(_TS_CONFIG, bindparam("b_tokens")))
+    )
+    await session.execute(stmt, rows)
 
 
 async def fetch_news_item_rows_not_extracted(
@@ -111,15 +308,14 @@ async def fetch_news_item_rows_not_extracted(
             )
         )
 
-        conditions = [news_item.c.extracted == False]  # ⭐ 关键字未提取
-
-        if start_date:
-            conditions.append(news_item.c.published_at >= start_date)
-        if end_date:
-            conditions.append(news_item.c.published_at <= end_date)
+        conditions = [
+            news_item.c.extracted == False,  # ⭐ 关键字未提取
+            *_published_between(start_date, end_date),
+        ]
 
         stmt = stmt.where(and_(*conditions))
-        stmt = stmt.order_by(news_item.c.created_at.desc()).limit(limit)
+        # 与 ix_news_item_not_extracted 部分索引的排序一致
+        stmt = stmt.order_by(news_item.c.created_at.desc(), news_item.c.id.desc()).limit(limit)
 
         result = await session.execute(stmt)
         rows = result.mappings().all()
@@ -137,24 +333,135 @@ async def fetch_news_item_rows_not_extracted(
         ]
 
 
+async def claim_news_item_rows_not_extracted(
+        session,
+        start_date: date | None,
+        end_date: date | None,
+        limit: int = 500,
+) -> list[dict]:
+    """
+     在调用方的短事务中认领一批待提取关键字的新闻item，认领后应立即提交（租约与尝试次数同 claim_news_info_rows）
+    :param session:
+    :param start_date:
+    :param end_date:
+    :param limit:
+    :return:
+    """
+    conditions = [
+        news_item.c.extracted == False,
+        *_published_between(start_date, end_date),
+        # 未被认领，或租约已过期（认领者崩溃）
+        or_(news_item.c.claimed_until.is_(None), news_item.c.claimed_until < func.current_timestamp()),
+        news_item.c.attempts < settings.JOB_MAX_ATTEMPTS,
+    ]
+
+    stmt = (
+        select(
+            news_item.c.id,
+            news_item.c.title,
+            news_item.c.url,
+            news_item.c.published_at,
+            news_item.c.source,
+        )
+        .where(and_(*conditions))
+        .order_by(news_item.c.created_at.desc(), news_item.c.id.desc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+    rows = [dict(r) for r in (await session.execute(stmt)).mappings().all()]
+    if rows:
+        await session.execute(
+            update(news_item)
+            .where(_rows_condition(rows))
+            .values(
+                claimed_until=func.current_timestamp() + timedelta(seconds=settings.JOB_CLAIM_LEASE_SECONDS),
+                attempts=news_item.c.attempts + 1,
+            )
+        )
+    return rows
+
+
+async def mark_news_item_extracted(session, rows: list[dict]) -> None:
+    """
+     按 (id, published_at) 标记新闻item已提取（包括没有提取出关键词的行，避免被重复认领）
+    :param session:
+    :param rows: 认领返回的行，需带 id、published_at
+    :return:
+    """
+    if not rows:
+        return
+
+    stmt = (
+        update(news_item)
+        .where(_rows_condition(rows))
+        .values(
+            extracted=True,
+            extracted_at=func.current_timestamp(),
+            claimed_until=None,
+            error=None,
+        )
+    )
+    await session.execute(stmt)
+
+
+async def record_news_item_failure(rows: list[dict], error: str) -> None:
+    """
+     记录处理失败的行（独立事务）：写入错误、释放租约，并把尝试次数记满，之后不再认领
+    排查修复后把 attempts 置 0 即可重新处理
+    :param rows: 认领返回的行，需带 id、published_at
+    :param error:
+    :return:
+    """
+    if not rows:
+        return
+
+    stmt = (
+        update(news_item)
+        .where(_rows_condition(rows))
+        .values(
+            error=error,
+            claimed_until=None,
+            attempts=func.greatest(news_item.c.attempts, settings.JOB_MAX_ATTEMPTS),
+        )
+    )
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(stmt)
+
+
 async def update_news_item_extracted_state(session, items: list[dict]) -> None:
     """
     更新已提取的新闻item的状态
+    按 (news_id, published_at) 定位行（见 _rows_condition）；个别没有 published_at 的关键词行按 id 查找
     :param session:
-    :param items:
+    :param items: 关键词行 [{"news_id", "published_at", ...}]
     :return:
     """
     if not items:
         return
     # 使用字典去重
-    news_ids = { item.get("news_id", "") for item in items }
-
-    if not news_ids:
+    located = {
+        item["news_id"]: {"id": item["news_id"], "published_at": item["published_at"]}
+        for item in items
+        if item.get("news_id") is not None and item.get("published_at")
+    }
+    unlocated = {
+        item["news_id"] for item in items
+        if item.get("news_id") is not None and not item.get("published_at") and item["news_id"] not in located
+    }
+
+    conditions = []
+    if located:
+        conditions.append(_rows_condition(list(located.values())))
+    if unlocated:
+        conditions.append(news_item.c.id.in_(unlocated))
+    if not conditions:
         return
 
     stmt = (
         update(news_item)
-        .where(news_item.c.id.in_(news_ids))
+        .where(or_(*conditions))
         .values(
             extracted=True,
             extracted_at=func.current_timestamp()
@@ -163,13 +470,14 @@ async def update_news_item_extracted_state(session, items: list[dict]) -> None:
     await session.execute(stmt)
 
 
-async def fetch_news_item_by_id(news_id: str) -> list[dict]:
+async def fetch_news_item_by_id(news_id: str, published_at: date | str | None = None) -> list[dict]:
     """
      根据新闻id查询新闻详情
     :param news_id:
+    :param published_at: 新闻的发布日期（分区键），已知时只查询所在分区，否则探测每个月分区
     :return:
     """
-    async with AsyncSessionLocal() as session:
+    async with AsyncReadSessionLocal() as session:
 
         stmt = (
             select(
@@ -184,6 +492,8 @@ async def fetch_news_item_by_id(news_id: str) -> list[dict]:
         )
 
         conditions = [news_item.c.id == news_id]
+        if published_at:
+            conditions.append(news_item.c.published_at == _as_date(published_at))
 
         stmt = stmt.where(and_(*conditions))
         stmt = stmt.order_by(news_item.c.published_at.desc()).limit(1)
@@ -205,29 +515,59 @@ async def fetch_news_item_by_id(news_id: str) -> list[dict]:
 
 
 async def save_news_items(session, items: list[dict]) -> None:
-    if not items:
-        return None
+    """
+     批量写入新闻items，(item_id, published_at) 冲突时更新（大批量走 COPY，见 bulk_upsert）
+    :param session:
+    :param items:
+    :return:
+    """
+    # 向量由 update_news_item_embeddings 单独写入（文本格式 + CAST），不经过 COPY
+    items = [{k: v for k, v in item.items() if k not in ("embedding", "embedding_version")} for item in items]
+    # 同一批次中 (item_id, published_at) 重复时保留最后一条
+    await bulk_upsert(
+        session,
+        news_item,
+        items,
+        index_elements=["item_id", "published_at"],
+        set_={
+            "title": None,
+            "url": None,
+            "source": None,
+            "cluster_method": None,
+            "cluster_id": None,
+            # 增量导出的水位线（见 export_service）
+            "updated_at": func.current_timestamp(),
+        },
+    )
 
-    # 1. 对 items 进行去重，保留每个 (item_id, published_at) 的最后一条记录
-    seen = {}
-    for item in items:
-        # 构建唯一键，这里假设 published_at 已处理为日期字符串或 None
-        key = (item.get("item_id"), item.get("published_at"))
-        seen[key] = item  # 后续出现的记录会覆盖先前的，保留最后一条
 
-    unique_items = list(seen.values())
+async def update_news_item_clusters(session, items: list[dict]) -> None:
+    """
+     在调用方事务中按 (item_id, published_at) 回写 cluster_id / cluster_method（在线模型预热样本的补分配）
+    :param session:
+    :param items: [{"item_id", "published_at", "cluster_id", "cluster_method"}]
+    :return:
+    """
+    if not items:
+        return
 
-    # 2. 使用去重后的列表进行插入或更新
-    stmt = insert(news_item).values(unique_items)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["item_id", "published_at"],
-        set_={
-            "title": literal_column("excluded.title"),
-            "url": literal_column("excluded.url"),
-            "source": literal_column("excluded.source"),
-            "cluster_method": literal_column("excluded.cluster_method"),
-            "cluster_id": literal_column("excluded.cluster_id"),
+    rows = [
+        {
+            "b_item_id": item["item_id"],
+            "b_published_at": item["published_at"],
+            "b_cluster_id": item["cluster_id"],
+            "b_cluster_method": item["cluster_method"],
         }
+        for item in items
+    ]
+    stmt = (
+        update(news_item)
+        .where(news_item.c.item_id == bindparam("b_item_id"))
+        .where(news_item.c.published_at == bindparam("b_published_at"))
+        .values(
+            cluster_id=bindparam("b_cluster_id"),
+            cluster_method=bindparam("b_cluster_method"),
+            updated_at=func.current_timestamp(),
+        )
     )
-    await session.execute(stmt)
-    return None
\ No newline at end of file
+    await session.execute(stmt, rows)
@@ -1,24 +1,73 @@
-from sqlalchemy import literal_column
-from sqlalchemy.dialects.postgresql import insert
+import logging
+from datetime import date
 
-from app.models import news_keywords
+from sqlalchemy import select, func
 
+from app.dao.bulk_dao import bulk_upsert
+from app.models import news_keywords, news_item
+from app.utils import normalize_keyword
 
-async def save_news_keywords(session, items: list[dict]) -> None:
+logger = logging.getLogger(__name__)
+
+
+async def _fill_published_at(session, items: list[dict]) -> list[dict]:
+    """
+     补齐关键词的 published_at（分区键，取所属新闻的 published_at）；
+    调用方已带上时不查库，isoformat 字符串转换为 date
+    """
+    missing = {item["news_id"] for item in items if not item.get("published_at")}
+    published: dict[int, date] = {}
+    if missing:
+        rows = await session.execute(
+            select(news_item.c.id, news_item.c.published_at).where(news_item.c.id.in_(missing))
+        )
+        published = {r.id: r.published_at for r in rows}
+
+    filled = []
+    dropped = set()
+    for item in items:
+        value = item.get("published_at") or published.get(item["news_id"])
+        if isinstance(value, str):
+            value = date.fromisoformat(value)
+        # 新闻已不存在（例如所在分区已归档）时丢弃
+        if value is None:
+            dropped.add(item["news_id"])
+            continue
+        filled.append({**item, "published_at": value})
 
+    if dropped:
+        logger.warning(f"Dropped keywords of {len(dropped)} missing news items: {sorted(dropped)}")
+    return filled
+
+
+async def save_news_keywords(session, items: list[dict]) -> None:
+    """
+     批量写入新闻关键字，(news_id, keyword, method) 冲突时更新权重（大批量走 COPY，见 bulk_upsert）
+    :param session:
+    :param items:
+    :return:
+    """
     if not items:
         return None
 
-    stmt = insert(news_keywords).values(items)
+    # 写入归一化关键词，供搜索索引使用
+    items = [
+        {**item, "keyword_norm": normalize_keyword(item.get("keyword", ""))}
+        for item in await _fill_published_at(session, items)
+    ]
 
     # ❗ 冲突更新（推荐：更新 weight）
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["news_id", "keyword", "method"],
+    # published_at 由 news_id 决定，加入冲突键只是为了满足分区表唯一约束必须包含分区键
+    await bulk_upsert(
+        session,
+        news_keywords,
+        items,
+        index_elements=["news_id", "keyword", "method", "published_at"],
         set_={
-            "weight": literal_column("excluded.weight"),
-            "method": literal_column("excluded.method"),
-        }
+            "weight": None,
+            "keyword_norm": None,
+            "method": None,
+            "updated_at": func.current_timestamp(),
+        },
     )
-
-    await session.execute(stmt)
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,182 @@
+from sqlalchemy import select, func, delete, literal_column, exists
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.db import AsyncReadSessionLocal
+from app.models import news_keywords, news_item, news_related, idf_term
+
+
+def _pairs(news_ids: list[int], related_ids: list[int] | None = None):
+    """
+     基于关键词重叠的相似度：关键词表自连接，按 Σ min(weight_a, weight_b) 打分
+    - 文档频率超过 RELATED_MAX_KEYWORD_DF 的热门词不参与连接：倒排列表过长，
+      每次提交都要与所有含该词的新闻连接，而且对区分相关性几乎没有帮助
+    :param news_ids: 目标新闻
+    :param related_ids: 只对这些新闻打分，默认全部
+    """
+    target = news_keywords.alias("t")
+    other = news_keywords.alias("o")
+
+    score = func.sum(func.least(func.coalesce(target.c.weight, 0), func.coalesce(other.c.weight, 0)))
+    hot = exists().where(
+        (idf_term.c.term == target.c.keyword_norm) & (idf_term.c.doc_freq > settings.RELATED_MAX_KEYWORD_DF)
+    )
+
+    stmt = (
+        select(
+            target.c.news_id.label("news_id"),
+            other.c.news_id.label("related_id"),
+            score.label("score"),
+            func.row_number().over(
+                partition_by=target.c.news_id,
+                order_by=(score.desc(), other.c.news_id.desc()),
+            ).label("rn"),
+        )
+        .join(
+            other,
+            (other.c.keyword_norm == target.c.keyword_norm)
+            & (other.c.method == target.c.method)
+            & (other.c.news_id != target.c.news_id),
+        )
+        .where(target.c.news_id.in_(news_ids), ~hot)
+        .group_by(target.c.news_id, other.c.news_id)
+    )
+    if related_ids is not None:
+        stmt = stmt.where(other.c.news_id.in_(related_ids))
+    return stmt
+
+
+def _ranked_related_stmt(news_ids: list[int], top_n: int):
+    """每篇目标新闻只保留 top_n 个相似新闻"""
+    pairs = _pairs(news_ids).subquery("pairs")
+
+    return (
+        select(pairs.c.news_id, pairs.c.related_id, pairs.c.score)
+        .where(pairs.c.rn <= top_n)
+    )
+
+
+async def refresh_news_related(session, news_ids: list[int], top_n: int = 20) -> None:
+    """
+     重新计算指定新闻的相关新闻，并把反向边写入已有新闻（新文章可能进入老文章的 top-N）
+    - 本批次新闻的关键词被替换（重新提取）后，其他新闻指向它们的边按新关键词重新打分，
+      不再重叠的边删除
+    :param session: 调用方事务中的 session
+    :param news_ids: 本批次提取了关键词的新闻 ID
+    :param top_n: 每篇新闻保留的相关新闻数量
+    :return:
+    """
+    news_ids = list(set(news_ids))
+    if not news_ids:
+        return
+
+    # 0. 删除其他新闻指向本批次新闻的旧边，记下来源，下面按新关键词重新打分
+    stale = await session.execute(
+        delete(news_related)
+        .where(news_related.c.related_id.in_(news_ids), news_related.c.news_id.not_in(news_ids))
+        .returning(news_related.c.news_id)
+    )
+    sources = sorted({r.news_id for r in stale})
+
+    # 1. 覆盖写入本批次新闻的 top-N
+    await session.execute(delete(news_related).where(news_related.c.news_id.in_(news_ids)))
+    await session.execute(
+        insert(news_related).from_select(
+            ["news_id", "related_id", "score"],
+            _ranked_related_stmt(news_ids, top_n),
+        )
+    )
+
+    # 2. 反向边：related -> news
+    reverse = (
+        select(news_related.c.related_id, news_related.c.news_id, news_related.c.score)
+        .where(news_related.c.news_id.in_(news_ids))
+    )
+    stmt = insert(news_related).from_select(["news_id", "related_id", "score"], reverse)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["news_id", "related_id"],
+        set_={
+            "score": literal_column("excluded.score"),
+            "updated_at": func.current_timestamp(),
+        },
+    ).returning(news_related.c.news_id)
+    affected = {r.news_id for r in (await session.execute(stmt)).all()}
+
+    # 2b. 原来指向本批次新闻的边：只在来源与本批次之间重新打分，仍有重叠的写回
+    if sources:
+        rescored = _pairs(sources, news_ids).subquery("rescored")
+        stmt = insert(news_related).from_select(
+            ["news_id", "related_id", "score"],
+            select(rescored.c.news_id, rescored.c.related_id, rescored.c.score),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["news_id", "related_id"],
+            set_={
+                "score": literal_column("excluded.score"),
+                "updated_at": func.current_timestamp(),
+            },
+        )
+        await session.execute(stmt)
+        affected.update(sources)
+
+    if not affected:
+        return
+
+    # 3. 裁剪收到反向边的新闻，只保留 top-N
+    ranked = (
+        select(
+            news_related.c.news_id,
+            news_related.c.related_id,
+            func.row_number().over(
+                partition_by=news_related.c.news_id,
+                order_by=(news_related.c.score.desc(), news_related.c.related_id.desc()),
+            ).label("rn"),
+        )
+        .where(news_related.c.news_id.in_(affected))
+        .subquery("ranked")
+    )
+    await session.execute(
+        delete(news_related)
+        .where(news_related.c.news_id == ranked.c.news_id)
+        .where(news_related.c.related_id == ranked.c.related_id)
+        .where(ranked.c.rn > top_n)
+    )
+
+
+async def fetch_related_news(news_id: int, limit: int = 5) -> list[dict]:
+    """
+     查询预计算的相关新闻（news_related 上的一次索引查找 + 主键回表）
+    :param news_id:
+    :param limit:
+    :return:
+    """
+    stmt = (
+        select(
+            news_item.c.id,
+            news_item.c.title,
+            news_item.c.url,
+            news_item.c.source,
+            news_item.c.published_at,
+            news_related.c.score,
+        )
+        .select_from(news_related)
+        .join(news_item, news_item.c.id == news_related.c.related_id)
+        .where(news_related.c.news_id == news_id)
+        .order_by(news_related.c.score.desc(), news_related.c.related_id.desc())
+        .limit(limit)
+    )
+
+    async with AsyncReadSessionLocal() as session:
+        rows = (await session.execute(stmt)).all()
+
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "url": r.url,
+            "source": r.source,
+            "published_at": r.published_at.isoformat() if r.published_at else None,
+            "score": r.score,
+        }
+        for r in rows
+    ]
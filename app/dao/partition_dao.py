@@ -0,0 +1,93 @@
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+# 按 published_at 月度分区的表；news_keywords 外键引用 news_item，分离 / 删除时必须先处理它
+PARTITIONED_TABLES = ("news_item", "news_keywords")
+
+
+def partition_name(parent: str, month: date) -> str:
+    """月分区命名：<表名>_pYYYY_MM（与 migrations/0011 一致）"""
+    return f"{parent}_p{month:%Y_%m}"
+
+
+def add_months(month: date, n: int) -> date:
+    """月份加减，返回该月 1 日"""
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def list_month_partitions(session, parent: str) -> dict[date, str]:
+    """
+     列出父表当前挂载的月分区（不含默认分区）
+    :param session:
+    :param parent:
+    :return: {月份 1 日: 分区名}
+    """
+    rows = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": parent},
+    )
+    pattern = re.compile(rf"^{re.escape(parent)}_p(\d{{4}})_(\d{{2}})$")
+    partitions = {}
+    for (name,) in rows:
+        if m := pattern.match(name):
+            partitions[date(int(m.group(1)), int(m.group(2)), 1)] = name
+    return partitions
+
+
+async def create_month_partition(session, parent: str, month: date) -> None:
+    """
+     创建一个月分区；索引和约束由父表自动继承
+    默认分区中已有该月数据时 PostgreSQL 会报错，需要先把这些行搬出默认分区
+    """
+    await session.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(parent, month)}" PARTITION OF "{parent}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+
+async def fetch_partition_news(session, month: date, after_id: int | None, limit: int) -> list[dict]:
+    """
+     按 id 正序 keyset 翻页读取该月 news_item 分区中的新闻（分离前扣减汇总量用）
+    :return: [{"id", "item_id", "title", "cluster_method", "cluster_id"}]
+    """
+    part = partition_name("news_item", month)
+    rows = await session.execute(
+        text(
+            f'SELECT id, item_id, title, cluster_method, cluster_id FROM "{part}" '
+            "WHERE id > :after_id ORDER BY id LIMIT :limit"
+        ),
+        {"after_id": after_id if after_id is not None else -1, "limit": limit},
+    )
+    return [dict(r) for r in rows.mappings()]
+
+
+async def delete_related_of_partition(session, month: date) -> None:
+    """删除引用该月 news_item 分区中新闻的相关新闻记录（news_related 没有外键，不会级联）"""
+    part = partition_name("news_item", month)
+    await session.execute(text(
+        f'DELETE FROM news_related WHERE news_id IN (SELECT id FROM "{part}") '
+        f'OR related_id IN (SELECT id FROM "{part}")'
+    ))
+
+
+async def detach_month_partition(session, parent: str, month: date, archive_schema: str | None) -> str:
+    """
+     从父表分离一个月分区；archive_schema 为空时直接删除，否则移动到该 schema 保留
+    :return: 分区处理后的完整名称
+    """
+    name = partition_name(parent, month)
+    await session.execute(text(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"'))
+
+    if not archive_schema:
+        await session.execute(text(f'DROP TABLE "{name}"'))
+        return name
+
+    await session.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+    await session.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}"'))
+    return f"{archive_schema}.{name}"
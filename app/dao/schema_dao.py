@@ -0,0 +1,23 @@
+from sqlalchemy import select, insert
+
+from app.models import schema_migrations
+
+
+async def ensure_schema_migrations_table(conn) -> None:
+    """在调用方连接上创建迁移记录表（已存在时跳过）"""
+    await conn.run_sync(schema_migrations.create, checkfirst=True)
+
+
+async def fetch_applied_migrations(conn) -> dict[str, dict]:
+    """
+     已执行的迁移
+    :param conn:
+    :return: {version: {"version", "name", "checksum", "applied_at"}}
+    """
+    rows = (await conn.execute(select(schema_migrations).order_by(schema_migrations.c.version))).mappings().all()
+    return {r["version"]: dict(r) for r in rows}
+
+
+async def record_migration(conn, version: str, name: str, checksum: str) -> None:
+    """记录一条已执行的迁移"""
+    await conn.execute(insert(schema_migrations).values(version=version, name=name, checksum=checksum))
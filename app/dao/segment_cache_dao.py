@@ -0,0 +1,39 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db import AsyncSessionLocal
+from app.models import segment_cache
+
+
+async def fetch_segment_cache(hashes: list[bytes]) -> dict[bytes, list[str]]:
+    """
+     按内容哈希批量查询分词缓存（主键查找）
+    :param hashes:
+    :return: {content_hash: tokens}，未命中的哈希不在结果中
+    """
+    if not hashes:
+        return {}
+
+    stmt = select(segment_cache.c.content_hash, segment_cache.c.tokens).where(
+        segment_cache.c.content_hash.in_(hashes)
+    )
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(stmt)).all()
+
+    return {bytes(r.content_hash): list(r.tokens) for r in rows}
+
+
+async def save_segment_cache(entries: dict[bytes, list[str]]) -> None:
+    """
+     写入分词缓存（独立短事务；已存在的哈希直接跳过，并发写入同一标题不冲突）
+    :param entries: {content_hash: tokens}
+    :return:
+    """
+    if not entries:
+        return
+
+    rows = [{"content_hash": h, "tokens": tokens} for h, tokens in entries.items()]
+    stmt = insert(segment_cache).on_conflict_do_nothing(index_elements=["content_hash"])
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(stmt, rows)
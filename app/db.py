@@ -1,12 +1,18 @@
 import logging
 import re
 import ssl
+import time
+import uuid
 from typing import AsyncGenerator
 
+from sqlalchemy import event, make_url
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
+from .metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_WAIT_SECONDS, PIPELINE_STAGE_SECONDS
 
 # 获取日志器
 logger = logging.getLogger(__name__)
@@ -24,21 +30,82 @@ else:
     connect_args = {}
 
 
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """记录获取连接等待时间的连接池（池满时 _do_get 会阻塞到有连接归还或超时）"""
+
+    engine_label = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(engine=self.engine_label).observe(time.perf_counter() - start)
+
+
+def _statement_name() -> str:
+    # PgBouncer 事务池模式下同一个服务端连接会被不同客户端复用，预编译语句名必须全局唯一
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def _create_engine(url: str, label: str) -> AsyncEngine:
+    """
+     按 Settings 创建异步 Engine
+    - 默认关闭 pre_ping：不再每次借出连接都多一次往返；失效连接由 pool_recycle（小于服务端 / 负载均衡的
+      空闲超时）提前回收，执行时遇到断连错误 SQLAlchemy 会作废该连接，下次借出时重建
+    - LIFO：优先复用最近归还的连接，空闲连接自然老化后被 recycle，低峰期连接数随之回落
+    - DB_PGBOUNCER=true：关闭 asyncpg 与 SQLAlchemy 两级预编译语句缓存，语句名随机，兼容事务池模式
+    """
+    url = make_url(re.sub(r'^postgresql:', 'postgresql+asyncpg:', url))
+    args = dict(connect_args)
+
+    if settings.DB_PGBOUNCER:
+        args["statement_cache_size"] = 0
+        args["prepared_statement_name_func"] = _statement_name
+        url = url.update_query_dict({"prepared_statement_cache_size": "0"})
+    else:
+        # asyncpg 连接级语句缓存；SQLAlchemy 方言层的缓存使用同样的大小
+        args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+
+    new_engine = create_async_engine(
+        url,
+        # 根据环境决定是否打印SQL日志：开发/测试环境开启，生产环境关闭
+        echo=ENVIRONMENT in ["development", "dev", "testing", "test", "staging"],
+        pool_recycle=settings.DB_POOL_RECYCLE,      # 秒，连接最长存活时间，应小于服务端空闲超时
+        pool_pre_ping=settings.DB_POOL_PRE_PING,    # 借出前先执行一次检查（多一次往返，默认关闭）
+        pool_size=settings.DB_POOL_SIZE,            # 连接池中保持的常驻连接数
+        max_overflow=settings.DB_MAX_OVERFLOW,      # 超出pool_size后最多可创建的连接数
+        pool_timeout=settings.DB_POOL_TIMEOUT,      # 秒，从池中获取连接的超时时间
+        pool_use_lifo=settings.DB_POOL_USE_LIFO,
+        poolclass=type(f"{label.title()}QueuePool", (InstrumentedQueuePool,), {"engine_label": label}),
+        connect_args=args,
+    )
+
+    # 连接池指标在 /metrics 采集时读取
+    DB_POOL_CHECKED_OUT.labels(engine=label).set_function(lambda: new_engine.pool.checkedout())
+    DB_POOL_OVERFLOW.labels(engine=label).set_function(lambda: new_engine.pool.overflow())
+    return new_engine
+
+
 # --------------------------
 # 3. 创建异步 Engine
 # --------------------------
-engine = create_async_engine(
-    re.sub(r'^postgresql:', 'postgresql+asyncpg:', DATABASE_URL),
-    # 根据环境决定是否打印SQL日志：开发/测试环境开启，生产环境关闭
-    echo=ENVIRONMENT in ["development", "dev", "testing", "test", "staging"],
-    # 连接池配置：防止连接超时被服务器断开
-    pool_recycle=300,           # 秒，连接在池中存活时间，应小于数据库的wait_timeout
-    pool_pre_ping=True,         # 每次从池中取连接前执行简单SQL检查，确保连接有效
-    pool_size=5,                # 连接池中保持的常驻连接数
-    max_overflow=10,            # 超出pool_size后最多可创建的连接数
-    pool_timeout=30,            # 秒，从池中获取连接的超时时间
-    connect_args=connect_args
-)
+engine = _create_engine(DATABASE_URL, "primary")
+# 只读 Engine：配置了 DATABASE_READ_URL（只读副本）时单独建池，否则与主库共用
+read_engine = _create_engine(settings.DATABASE_READ_URL, "read") if settings.DATABASE_READ_URL else engine
+
+
+# 事务提交耗时（含提交前的 flush），计入流水线的 commit 阶段
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    session.info["commit_started"] = time.perf_counter()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if (started := session.info.pop("commit_started", None)) is not None:
+        PIPELINE_STAGE_SECONDS.labels(stage="commit").observe(time.perf_counter() - started)
 
 # 使用推荐的 async_sessionmaker 替代 sessionmaker
 AsyncSessionLocal = async_sessionmaker(
@@ -48,6 +115,15 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False  # 避免在复杂事务中自动flush可能引起的混乱
 )
 
+# 只读查询（搜索、相关新闻、趋势、簇浏览、新闻详情）使用的 session，可能有复制延迟，
+# 写入后需要立即读到的数据（作业认领、分词缓存、汇总同步等）仍使用 AsyncSessionLocal
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
 
 # --------------------------
 # 5. FastAPI 依赖注入函数
@@ -0,0 +1,78 @@
+"""
+Prometheus 指标定义，统一通过 /metrics 暴露
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Gauge, Histogram
+from starlette.requests import Request
+
+# 聚类流水线耗时（outcome: ok / timeout / cancelled / error）
+CLUSTER_PIPELINE_SECONDS = Histogram(
+    "news_cluster_pipeline_seconds",
+    "embedding_cluster_pipeline 执行耗时（秒）",
+    labelnames=("outcome",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+# HTTP 请求耗时（router: 路由所属模块；route: 路径模板，未匹配的请求统一记为 unmatched）
+HTTP_REQUEST_SECONDS = Histogram(
+    "news_http_request_seconds",
+    "HTTP 请求耗时（秒）",
+    labelnames=("router", "route", "method", "status"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# 提取流水线各阶段耗时
+# stage: dao_fetch / build_news_items / cluster / tokenize / tfidf / embed / upsert / commit
+PIPELINE_STAGE_SECONDS = Histogram(
+    "news_pipeline_stage_seconds",
+    "提取流水线各阶段耗时（秒）",
+    labelnames=("stage",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+# 数据库连接池（数值在采集时从连接池读取，见 db.py）
+DB_POOL_CHECKED_OUT = Gauge("news_db_pool_checked_out", "已借出的连接数", labelnames=("engine",))
+DB_POOL_OVERFLOW = Gauge("news_db_pool_overflow", "超出 pool_size 的连接数（负数表示池中尚有未创建的常驻连接）",
+                         labelnames=("engine",))
+DB_POOL_WAIT_SECONDS = Histogram(
+    "news_db_pool_wait_seconds",
+    "从连接池获取连接的等待时间（秒）",
+    labelnames=("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, 30),
+)
+
+# 分析任务执行器：已提交尚未完成的任务数，超过 worker 数的部分即排队深度
+EXECUTOR_PENDING_TASKS = Gauge("news_executor_pending_tasks", "执行器中已提交尚未完成的任务数")
+EXECUTOR_WORKERS = Gauge("news_executor_workers", "执行器 worker 数")
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """记录一个流水线阶段的耗时（异常时同样记录），可包裹 await 语句"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+async def http_metrics_middleware(request: Request, call_next):
+    """按路由记录请求耗时；路由模板在 call_next 之后才写入 scope"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        tags = getattr(route, "tags", None)
+        HTTP_REQUEST_SECONDS.labels(
+            router=tags[0] if tags else "-",
+            route=getattr(route, "path", "unmatched"),
+            method=request.method,
+            status=str(status),
+        ).observe(time.perf_counter() - start)
@@ -1,6 +1,11 @@
 from sqlalchemy import Table, Column, BigInteger, String, Date, Text, TIMESTAMP, MetaData, ForeignKey, JSON, \
-    UniqueConstraint, Boolean, Float
-from sqlalchemy.sql import func
+    UniqueConstraint, Boolean, Float, Index, PrimaryKeyConstraint, Integer, LargeBinary, ForeignKeyConstraint, \
+    SmallInteger, CheckConstraint
+from pgvector.sqlalchemy import Vector
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY, TSVECTOR, UUID
+from sqlalchemy.sql import func, false
+
+from .config import settings
 
 metadata = MetaData()
 
@@ -12,14 +17,19 @@ news_info = Table(
     Column("news_from", String(50), nullable=False),
     Column("news_date", Date, nullable=False),
     Column("data", JSON),
-    Column("created_at", TIMESTAMP(timezone=True)),
+    Column("created_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp()),
     Column("updated_at", TIMESTAMP(timezone=True)),
     Column("extracted", Boolean, nullable=False, server_default="false"),
     Column("extracted_at", TIMESTAMP(timezone=True), nullable=True),
     Column("error", Text, nullable=True),
+    # 作业认领租约与尝试次数（见 migrations/0015）
+    Column("claimed_until", TIMESTAMP(timezone=True), nullable=True),
+    Column("attempts", Integer, nullable=False, server_default="0"),
     UniqueConstraint("news_from", "news_date", name="uniq_news_info")
 )
 
+# news_item / news_keywords 按 published_at 月度范围分区（见 migrations/0011 与 app.cli partitions），
+# 主键 / 唯一约束都包含分区键；按日期过滤时直接比较 published_at 列，规划器才能裁剪分区
 news_item = Table(
     "news_item",
     metadata,
@@ -28,30 +38,231 @@ news_item = Table(
     Column("news_info_id", BigInteger, ForeignKey("news_info.id", ondelete="CASCADE")),
     Column("title", Text, nullable=False),
     Column("url", Text, nullable=False),
-    Column("published_at", Date),
+    Column("published_at", Date, primary_key=True),
     Column("source", String(50)),
     Column("content", Text),
     Column("cluster_method", Text, nullable=True),
     Column("cluster_id", BigInteger, nullable=True),
+    # 标题 LSA 向量（见 services.embedding_model），embedding_version 为生成它的模型版本
+    Column("embedding", Vector(settings.EMBEDDING_DIM), nullable=True),
+    Column("embedding_version", BigInteger, nullable=True),
+    # 标题全文索引：应用侧分词（wordfreq_cn）后以空格连接，to_tsvector('simple', ...) 生成
+    Column("title_tsv", TSVECTOR, nullable=True),
 
     # ⭐ 新增字段
     Column("extracted", Boolean, nullable=False, server_default="false"),
     Column("extracted_at", TIMESTAMP(timezone=True), nullable=True),
+    # 作业认领租约、尝试次数、最后一次失败的错误（见 migrations/0015）
+    Column("claimed_until", TIMESTAMP(timezone=True), nullable=True),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("error", Text, nullable=True),
 
     Column("created_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp()),
     Column("updated_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp()),
     UniqueConstraint("item_id", "published_at", name="uq_news_date"),
+    # 簇成员分页：(cluster_method, cluster_id) 过滤 + id 倒序 keyset
+    Index("ix_news_item_cluster", "cluster_method", "cluster_id", "id"),
+    # 删除 news_info 时的级联外键
+    Index("ix_news_item_news_info_id", "news_info_id"),
+    # 增量导出：按 (updated_at, id) keyset 扫描
+    Index("ix_news_item_updated_at", "updated_at", "id"),
+    # 相似新闻：HNSW 近似最近邻（余弦距离）
+    Index(
+        "ix_news_item_embedding_hnsw",
+        "embedding",
+        postgresql_using="hnsw",
+        postgresql_with={"m": 16, "ef_construction": 64},
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+    ),
+    # 混合搜索的全文匹配：title_tsv @@ tsquery
+    Index("ix_news_item_title_tsv", "title_tsv", postgresql_using="gin"),
+    postgresql_partition_by="RANGE (published_at)",
+)
+
+# 待提取积压数据的部分索引：只包含 extracted = false 的行，
+# 按 (created_at, id) 倒序做 keyset 翻页 / SKIP LOCKED 认领
+Index(
+    "ix_news_info_not_extracted",
+    news_info.c.created_at.desc(),
+    news_info.c.id.desc(),
+    postgresql_where=news_info.c.extracted == false(),
+)
+Index(
+    "ix_news_item_not_extracted",
+    news_item.c.created_at.desc(),
+    news_item.c.id.desc(),
+    postgresql_where=news_item.c.extracted == false(),
 )
 
 news_keywords = Table(
     "news_keywords",
     metadata,
     Column("id", BigInteger, primary_key=True, autoincrement=True),
-    Column("news_id",BigInteger,ForeignKey("news_item.id", ondelete="CASCADE"),nullable=False,),
+    Column("news_id", BigInteger, nullable=False),
+    # 所属新闻的 published_at（分区键），与 news_item 同月分区
+    Column("published_at", Date, primary_key=True),
     Column("keyword", Text, nullable=False),
+    # 归一化后的关键词（见 app.utils.normalize_keyword），搜索走该列的索引
+    Column("keyword_norm", Text, nullable=True),
     Column("weight", Float, nullable=True),
     Column("method", Text, nullable=False),
     Column("created_at",TIMESTAMP(timezone=True),server_default=func.current_timestamp(),nullable=False),
     Column("updated_at",TIMESTAMP(timezone=True),server_default=func.current_timestamp(),nullable=False),
-    UniqueConstraint("news_id", "keyword", "method", name="uq_news_keywords"),
-)
\ No newline at end of file
+    ForeignKeyConstraint(
+        ["news_id", "published_at"],
+        ["news_item.id", "news_item.published_at"],
+        name="news_keywords_news_id_fkey",
+        ondelete="CASCADE",
+    ),
+    UniqueConstraint("news_id", "keyword", "method", "published_at", name="uq_news_keywords"),
+    # 精确匹配：keyword_norm = ANY(...)；INCLUDE weight / method 使搜索聚合和相关新闻自连接可走 index-only scan
+    Index("ix_news_keywords_keyword_norm", "keyword_norm", "news_id", postgresql_include=["weight", "method"]),
+    # 子串匹配：pg_trgm GIN 索引，支持 ILIKE '%k%'
+    Index(
+        "ix_news_keywords_keyword_norm_trgm",
+        "keyword_norm",
+        postgresql_using="gin",
+        postgresql_ops={"keyword_norm": "gin_trgm_ops"},
+    ),
+    # 增量导出：按 (updated_at, id) keyset 扫描
+    Index("ix_news_keywords_updated_at", "updated_at", "id"),
+    postgresql_partition_by="RANGE (published_at)",
+)
+
+# 相关新闻：提取关键词时预计算每篇新闻的 top-N 相似新闻
+# news_item 分区后无法再被单列外键引用，归档分区时由 app.cli partitions detach 清理
+news_related = Table(
+    "news_related",
+    metadata,
+    Column("news_id", BigInteger, nullable=False),
+    Column("related_id", BigInteger, nullable=False),
+    Column("score", Float, nullable=False),
+    Column("updated_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+    PrimaryKeyConstraint("news_id", "related_id", name="pk_news_related"),
+    Index("ix_news_related_news_id_score", "news_id", "score"),
+    Index("ix_news_related_related_id", "related_id"),
+)
+
+# 后台作业（积压数据提取等），状态落库以便任意副本查询进度
+analysis_job = Table(
+    "analysis_job",
+    metadata,
+    Column("id", BigInteger, primary_key=True, autoincrement=True),
+    Column("kind", Text, nullable=False),
+    Column("status", Text, nullable=False, server_default="pending"),
+    Column("params", JSON),
+    Column("processed", BigInteger, nullable=False, server_default="0"),
+    Column("chunks", BigInteger, nullable=False, server_default="0"),
+    Column("error", Text, nullable=True),
+    Column("created_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+    Column("updated_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+    Column("started_at", TIMESTAMP(timezone=True), nullable=True),
+    Column("finished_at", TIMESTAMP(timezone=True), nullable=True),
+)
+
+# 关键词按天 / 来源汇总（趋势、词云、关键词排行的数据来源），提取关键词提交时增量更新
+keyword_daily_stats = Table(
+    "keyword_daily_stats",
+    metadata,
+    Column("day", Date, nullable=False),
+    Column("source", String(50), nullable=False, server_default=""),
+    Column("keyword", Text, nullable=False),
+    Column("doc_count", Integer, nullable=False, server_default="0"),
+    Column("weight_sum", Float, nullable=False, server_default="0"),
+    Column("updated_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+    PrimaryKeyConstraint("day", "source", "keyword", name="pk_keyword_daily_stats"),
+    # 进程内关键词索引按 updated_at 增量同步
+    Index("ix_keyword_daily_stats_updated_at", "updated_at"),
+)
+
+# 簇摘要（在线聚类），提取新闻items时增量维护，浏览接口不在查询时 GROUP BY news_item
+news_cluster_summary = Table(
+    "news_cluster_summary",
+    metadata,
+    Column("cluster_method", Text, nullable=False),
+    Column("cluster_id", BigInteger, nullable=False),
+    Column("size", BigInteger, nullable=False, server_default="0"),
+    # 代表新闻：分配时距质心最近的标题
+    Column("representative_item_id", Text, nullable=True),
+    Column("representative_title", Text, nullable=True),
+    Column("representative_url", Text, nullable=True),
+    Column("representative_distance", Float, nullable=True),
+    # 标题词频 {词: 次数}，只保留前 50 个
+    Column("top_keywords", JSONB, nullable=False, server_default="{}"),
+    Column("first_published_at", Date, nullable=True),
+    Column("last_published_at", Date, nullable=True),
+    Column("updated_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+    PrimaryKeyConstraint("cluster_method", "cluster_id", name="pk_news_cluster_summary"),
+    Index("ix_news_cluster_summary_size", "cluster_method", "size"),
+)
+
+# 分词结果缓存：按清洗后文本的内容哈希存放 wordfreq_cn 原始分词结果（未过滤停词），
+# 重复导入、重新聚类时相同标题不再调用 pkuseg
+segment_cache = Table(
+    "segment_cache",
+    metadata,
+    Column("content_hash", LargeBinary, primary_key=True),
+    Column("tokens", ARRAY(Text), nullable=False),
+    Column("created_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+)
+
+# 语料级 IDF 统计：已计入 DF 的新闻（保证重复处理只计一次）、各词的文档频率、文档总数（单行）
+idf_document = Table(
+    "idf_document",
+    metadata,
+    Column("news_id", BigInteger, primary_key=True),
+    Column("created_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+)
+
+idf_term = Table(
+    "idf_term",
+    metadata,
+    Column("term", Text, primary_key=True),
+    Column("doc_freq", BigInteger, nullable=False),
+)
+
+idf_corpus = Table(
+    "idf_corpus",
+    metadata,
+    Column("id", SmallInteger, primary_key=True, server_default="1"),
+    Column("n_docs", BigInteger, nullable=False, server_default="0"),
+    CheckConstraint("id = 1", name="ck_idf_corpus_single_row"),
+)
+
+# 在线聚类模型状态（见 migrations/0016 与 services.cluster_model），与新闻items在同一事务中加行锁更新
+cluster_model_state = Table(
+    "cluster_model_state",
+    metadata,
+    Column("cluster_method", Text, primary_key=True),
+    # n_clusters × n_features 的 float32 矩阵（行优先），首次拟合之前为 NULL
+    Column("centers", LargeBinary, nullable=True),
+    Column("counts", ARRAY(BigInteger), nullable=True),
+    Column("version", BigInteger, nullable=False, server_default="0"),
+    # 每次写入随机生成，用于校验进程内缓存的质心
+    Column("revision", UUID(as_uuid=False), nullable=True),
+    Column("updated_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+)
+
+# 在线聚类的预热缓冲区：首次拟合之前到达的新闻，首次拟合时补分配 cluster_id 后删除
+cluster_model_pending = Table(
+    "cluster_model_pending",
+    metadata,
+    Column("cluster_method", Text, nullable=False),
+    Column("item_id", Text, nullable=False),
+    Column("published_at", Date, nullable=False),
+    Column("title", Text, nullable=True),
+    Column("url", Text, nullable=True),
+    Column("title_tokens", ARRAY(Text), nullable=False),
+    Column("created_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+    PrimaryKeyConstraint("cluster_method", "item_id", "published_at", name="pk_cluster_model_pending"),
+)
+
+# 已执行的迁移（python -m app.cli migrate），checksum 用于发现执行后被修改的迁移文件
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Text, primary_key=True),
+    Column("name", Text, nullable=False),
+    Column("checksum", Text, nullable=False),
+    Column("applied_at", TIMESTAMP(timezone=True), server_default=func.current_timestamp(), nullable=False),
+)
@@ -1,15 +1,26 @@
-from datetime import date
+import os
+from datetime import date, timedelta
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Path, Query, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel, Field, field_validator
 
 from ..dao.news_info_dao import fetch_news_info_rows
 from ..dao.news_item_dao import fetch_news_item_rows_not_extracted
 from ..services import extract_keywords_task
+from ..config import settings
+from ..dao.job_dao import fetch_job_by_id
+from ..metrics import stage_timer
 from ..services.analysis_service import (
-    async_tfidf_top, build_news_item_from_news_info, embedding_cluster_pipeline,
+    async_tfidf_top, build_news_item_from_news_info, cluster_news_items, embed_news_items,
 )
+from ..services.export_service import EXPORT_TABLES, export_available
 from ..services.extract_news_service import extract_news_items_task
+from ..services.keyword_index import keyword_index
+from ..services.job_service import (
+    submit_job, JOB_EXTRACT_NEWS, JOB_EXTRACT_KEYWORDS, JOB_EMBED_NEWS, JOB_INDEX_TITLES, JOB_EXPORT_PARQUET,
+)
+from ..services.wordcloud_service import manifest, render_day
 
 router = APIRouter(prefix="/api/analysis")
 
@@ -41,26 +52,21 @@ async def extract_news_item_from_news_info(params: BaseQuery):
     """
 
     # 查询待处理的news_info
-    rows = await fetch_news_info_rows(params.start_date, params.end_date, limit=params.limit)
+    with stage_timer("dao_fetch"):
+        rows = await fetch_news_info_rows(params.start_date, params.end_date, limit=params.limit)
 
     if not rows:
         return {"status": "ok", "msgs": "no news_info to fetch"}
     # 数据转换
     news_items = build_news_item_from_news_info(rows)
-    # 生成embeddings + cluster
-    # 1. 获取title list
-    title_list = [item["title"] or "" for item in news_items]
-    # 2. 执行embeddings -> cluster pipeline
-    cluster_ids, cluster_method = embedding_cluster_pipeline(
-        title_list,
-        n_clusters=params.limit
-    )
-    # 3. 合并结果
-    for item, cid in zip(news_items, cluster_ids):
-        item["cluster_id"] = cid
-        item["cluster_method"] = cluster_method
-    # 执行提取news_item的事务作业
-    await extract_news_items_task(news_items)
+    # 生成embeddings + cluster（在线聚类的 cluster_id 在写入事务中分配）
+    try:
+        await cluster_news_items(news_items, n_clusters=params.limit)
+        await embed_news_items(news_items)
+        # 执行提取news_item的事务作业
+        await extract_news_items_task(news_items)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="聚类超时，请减小 limit 后重试")
     return {"status": "ok", "msgs": "news item extract success"}
 
 
@@ -91,147 +97,221 @@ async def extract_tfidf_top_keywords(params: TFIDFQuery):
     - **start_date**: 开始日期 (格式: YYYY-MM-DD)
     - **end_date**: 结束日期 (格式: YYYY-MM-DD)
     """
-    rows = await fetch_news_item_rows_not_extracted(params.start_date, params.end_date, limit=params.limit)
+    with stage_timer("dao_fetch"):
+        rows = await fetch_news_item_rows_not_extracted(params.start_date, params.end_date, limit=params.limit)
 
     if not rows:
         return {"status": "ok", "msgs": "no data to generate"}
 
-    tops = await async_tfidf_top(rows, top_n=params.top_k)
+    tops, doc_terms = await async_tfidf_top(rows, top_n=params.top_k)
     # 执行提取关键字的事务作业
-    await extract_keywords_task(tops)
+    await extract_keywords_task(tops, doc_terms)
     return {"status": "ok", "msgs": "generate success"}
 
 
-# class WordcloudQuery(TFIDFQuery):
-#     pass
-#
-#
-# @router.get("/wordcloud", summary="生成词云并返回图片 URL")
-# async def wordcloud(params: WordcloudQuery = Depends()):
-#     rows = await fetch_news_item_rows_not_extracted(params.start_date, params.end_date, limit=params.limit)
-#     corpus = await docs_to_corpus(rows)
-#     if not corpus:
-#         raise HTTPException(status_code=404, detail="No documents")
-#
-#     out = await async_generate_wordcloud(corpus)
-#     # return direct file or url path list
-#     return {"urls": out}
-#
-#
-# @router.post("/wordcloud/generate", summary="生成最新词云图")
-# async def generate_wordcloud(
-#     gene_date: str | None = Body(None),
-#     force: bool | None = Body(False),
-# ):
-#     # 1. 确定日期
-#     now_date = datetime.now()
-#     if gene_date is None:
-#         gene_date = now_date.strftime("%Y-%m-%d")
-#
-#     # 2. 如果已有文件且 force == False，则返回已有路径
-#     dir_path = os.path.join(settings.WORDCLOUD_DIR, gene_date)
-#     if os.path.exists(dir_path) and not force:
-#         image_path = _get_latest_wordcloud_file(gene_date)
-#         return {"status": "exists", "date": gene_date, "image_path": image_path}
-#
-#     # 3. 获取生成词云的数据
-#     rows = await fetch_news_item_rows_not_extracted(start_date=now_date.date(), end_date=now_date.date())
-#     corpus = await docs_to_corpus(rows)
-#
-#     # 4. 调用业务逻辑生成词云
-#     image_path = await async_generate_wordcloud(corpus)
-#
-#     return {"status": "ok", "date": gene_date, "image_path": image_path[0]}
-#
-#
-# # -------------------------
-# # 内部函数：返回最新文件
-# # -------------------------
-# def _get_latest_wordcloud_file(folder: str) -> str | None:
-#     """返回指定文件夹中修改时间最新的文件路径"""
-#
-#     wordcloud_pic_dir = os.path.join(settings.WORDCLOUD_DIR, folder)
-#
-#     if not os.path.exists(wordcloud_pic_dir):
-#         return None
-#     files_dir = [
-#         os.path.join(wordcloud_pic_dir, f) for f in os.listdir(wordcloud_pic_dir)
-#     ]
-#     files = [f for f in files_dir if os.path.isfile(f)]
-#     if not files:
-#         return None
-#     # 按修改时间排序
-#     latest_file = max(files, key=lambda f: os.path.getmtime(f))
-#     return latest_file
-#
-#
-# @router.get("/wordcloud/image", summary="获取词云图片（默认当天日期）")
-# async def wordcloud_image_default():
-#     """
-#     获取当天的词云图
-#     :return:
-#     """
-#     wordcloud_date = datetime.now().strftime("%Y-%m-%d")
-#     latest_file = _get_latest_wordcloud_file(wordcloud_date)
-#     if not latest_file:
-#         raise HTTPException(status_code=404, detail="当天没有可用词云图片")
-#     return FileResponse(latest_file, media_type="image/png")
-#
-#
-# def get_latest_date_folder():
-#     """
-#     获取最新更新的文件夹
-#     :return:
-#     """
-#     folders = []
-#     for name in os.listdir(settings.WORDCLOUD_DIR):
-#         if re.fullmatch(r"\d{4}-\d{2}-\d{2}", name):
-#             folders.append(name)
-#
-#     if not folders:
-#         return None
-#
-#     # 依赖日期格式排序即可
-#     return max(folders)
-#
-#
-# @router.get("/wordcloud/image/latest", summary="获取最新生成的词云图片")
-# async def wordcloud_image_latest():
-#     # 遍历 WORDCLOUD_DIR 下的日期子文件夹
-#     if not os.path.exists(settings.WORDCLOUD_DIR):
-#         raise HTTPException(status_code=404, detail="没有可用的词云图片")
-#
-#     latest_folder = get_latest_date_folder()
-#     if not latest_folder:
-#         raise HTTPException(status_code=404, detail="没有可用的词云图片")
-#
-#     # 找到所有文件夹下的最新文件
-#     latest_file = _get_latest_wordcloud_file(latest_folder)
-#
-#     if not latest_file:
-#         raise HTTPException(status_code=404, detail="没有可用的词云图片")
-#
-#     return FileResponse(latest_file, media_type="image/png")
-#
-#
-# @router.get("/wordcloud/image/{wordcloud_date}", summary="获取词云图片（指定日期）")
-# async def wordcloud_image_with_date(
-#     wordcloud_date: str = Path(..., description="日期，格式 YYYY-MM-DD")
-# ):
-#     """
-#     获取指定日期的词云图
-#     :param wordcloud_date:
-#     :return:
-#     """
-#     # 校验日期格式
-#     try:
-#         datetime.strptime(wordcloud_date, "%Y-%m-%d")
-#     except ValueError:
-#         raise HTTPException(status_code=422, detail="日期格式错误，必须为 YYYY-MM-DD")
-#
-#     latest_file = _get_latest_wordcloud_file(wordcloud_date)
-#     if not latest_file:
-#         raise HTTPException(
-#             status_code=404, detail=f"{wordcloud_date} 没有可用词云图片"
-#         )
-#     return FileResponse(latest_file, media_type="image/png")
+class JobQuery(BaseModel):
+    chunk_size: int = Field(settings.JOB_CHUNK_SIZE, ge=1, le=1000)
+    start_date: date | None = None
+    end_date: date | None = None
+
+    @field_validator("start_date", "end_date", mode="before")
+    @classmethod
+    def check_date_format(cls, v):
+        if v is None:
+            return v
+        try:
+            return date.fromisoformat(v)
+        except ValueError:
+            raise ValueError("日期格式错误，应为 YYYY-MM-DD")
+
+
+class KeywordsJobQuery(JobQuery):
+    top_k: int = Field(5, ge=1, le=10)
+
+
+@router.post("/jobs/extract_news", summary="后台提取全部待处理的新闻item")
+async def submit_extract_news_job(params: JobQuery):
+    """
+     创建后台作业，按 chunk_size 分块处理所有 extracted = false 的 news_info，返回作业 ID
+    """
+    job_id = await submit_job(JOB_EXTRACT_NEWS, params.model_dump(mode="json"))
+    return {"status": "ok", "job_id": job_id}
+
+
+@router.post("/jobs/extract_keywords", summary="后台提取全部待处理新闻的关键字")
+async def submit_extract_keywords_job(params: KeywordsJobQuery):
+    """
+     创建后台作业，按 chunk_size 分块处理所有 extracted = false 的 news_item，返回作业 ID
+    """
+    job_id = await submit_job(JOB_EXTRACT_KEYWORDS, params.model_dump(mode="json"))
+    return {"status": "ok", "job_id": job_id}
+
+
+class EmbedJobQuery(BaseModel):
+    chunk_size: int = Field(500, ge=1, le=5000)
+    refit: bool = False
+
+
+@router.post("/jobs/embed_news", summary="后台生成新闻标题向量")
+async def submit_embed_news_job(params: EmbedJobQuery):
+    """
+     向量模型尚未拟合（或 refit=true）时先用最新标题拟合，再为所有向量版本过期的 news_item 生成向量，返回作业 ID
+    """
+    job_id = await submit_job(JOB_EMBED_NEWS, params.model_dump(mode="json"))
+    return {"status": "ok", "job_id": job_id}
+
+
+class IndexTitlesJobQuery(BaseModel):
+    chunk_size: int = Field(1000, ge=1, le=5000)
+    rebuild: bool = False
+
+
+@router.post("/jobs/index_titles", summary="后台回填新闻标题全文索引")
+async def submit_index_titles_job(params: IndexTitlesJobQuery):
+    """
+     为尚未生成 title_tsv 的 news_item（rebuild=true 时为全部）生成标题全文索引，返回作业 ID
+    """
+    job_id = await submit_job(JOB_INDEX_TITLES, params.model_dump(mode="json"))
+    return {"status": "ok", "job_id": job_id}
+
+
+class ExportJobQuery(BaseModel):
+    chunk_size: int = Field(settings.EXPORT_BATCH_SIZE, ge=100, le=100000)
+    start_date: date | None = None
+    end_date: date | None = None
+    tables: list[str] = Field(default_factory=lambda: list(EXPORT_TABLES))
+    incremental: bool = False
+
+    @field_validator("tables")
+    @classmethod
+    def check_tables(cls, v: list[str]) -> list[str]:
+        unknown = set(v) - set(EXPORT_TABLES)
+        if unknown:
+            raise ValueError(f"unknown tables: {', '.join(sorted(unknown))}")
+        return v
+
+
+@router.post("/jobs/export_parquet", summary="后台导出 Parquet")
+async def submit_export_parquet_job(params: ExportJobQuery):
+    """
+     从只读库分批导出 news_item / news_keywords 到 EXPORT_DIR（按月分目录），返回作业 ID；
+    incremental=true 时只导出上次导出之后变更的行
+    """
+    if not export_available():
+        raise HTTPException(status_code=503, detail="服务端未安装 pyarrow，导出不可用")
+    job_id = await submit_job(JOB_EXPORT_PARQUET, params.model_dump(mode="json"))
+    return {"status": "ok", "job_id": job_id}
+
+
+@router.get("/jobs/{job_id}", summary="查询后台作业进度")
+async def get_job(job_id: int):
+    job = await fetch_job_by_id(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="作业不存在")
+    return job
+
+
+@router.get("/keywords/top", summary="日期范围内的高频关键词")
+async def keywords_top(
+        start_date: date | None = Query(None, description="开始日期，默认 end_date 前 6 天"),
+        end_date: date | None = Query(None, description="结束日期（含），默认今天"),
+        source: str | None = Query(None, description="只统计指定来源"),
+        limit: int = Query(20, ge=1, le=500),
+        metric: str = Query("weight", pattern="^(weight|count)$", description="排序依据：权重和 / 出现新闻数"),
+):
+    """
+     从进程内关键词索引聚合，不查询数据库；索引只保留最近 KEYWORD_INDEX_DAYS 天
+    """
+    if not keyword_index.loaded:
+        raise HTTPException(status_code=503, detail="关键词索引加载中，请稍后重试")
+
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=6)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date 不能晚于 end_date")
+
+    items = keyword_index.top(start_date, end_date, source, limit, metric)
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "total": len(items),
+        "items": items,
+    }
+
+
+class WordcloudGenerateQuery(BaseModel):
+    gene_date: date | None = None
+    force: bool = False
+
+    @field_validator("gene_date", mode="before")
+    @classmethod
+    def check_date_format(cls, v):
+        if v is None:
+            return v
+        try:
+            return date.fromisoformat(v)
+        except ValueError:
+            raise ValueError("日期格式错误，应为 YYYY-MM-DD")
+
+
+def _wordcloud_url(entry: dict) -> str:
+    # 文件名为内容哈希，/static 下的地址内容不可变，可以长期缓存
+    return f"/static/{os.path.relpath(settings.WORDCLOUD_DIR, settings.STATIC_DIR)}/{entry['file']}"
+
+
+@router.post("/wordcloud/generate", summary="生成词云图（默认当天）")
+async def generate_wordcloud(params: WordcloudGenerateQuery):
+    """
+     从关键词汇总表渲染指定日期的词云；关键词权重未变化且 force=false 时直接返回已有图片
+    """
+    gene_date = params.gene_date or date.today()
+    entry = await render_day(gene_date, force=params.force)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"{gene_date} 没有可用关键词")
+    return {"status": "ok", "date": gene_date.isoformat(), "url": _wordcloud_url(entry), "etag": entry["etag"]}
+
+
+def _wordcloud_response(request: Request, entry: dict) -> Response:
+    """带 ETag / Cache-Control 的图片响应，If-None-Match 命中时返回 304"""
+    etag = f'"{entry["etag"]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.WORDCLOUD_CACHE_MAX_AGE}",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    path = os.path.join(settings.WORDCLOUD_DIR, entry["file"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="词云图片不存在，请重新生成")
+    return FileResponse(
+        path,
+        media_type="image/png",
+        headers=headers,
+    )
+
+
+@router.get("/wordcloud/image", summary="获取词云图片（默认当天日期）")
+async def wordcloud_image_default(request: Request):
+    entry = manifest.get(date.today().isoformat())
+    if entry is None:
+        raise HTTPException(status_code=404, detail="当天没有可用词云图片")
+    return _wordcloud_response(request, entry)
+
+
+@router.get("/wordcloud/image/latest", summary="获取最新生成的词云图片")
+async def wordcloud_image_latest(request: Request):
+    latest = manifest.latest()
+    if latest is None:
+        raise HTTPException(status_code=404, detail="没有可用的词云图片")
+    return _wordcloud_response(request, latest[1])
+
+
+@router.get("/wordcloud/image/{wordcloud_date}", summary="获取词云图片（指定日期）")
+async def wordcloud_image_with_date(
+        request: Request,
+        wordcloud_date: date = Path(..., description="日期，格式 YYYY-MM-DD"),
+):
+    entry = manifest.get(wordcloud_date.isoformat())
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"{wordcloud_date} 没有可用词云图片")
+    return _wordcloud_response(request, entry)
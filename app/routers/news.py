@@ -1,27 +1,80 @@
-from collections import defaultdict
+from datetime import date
 
-from fastapi import APIRouter, Path, Query, HTTPException
+from fastapi import APIRouter, HTTPException, Path, Query
 from pydantic import BaseModel
-from sqlalchemy import select, and_
 
+from app.config import settings
+from app.dao.cluster_summary_dao import fetch_cluster_summaries, fetch_cluster_members
 from app.dao.news_item_dao import fetch_news_item_by_id
-from app.db import AsyncSessionLocal
-from app.models import news_keywords, news_item
+from app.dao.news_embedding_dao import fetch_similar_news
+from app.dao.news_related_dao import fetch_related_news
+from app.services.cluster_model import cluster_method as online_cluster_method
+from app.services.trending_service import get_trending_keywords
 
 router = APIRouter(prefix="/api/news")
 
 
+# 注意：固定路径的路由必须声明在 /{news_id} 之前，否则会被当作 news_id 匹配
+@router.get("/trending", summary="热点关键词")
+async def trending_news(
+        end_date: date | None = Query(None, description="当前窗口最后一天，默认今天"),
+        window_days: int = Query(1, ge=1, le=30, description="当前窗口天数"),
+        baseline_days: int = Query(7, ge=1, le=90, description="基线天数"),
+        limit: int = Query(20, ge=1, le=100),
+        source: str | None = Query(None, description="只统计指定来源"),
+):
+    """
+     按突发程度排序的热点关键词：当前窗口权重和 / 基线期日均权重 × 窗口天数（平滑后）
+    数据来自按天汇总表，结果缓存在进程内，关键词提交后后台刷新
+    """
+    end_date = end_date or date.today()
+    items = await get_trending_keywords(end_date, window_days, baseline_days, limit, source)
+    return {"end_date": end_date.isoformat(), "total": len(items), "items": items}
+
+
+@router.get("/cluster", summary="新闻聚类（簇摘要列表）")
+async def news_cluster(
+        cluster_method: str | None = Query(None, description="聚类方法，默认当前在线聚类模型"),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0),
+):
+    """
+     按簇大小倒序返回预计算的簇摘要：大小、代表标题、高频词、时间跨度
+    """
+    if cluster_method is None:
+        cluster_method = online_cluster_method()
+    items = await fetch_cluster_summaries(cluster_method, limit, offset)
+    return {"cluster_method": cluster_method, "items": items}
+
+
+@router.get("/cluster/{cluster_id}/items", summary="簇内新闻列表")
+async def news_cluster_items(
+        cluster_id: int = Path(..., description="簇 ID"),
+        cluster_method: str | None = Query(None, description="聚类方法，默认当前在线聚类模型"),
+        limit: int = Query(20, ge=1, le=100),
+        before_id: int | None = Query(None, description="上一页返回的 next_before_id"),
+):
+    if cluster_method is None:
+        cluster_method = online_cluster_method()
+    items = await fetch_cluster_members(cluster_method, cluster_id, limit, before_id)
+    next_before_id = items[-1]["id"] if len(items) == limit else None
+    return {"cluster_method": cluster_method, "items": items, "next_before_id": next_before_id}
+
+
 @router.get("/{news_id}")
-async def get_news_detail(news_id: str):
+async def get_news_detail(
+        news_id: str,
+        published_at: date | None = Query(None, description="新闻发布日期（搜索结果中的 published_at），传入时只查询所在月分区"),
+):
     # 返回新闻详情
-    return await fetch_news_item_by_id(news_id)
+    return await fetch_news_item_by_id(news_id, published_at)
 
 
 class RelatedNewsItem(BaseModel):
-    id: str
+    id: int
     title: str
     url: str
-    source: str
+    source: str | None
     published_at: str | None
     score: float
 
@@ -33,83 +86,23 @@ class RelatedNewsResponse(BaseModel):
 
 @router.get("/{news_id}/related", response_model=RelatedNewsResponse)
 async def get_related_news(
-        news_id: str = Path(..., description="目标新闻 ID"),
-        limit: int = Query(5, description="返回相关推荐数量")
+        news_id: int = Path(..., description="目标新闻 ID"),
+        limit: int = Query(5, ge=1, le=settings.RELATED_TOP_N, description="返回相关推荐数量")
+):
+    # 相关新闻在提取关键词时已预计算（news_related），这里只做一次索引查找
+    items = await fetch_related_news(news_id, limit)
+    return {"total": len(items), "items": items}
+
+
+@router.get("/{news_id}/similar", response_model=RelatedNewsResponse, summary="语义相似新闻")
+async def get_similar_news(
+        news_id: int = Path(..., description="目标新闻 ID"),
+        limit: int = Query(10, ge=1, le=100, description="返回数量"),
 ):
-    async with AsyncSessionLocal() as session:
-        # 1) 获取目标新闻关键词及权重
-
-        stmt = (select(news_keywords.c.keyword, news_keywords.c.weight))
-        conditions = [news_keywords.c.news_id == news_id]
-        stmt = stmt.where(and_(*conditions))
-
-        target_result = await session.execute(stmt)
-
-        target_keywords = {r.keyword: r.weight for r in target_result.all()}
-        if not target_keywords:
-            raise HTTPException(status_code=404, detail="目标新闻关键词不存在")
-
-        # 2) 获取其他新闻关键词及权重
-        stmt = select(
-            news_keywords.c.news_id,
-            news_keywords.c.keyword,
-            news_keywords.c.weight
-        )
-        conditions1 = [news_keywords.c.news_id == news_id]
-        stmt = stmt.where(and_(*conditions1))
-        rows = (await session.execute(stmt)).all()
-
-        if not rows:
-            return {"total": 0, "items": []}
-
-        # 3) 在 Python 中计算重叠权重相似度
-        score_map = defaultdict(float)
-        for r in rows:
-            if r.keyword in target_keywords:
-                score_map[r.news_id] += min(target_keywords[r.keyword], r.weight)
-
-        if not score_map:
-            return {"total": 0, "items": []}
-
-        # 4) 取相似度最高的 top N
-        top_news_ids = sorted(score_map.items(), key=lambda x: x[1], reverse=True)[:limit]
-        related_ids = [nid for nid, _ in top_news_ids]
-        score_map = dict(top_news_ids)
-
-        # 5) 回表查询新闻详情
-        news_rows = (await session.execute(
-            select(
-                news_item.c.id,
-                news_item.c.title,
-                news_item.c.url,
-                news_item.c.source,
-                news_item.c.published_at
-            ).where(news_item.c.id.in_(related_ids))
-        )).all()
-
-        # 6) 组合结果
-        items = []
-        for r in news_rows:
-            items.append(RelatedNewsItem(
-                id=r.id,
-                title=r.title,
-                url=r.url,
-                source=r.source,
-                published_at=r.published_at.isoformat() if r.published_at else None,
-                score=score_map.get(r.id, 0)
-            ))
-
-        # 保证按 score 排序
-        items.sort(key=lambda x: x.score, reverse=True)
-
-        return {"total": len(items), "items": items}
-
-@router.get("/trending")
-async def trending_news():
-    # 返回热点关键词或热门新闻
-    pass
-
-@router.get("/cluster")
-async def news_cluster():
-    # 返回新闻聚类 / 主题
-    pass
+    """
+     基于标题向量（LSA）的近似最近邻检索，score 为余弦相似度
+    """
+    items = await fetch_similar_news(news_id, limit)
+    if items is None:
+        raise HTTPException(status_code=404, detail="新闻不存在或尚未生成向量")
+    return {"total": len(items), "items": items}
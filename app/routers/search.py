@@ -1,8 +1,11 @@
-import wordfreq_cn
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, HTTPException
 from pydantic import BaseModel
 
 from app.dao import fetch_news_item_by_keywords
+from app.dao.news_item_dao import decode_search_cursor
+from app.config import settings
+from app.services.search_cache import search_cache
+from app.services.segmenter import segment_query
 
 router = APIRouter(prefix="/api/search")
 
@@ -10,19 +13,34 @@ router = APIRouter(prefix="/api/search")
 class SearchResponse(BaseModel):
     total: int
     items: list[dict]
+    next_cursor: str | None = None
 
 
 @router.get("/news", response_model=SearchResponse)
 async def search_news(
         q: str = Query(...),
-        limit: int = 20,
-        offset: int = 0,
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0, description="兼容旧翻页方式，建议改用 cursor"),
+        cursor: str | None = Query(None, description="上一页返回的 next_cursor"),
 ):
-    keywords = wordfreq_cn.segment_text(q)
+    keywords = list(segment_query(q.strip()))
 
     if not keywords:
         return SearchResponse(total=0, items=[])
 
-    items = await fetch_news_item_by_keywords(keywords, limit, offset)
-
-    return SearchResponse(total=len(items), items=items)
+    after = None
+    if cursor:
+        try:
+            after = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="cursor 格式错误")
+
+    result = await search_cache.get_or_load(
+        keywords,
+        # 传入 cursor 时 offset 被忽略，不参与缓存键
+        {"limit": limit, "offset": 0 if cursor else offset, "cursor": cursor,
+         "substring": settings.SEARCH_SUBSTRING_MATCH},
+        lambda primary: fetch_news_item_by_keywords(keywords, limit, offset, after=after, primary=primary),
+    )
+
+    return SearchResponse(**result)
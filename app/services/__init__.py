@@ -7,7 +7,8 @@ from .analysis_service import (
     docs_to_corpus,
     async_tfidf_top,
     async_generate_wordcloud,
-    embedding_cluster_pipeline
+    embedding_cluster_pipeline,
+    async_embedding_cluster_pipeline,
 )
 from .extract_news_service import extract_keywords_task
 
@@ -16,5 +17,6 @@ __all__ = [
     "async_tfidf_top",
     "async_generate_wordcloud",
     "extract_keywords_task",
-    "embedding_cluster_pipeline"
+    "embedding_cluster_pipeline",
+    "async_embedding_cluster_pipeline",
 ]
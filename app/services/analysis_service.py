@@ -1,86 +1,109 @@
 import os
-from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-from wordfreq_cn import generate_trend_wordcloud, extract_keywords_tfidf_per_doc
+from wordfreq_cn import generate_trend_wordcloud
 
+from .executor import run_cpu_bound
+from .idf_model import IdfModel, extract_top_keywords
+from .segmenter import tokenize_batch
 from ..config import settings
-from ..utils.cleaner import clean_html
-
-executor = ThreadPoolExecutor(max_workers=2)
+from ..metrics import stage_timer
+from ..utils.cleaner import clean_html_batch
 
 
 # Helper to fetch documents from DB
+def flatten_news_info(rows: list[dict[str, Any]]) -> dict[str, list]:
+    """
+     将 news_info 行中嵌套的 data["items"] 一次性展开为列式结构（每个字段一个等长列表），
+    后续清洗、分词、构建 news_item 都按列批量处理，不再逐条访问嵌套 dict
+    :param rows: news_info 行（id, name, news_date, data）
+    :return: {"item_id", "news_info_id", "title", "hover", "url", "published_at", "source"}
+    """
+    columns: dict[str, list] = {
+        "item_id": [], "news_info_id": [], "title": [], "hover": [], "url": [], "published_at": [], "source": [],
+    }
+    item_id, news_info_id, title, hover, url, published_at, source = columns.values()
+
+    for row in rows:
+        data = row.get("data")
+        items = data.get("items") if isinstance(data, dict) else None
+        if not items:
+            continue
+
+        items = [item for item in items if isinstance(item, dict)]
+        n = len(items)
+        # 行级字段整段扩展，不逐条赋值
+        news_info_id.extend([row.get("id")] * n)
+        published_at.extend([row.get("news_date")] * n)
+        source.extend([row.get("name", "")] * n)
+
+        for item in items:
+            item_id.append(str(item.get("id", "")))
+            title.append(item.get("title") or "")
+            url.append(item.get("url", ""))
+            extra = item.get("extra")
+            hover.append((extra.get("hover") or "") if isinstance(extra, dict) else "")
+
+    return columns
+
+
 async def docs_to_corpus(rows: list[dict[str, Any]]) -> dict[str, list[str]]:
     from collections import defaultdict
 
+    columns = flatten_news_info(rows)
+    texts = clean_html_batch(f"{t} {h}" for t, h in zip(columns["title"], columns["hover"]))
+
     corpus = defaultdict(list)  # 自动初始化不存在的键
-    for r in rows:
-        data = r.get("data", {})
-        news_date = r.get("news_date", "")
-
-        for item in data.get("items", []):
-            title = item.get("title", "") if isinstance(item, dict) else ""
-            hover = ""
-            if isinstance(item, dict):
-                extra = item.get("extra", {})
-                hover = extra.get("hover", "") if isinstance(extra, dict) else ""
-
-            text = f"{title} {hover}"
-            text = clean_html(text)
-
-            # 直接添加到对应日期的列表中
-            corpus[news_date].append(text)
+    for news_date, text in zip(columns["published_at"], texts):
+        # 直接添加到对应日期的列表中
+        corpus[news_date or ""].append(text)
     return corpus
 
 
 def compute_tfidf_top(
         corpus: list[dict],
         top_n: int = 5,
-        max_features: int = None
+        idf_model: IdfModel | None = None,
 ) -> list[dict]:
     """
-    对每条新闻提取 top_n 关键词（per-document TF-IDF）。
-    依赖 extract_keywords_tfidf 返回的:
-        - vectorizer
-        - matrix (n_docs x n_features)
-        - feature_names
+    对每条新闻提取 top_n 关键词（per-document TF-IDF，同步、不访问数据库）。
+    线上提取走 async_tfidf_top（IDF 来自数据库中的语料级 DF）；
+    这里的 IDF 来自传入的模型，未传入时以本批自身统计 DF（基准测试等离线场景）。
     """
     if not corpus:
         return []
 
-    # 1. 提取文本（content 为空时使用 title）
-    news_ids = [item.get("id", "") for item in corpus]
+    # 1. 提取文本（使用 title）并分词
+    docs = tokenize_batch(_corpus_titles(corpus))
 
-    texts = [
-        item.get("title", "").strip()
-        for item in corpus
-    ]
+    # 2. 计算每篇新闻 top_n 的 TF-IDF
+    if idf_model is None:
+        idf_model = IdfModel()
+        idf_model.partial_fit(docs)
+    per_doc_keywords = [idf_model.top_k(tokens, top_n) for tokens in docs]
+
+    # 3. Flatten → List[NewsKeywordsDTO]
+    return _flatten_keywords(corpus, per_doc_keywords)
 
-    # 避免空文本导致 vectorizer 报错
-    texts = [t if t else " " for t in texts]
 
-    # 2. 每篇新闻 top_n 的 TF-IDF
-    per_doc_keywords = extract_keywords_tfidf_per_doc(
-        corpus=texts,
-        top_k=top_n,
-        max_features=max_features
-    )
+def _corpus_titles(corpus: list[dict]) -> list[str]:
+    return [(item.get("title") or "").strip() for item in corpus]
 
-    # 3. Flatten → List[NewsKeywordsDTO]
-    results = [
+
+def _flatten_keywords(corpus: list[dict], per_doc_keywords: list[list[tuple[str, float]]]) -> list[dict]:
+    return [
         {
-            "news_id": news_id,
-            "keyword": kw.word,
-            "weight": kw.weight,
+            "news_id": item.get("id", ""),
+            # 分区键，写入时直接使用，不必再回查 news_item
+            "published_at": item.get("published_at"),
+            "keyword": word,
+            "weight": weight,
             "method": "tfidf"
         }
-        for news_id, kws in zip(news_ids, per_doc_keywords)
-        for kw in kws
+        for item, kws in zip(corpus, per_doc_keywords)
+        for word, weight in kws
     ]
 
-    return results
-
 
 def generate_wordcloud(
     corpus: dict[str, list[str]], out_path: str, max_words: int | None = 200
@@ -89,30 +112,30 @@ def generate_wordcloud(
 
 
 def build_news_item_from_news_info(news: list[dict]) -> list[dict]:
-    """从嵌套新闻数据中构建扁平化条目信息"""
-    result = []
-
-    for news_item in news:
-        if not (data := news_item.get("data")):
-            continue
+    """从嵌套新闻数据中构建扁平化条目信息（基于 flatten_news_info 的列式结果）"""
+    with stage_timer("build_news_items"):
+        return _build_news_items(flatten_news_info(news))
 
-        # 提取data中重复使用的字段
-        news_info_id = news_item.get("id")
-        published_at = news_item.get("news_date", None)
-        source = news_item.get("name", "")
 
-        # 遍历items并构建结果
-        for item in data.get("items", []):
-            result.append({
-                "item_id": str(item.get("id", "")),
-                "news_info_id": news_info_id,
-                "title": item.get("title", ""),
-                "url": item.get("url", ""),
-                "published_at": published_at,
-                "source": source,
-            })
-
-    return result
+def _build_news_items(columns: dict[str, list]) -> list[dict]:
+    return [
+        {
+            "item_id": item_id,
+            "news_info_id": news_info_id,
+            "title": title,
+            "url": url,
+            "published_at": published_at,
+            "source": source,
+        }
+        for item_id, news_info_id, title, url, published_at, source in zip(
+            columns["item_id"],
+            columns["news_info_id"],
+            columns["title"],
+            columns["url"],
+            columns["published_at"],
+            columns["source"],
+        )
+    ]
 
 
 def build_news_item_from_news_info1(news: list[dict]) -> list[dict]:
@@ -137,21 +160,166 @@ def build_news_item_from_news_info1(news: list[dict]) -> list[dict]:
 
 # Public coroutine wrappers
 import asyncio
+import time
+from typing import Awaitable, TypeVar
 
+from .cluster_model import OnlineClusterModel, assign_clusters, fit_clusters
+from .embedding_model import embed
+from .segment_cache import tokenize_cached
+from ..metrics import CLUSTER_PIPELINE_SECONDS
 
-async def async_tfidf_top(corpus: list[dict], top_n: int = 5, max_features: int = None):
-    loop = asyncio.get_running_loop()  # 应用于CPU密集型
-    return await loop.run_in_executor(
-        executor, compute_tfidf_top, corpus, top_n, max_features
-    )
+T = TypeVar("T")
+
+
+async def async_tfidf_top(corpus: list[dict], top_n: int = 5) -> tuple[list[dict], dict[int, list[str]]]:
+    """
+     提取每条新闻 top_n 关键词：
+    分词（最耗 CPU）先查分词缓存，未命中的切块后交给执行器并行处理；IDF 取数据库中的语料级 DF
+    :return: (关键词行，{news_id: 分词结果})；后者交给 save_extracted_keywords，与关键词在同一事务中合并进 DF
+    """
+    if not corpus:
+        return [], {}
+
+    with stage_timer("tokenize"):
+        docs = await tokenize_cached(_corpus_titles(corpus))
+    news_ids = [item["id"] for item in corpus]
+    with stage_timer("tfidf"):
+        per_doc_keywords = await extract_top_keywords(docs, news_ids, top_n)
+    return _flatten_keywords(corpus, per_doc_keywords), dict(zip(news_ids, docs))
 
 
 async def async_generate_wordcloud(
     corpus: dict[str, list[str]], file_dir: str | None = ""
 ) -> list[str]:
     out_path = os.path.join(settings.WORDCLOUD_DIR, file_dir)
-    # 应用于文件I/O
-    return await asyncio.to_thread(generate_wordcloud, corpus, out_path)
+    # 分词 + 渲染均为 CPU 密集型
+    return await run_cpu_bound(generate_wordcloud, corpus, out_path)
+
+
+async def _observe_cluster(awaitable: Awaitable[T], timeout: float | None) -> T:
+    """
+     聚类任务统一的超时控制与耗时统计
+
+    - timeout: 超时秒数，默认 settings.CLUSTER_TIMEOUT_SECONDS，超时抛出 TimeoutError
+    - 取消：协程被取消（或超时）时，尚未开始执行的任务会从执行器队列中撤销；
+      已在 worker 中运行的任务无法中断，会在后台执行完毕后丢弃结果
+    """
+    if timeout is None:
+        timeout = settings.CLUSTER_TIMEOUT_SECONDS
+
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await asyncio.wait_for(awaitable, timeout=timeout)
+        outcome = "ok"
+        return result
+    except TimeoutError:
+        outcome = "timeout"
+        raise
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        CLUSTER_PIPELINE_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - start)
+
+
+async def async_embedding_cluster_pipeline(
+        texts: list[str],
+        n_clusters: int = 50,
+        timeout: float | None = None,
+) -> tuple[list[int], str]:
+    """
+     embedding_cluster_pipeline 的异步版本，在执行器中运行，不阻塞事件循环（超时与取消见 _observe_cluster）
+    """
+    return await _observe_cluster(
+        run_cpu_bound(embedding_cluster_pipeline, texts, n_clusters),
+        timeout,
+    )
+
+
+async def async_online_cluster(
+        model: OnlineClusterModel,
+        docs: list[list[str]],
+        learn: list[bool],
+        timeout: float | None = None,
+) -> tuple[list[int | None], list[float | None], OnlineClusterModel | None]:
+    """
+     在线聚类：按最近质心分配稳定的 cluster_id，并算出增量更新后的模型（见 cluster_model.assign_clusters），
+    在执行器中运行；在写入新闻items的事务中调用，模型状态随事务提交（超时与取消见 _observe_cluster）
+    """
+    with stage_timer("cluster"):
+        return await _observe_cluster(run_cpu_bound(assign_clusters, model, docs, learn), timeout)
+
+
+async def async_fit_online_cluster(
+        docs: list[list[str]],
+        timeout: float | None = None,
+) -> tuple[OnlineClusterModel, list[int], list[float]]:
+    """
+     用预热缓冲区中的样本首次拟合在线聚类模型（见 cluster_model.fit_clusters）
+    """
+    with stage_timer("cluster"):
+        return await _observe_cluster(
+            run_cpu_bound(fit_clusters, docs, settings.CLUSTER_N_CLUSTERS, settings.CLUSTER_N_FEATURES),
+            timeout,
+        )
+
+
+async def cluster_news_items(news_items: list[dict], n_clusters: int = 50) -> None:
+    """
+     对新闻items聚类，并把 cluster_id / cluster_method 写回每个 item
+    - CLUSTER_MODE=online：只做标题分词（写回 title_tokens）；cluster_id 由写入新闻items的事务
+      按数据库中的模型状态分配（见 extract_news_service.save_extracted_news_items），跨批次、跨副本稳定
+    - CLUSTER_MODE=batch：每批重新拟合 TF-IDF + KMeans，n_clusters 为本批簇数
+    超时抛出 TimeoutError
+    """
+    if settings.CLUSTER_MODE == "online":
+        await prepare_title_tokens(news_items)
+        return
+
+    # 1. 获取title list
+    title_list = [item["title"] or "" for item in news_items]
+    # 2. 执行embeddings -> cluster pipeline
+    with stage_timer("cluster"):
+        cluster_ids, cluster_method = await async_embedding_cluster_pipeline(
+            title_list,
+            n_clusters=n_clusters
+        )
+    # 3. 合并结果
+    for item, cid in zip(news_items, cluster_ids):
+        item["cluster_id"] = cid
+        item["cluster_method"] = cluster_method
+
+
+async def prepare_title_tokens(news_items: list[dict]) -> None:
+    """
+     为缺少 title_tokens 的新闻items补充标题分词结果（已分词的直接复用），
+    供在线聚类、标题向量和全文索引（见 update_news_item_title_tsv）共用
+    """
+    missing = [item for item in news_items if item.get("title_tokens") is None]
+    if not missing:
+        return
+
+    with stage_timer("tokenize"):
+        docs = await tokenize_cached([item["title"] or "" for item in missing])
+    for item, tokens in zip(missing, docs):
+        item["title_tokens"] = tokens
+
+
+async def embed_news_items(news_items: list[dict]) -> None:
+    """
+     为新闻items生成标题向量，写回 embedding / embedding_version（写库见 update_news_item_embeddings）
+    同时补齐 title_tokens；向量模型尚未拟合时只做分词
+    """
+    if not news_items:
+        return
+
+    await prepare_title_tokens(news_items)
+    with stage_timer("embed"):
+        vectors, version = await run_cpu_bound(embed, [item["title_tokens"] for item in news_items])
+    for item, vector in zip(news_items, vectors):
+        item["embedding"] = vector
+        item["embedding_version"] = version
 
 
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -0,0 +1,195 @@
+import logging
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from ..config import settings
+from ..dao.cluster_model_dao import fetch_cluster_model_centers, save_cluster_model_state
+
+logger = logging.getLogger(__name__)
+
+# 模型状态格式版本，体现在 cluster_method 中；状态移入数据库（migrations/0016）后从头开始积累，
+# 与旧的文件模型的簇分配互不混淆
+METHOD_VERSION = 2
+
+
+def _identity(tokens: list[str]) -> list[str]:
+    """HashingVectorizer 的 analyzer：输入已经是分好词的 token 列表"""
+    return tokens
+
+
+def cluster_method() -> str:
+    """当前配置下在线聚类模型的 cluster_method（簇数 / 维度变化时即为新模型）"""
+    return f"hashing-{settings.CLUSTER_N_FEATURES}-online-kmeans-{settings.CLUSTER_N_CLUSTERS}-v{METHOD_VERSION}"
+
+
+def _vectorize(docs: list[list[str]], n_features: int):
+    vectorizer = HashingVectorizer(
+        analyzer=_identity,
+        n_features=n_features,
+        alternate_sign=False,
+        norm="l2",
+    )
+    return vectorizer.transform(docs)
+
+
+class OnlineClusterModel:
+    """
+    在线聚类模型，状态（质心、各簇样本数）保存在数据库中，与新闻items在同一事务中更新（见 cluster_model_dao）
+
+    - 特征空间：HashingVectorizer（无状态，维度固定），不同批次的向量可直接比较；
+      质心是 n_clusters × n_features 的 float32 矩阵，n_features 默认 2**12（200 个簇约 3.3 MB）
+    - 增量更新：质心为分配给它的样本的累计均值（即 MiniBatchKMeans 的小批量更新，不做低频簇重分配），
+      cluster_id 即质心下标，跨批次稳定
+    - 首次拟合需要至少 n_clusters 条样本，之前的样本先进入数据库中的预热缓冲区
+    - 对象不原地修改：assign 返回更新后的新模型，事务回滚时进程内的旧模型仍然有效
+    """
+
+    def __init__(self, centers: np.ndarray, counts: np.ndarray):
+        self.centers = centers
+        self.counts = counts
+
+    @property
+    def n_clusters(self) -> int:
+        return self.centers.shape[0]
+
+    @property
+    def n_features(self) -> int:
+        return self.centers.shape[1]
+
+    @classmethod
+    def fit(cls, docs: list[list[str]], n_clusters: int, n_features: int,
+            random_state: int = 42) -> tuple["OnlineClusterModel", np.ndarray, np.ndarray]:
+        """
+         用预热样本首次拟合
+        :return: (模型, 各样本的 cluster_id, 到质心的距离)
+        """
+        X = _vectorize(docs, n_features)
+        kmeans = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=256,
+            random_state=random_state,
+            n_init=3,
+        ).fit(X)
+        model = cls(
+            kmeans.cluster_centers_.astype(np.float32),
+            np.bincount(kmeans.labels_, minlength=n_clusters).astype(np.int64),
+        )
+        labels, distances = model._predict(X)
+        return model, labels, distances
+
+    def _predict(self, X) -> tuple[np.ndarray, np.ndarray]:
+        """最近质心及欧氏距离：||x||² - 2·x·c + ||c||²"""
+        sq_norms = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+        d2 = sq_norms[:, None] - 2 * np.asarray(X @ self.centers.T) + (self.centers ** 2).sum(axis=1)[None, :]
+        labels = d2.argmin(axis=1)
+        distances = np.sqrt(np.maximum(d2[np.arange(len(labels)), labels], 0))
+        return labels, distances
+
+    def _updated(self, X, labels: np.ndarray) -> "OnlineClusterModel":
+        centers = self.centers.copy()
+        counts = self.counts.copy()
+        for label in np.unique(labels):
+            mask = labels == label
+            n = int(mask.sum())
+            counts[label] += n
+            centers[label] += (np.asarray(X[mask].sum(axis=0)).ravel() - n * centers[label]) / counts[label]
+        return OnlineClusterModel(centers, counts)
+
+    def assign(
+            self,
+            docs: list[list[str]],
+            learn: list[bool],
+    ) -> tuple[list[int | None], list[float | None], "OnlineClusterModel | None"]:
+        """
+         为已分词的文档分配最近的质心，learn 为真的文档再用于增量更新质心
+        :param docs: 已分词文档
+        :param learn: 与 docs 一一对应；此前已按当前模型分配过的新闻（重新提取）只分配不计数
+        :return: (cluster_ids, distances, 更新后的模型)；空文档为 None，没有要计入的文档时模型为 None
+        """
+        cluster_ids: list[int | None] = [None] * len(docs)
+        distances: list[float | None] = [None] * len(docs)
+        non_empty = [i for i, tokens in enumerate(docs) if tokens]
+        if not non_empty:
+            return cluster_ids, distances, None
+
+        X = _vectorize([docs[i] for i in non_empty], self.n_features)
+        labels, dists = self._predict(X)
+        for i, label, distance in zip(non_empty, labels.tolist(), dists.tolist()):
+            cluster_ids[i] = label
+            distances[i] = distance
+
+        mask = np.array([learn[i] for i in non_empty])
+        if not mask.any():
+            return cluster_ids, distances, None
+        return cluster_ids, distances, self._updated(X[mask], labels[mask])
+
+    def clusters(self) -> list[dict]:
+        """按累计样本数倒序返回已分配过样本的簇"""
+        order = np.argsort(-self.counts)
+        return [
+            {"cluster_id": int(i), "size": int(self.counts[i])}
+            for i in order
+            if self.counts[i] > 0
+        ]
+
+
+def fit_clusters(
+        docs: list[list[str]],
+        n_clusters: int,
+        n_features: int,
+) -> tuple[OnlineClusterModel, list[int], list[float]]:
+    """
+     首次拟合（供执行器调用）
+    :return: (模型, cluster_ids, distances)
+    """
+    model, labels, distances = OnlineClusterModel.fit(docs, n_clusters, n_features)
+    return model, labels.tolist(), distances.tolist()
+
+
+def assign_clusters(
+        model: OnlineClusterModel,
+        docs: list[list[str]],
+        learn: list[bool],
+) -> tuple[list[int | None], list[float | None], OnlineClusterModel | None]:
+    """
+     OnlineClusterModel.assign 的模块级入口（供执行器调用）
+    进程池模式下模型随任务发送（200 个簇 × 4096 维约 3.3 MB），更新后的模型随结果返回
+    """
+    return model.assign(docs, learn)
+
+
+# 进程内缓存最近读到 / 写入的模型：{cluster_method: (revision, model)}，
+# revision 与状态行一致时不再重新读取质心（事务回滚后状态行的 revision 不会与缓存相同）
+_cache: dict[str, tuple[str, OnlineClusterModel]] = {}
+
+
+async def load_cluster_model(session, method: str, state: dict) -> OnlineClusterModel | None:
+    """
+     读取已锁定的模型状态（见 lock_cluster_model_state）
+    :param state: lock_cluster_model_state 的返回值
+    :return: 尚未首次拟合时为 None
+    """
+    if not state["fitted"]:
+        return None
+
+    cached = _cache.get(method)
+    if cached and cached[0] == state["revision"]:
+        return cached[1]
+
+    centers, counts = await fetch_cluster_model_centers(session, method)
+    model = OnlineClusterModel(
+        np.frombuffer(centers, dtype=np.float32).reshape(settings.CLUSTER_N_CLUSTERS, settings.CLUSTER_N_FEATURES),
+        np.array(counts, dtype=np.int64),
+    )
+    _cache[method] = (state["revision"], model)
+    return model
+
+
+async def store_cluster_model(session, method: str, model: OnlineClusterModel) -> None:
+    """在调用方事务中写入模型状态（须已锁定状态行）"""
+    revision = await save_cluster_model_state(
+        session, method, model.centers.astype(np.float32).tobytes(), model.counts.tolist(),
+    )
+    _cache[method] = (revision, model)
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import Counter
+
+import joblib
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from .idf_model import IdfModel
+from ..config import settings
+
+
+class EmbeddingModel:
+    """
+    新闻标题稠密向量（LSA）
+
+    - 词表与 idf 取自拟合时数据库中语料 DF（见 idf_model）最高的 max_terms 个词的快照，
+      之后 DF 继续增量更新也不影响已有向量的空间
+    - TF-IDF（L2 归一化）→ TruncatedSVD 投影到 dim 维 → 再次 L2 归一化，pgvector 中按余弦距离检索
+    - version 为拟合时间戳，重新拟合后旧版本的向量需要重新计算（见 JOB_EMBED_NEWS）
+    """
+
+    FORMAT = 1
+
+    def __init__(self, vocabulary: dict[str, int], idf: np.ndarray, components: np.ndarray, version: int):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        # (dim, n_terms)，float32 存储，30k 词 × 128 维约 15MB
+        self.components = components
+        self.version = version
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    def _tfidf(self, docs: list[list[str]]) -> csr_matrix:
+        indptr, indices, data = [0], [], []
+        for tokens in docs:
+            for term, tf in Counter(t for t in tokens if t in self.vocabulary).items():
+                col = self.vocabulary[term]
+                indices.append(col)
+                data.append(tf * self.idf[col])
+            indptr.append(len(indices))
+        X = csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(docs), len(self.vocabulary)),
+        )
+        return normalize(X)
+
+    @classmethod
+    def fit(cls, docs: list[list[str]], idf_model: IdfModel, dim: int, max_terms: int) -> "EmbeddingModel":
+        """
+         在已分词的样本上拟合投影
+        :param docs: 样本文档
+        :param idf_model: 词表与 idf 来源；为空模型时用样本本身统计 DF
+        :param dim: 向量维度（须与 news_item.embedding 列一致）
+        :param max_terms: 词表大小
+        """
+        if idf_model.n_docs == 0:
+            idf_model = IdfModel()
+            idf_model.partial_fit(docs)
+
+        terms = [term for term, _ in idf_model.doc_freq.most_common(max_terms)]
+        model = cls(
+            vocabulary={term: i for i, term in enumerate(terms)},
+            idf=np.array([idf_model.idf(term) for term in terms], dtype=np.float32),
+            components=np.empty((0, len(terms)), dtype=np.float32),
+            version=int(time.time()),
+        )
+
+        X = model._tfidf(docs)
+        X = X[X.getnnz(axis=1) > 0]
+        if X.shape[0] <= dim or X.shape[1] <= dim:
+            raise ValueError(f"样本不足：需要多于 {dim} 篇非空文档和 {dim} 个词，实际 {X.shape[0]} 篇 / {X.shape[1]} 个词")
+
+        svd = TruncatedSVD(n_components=dim, random_state=42).fit(X)
+        model.components = svd.components_.astype(np.float32)
+        return model
+
+    def transform(self, docs: list[list[str]]) -> list[np.ndarray | None]:
+        """文档 → 单位向量；不含词表内任何词的文档返回 None"""
+        if not docs:
+            return []
+        X = self._tfidf(docs)
+        Y = normalize(np.asarray(X @ self.components.T))
+        nnz = X.getnnz(axis=1)
+        return [Y[i] if nnz[i] else None for i in range(len(docs))]
+
+    def save(self, path: str) -> None:
+        """原子写入：先写临时文件再 rename"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        joblib.dump({"format": self.FORMAT, "model": self}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingModel | None":
+        if not os.path.exists(path):
+            return None
+        data = joblib.load(path)
+        if data.get("format") != cls.FORMAT:
+            raise ValueError(f"unsupported embedding model format: {data.get('format')}")
+        return data["model"]
+
+
+def to_pgvector(vector: np.ndarray) -> str:
+    """pgvector 文本格式 '[x1,x2,...]'，写入时 CAST(... AS vector)"""
+    return "[" + ",".join(f"{x:.6g}" for x in vector.tolist()) + "]"
+
+
+_model: EmbeddingModel | None = None
+# 已加载模型文件的 mtime；其他进程重新拟合并替换文件后自动重新加载
+_model_mtime: float | None = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model() -> EmbeddingModel | None:
+    """已拟合的模型，尚未拟合时返回 None"""
+    global _model, _model_mtime
+
+    try:
+        mtime = os.stat(settings.EMBEDDING_MODEL_PATH).st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _model_lock:
+        if mtime != _model_mtime:
+            _model, _model_mtime = EmbeddingModel.load(settings.EMBEDDING_MODEL_PATH), mtime
+        return _model
+
+
+def fit_and_save(docs: list[list[str]], idf_model: IdfModel) -> EmbeddingModel:
+    """
+     拟合新模型（idf_model 为调用方读取的语料 DF 快照，见 idf_dao.fetch_top_idf_terms）→ 持久化 → 替换进程内模型
+    在执行器中运行；进程池模式下其他进程（包括主进程）按文件 mtime 重新加载（见 get_embedding_model）
+    """
+    global _model, _model_mtime
+
+    model = EmbeddingModel.fit(
+        docs,
+        idf_model,
+        dim=settings.EMBEDDING_DIM,
+        max_terms=settings.EMBEDDING_MAX_TERMS,
+    )
+    model.save(settings.EMBEDDING_MODEL_PATH)
+
+    with _model_lock:
+        _model, _model_mtime = model, os.stat(settings.EMBEDDING_MODEL_PATH).st_mtime
+    return model
+
+
+def embed(docs: list[list[str]]) -> tuple[list[str | None], int | None]:
+    """
+     已分词文档 → pgvector 文本向量（在执行器中运行；进程池模式下模型由各 worker 自行从文件加载，不随任务发送）
+    :return: (向量列表，模型版本)；模型尚未拟合时全部为 None
+    """
+    model = get_embedding_model()
+    if model is None:
+        return [None] * len(docs), None
+    return [to_pgvector(v) if v is not None else None for v in model.transform(docs)], model.version
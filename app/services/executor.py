@@ -0,0 +1,84 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+import wordfreq_cn
+
+from .segmenter import load_stopwords
+from ..config import settings
+from ..metrics import EXECUTOR_PENDING_TASKS, EXECUTOR_WORKERS
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker() -> None:
+    """
+     进程池 worker 初始化：每个进程只加载一次停词表和分词模型，
+    避免首个任务承担 pkuseg 模型加载的开销
+    """
+    load_stopwords()
+    wordfreq_cn.segment_text("预热分词模型")
+
+
+def get_executor() -> Executor:
+    """
+     获取 CPU 密集型任务的执行器（按 ANALYTICS_EXECUTOR 选择线程池或进程池）
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.ANALYTICS_WORKERS or os.cpu_count() or 1
+            EXECUTOR_WORKERS.set(workers)
+            if settings.ANALYTICS_EXECUTOR == "process":
+                # spawn：避免 fork 带走事件循环、连接池等线程状态
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            else:
+                _executor = ThreadPoolExecutor(max_workers=workers)
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """应用关闭时释放执行器"""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+async def run_cpu_bound(fn: Callable[..., T], *args) -> T:
+    """在执行器中运行 CPU 密集型函数（进程池模式下 fn 和参数必须可 pickle）"""
+    loop = asyncio.get_running_loop()
+    EXECUTOR_PENDING_TASKS.inc()
+    try:
+        return await loop.run_in_executor(get_executor(), fn, *args)
+    finally:
+        EXECUTOR_PENDING_TASKS.dec()
+
+
+async def map_cpu_bound(fn: Callable[[list], list[T]], items: list, chunk_size: int) -> list[T]:
+    """
+     将列表切块后并行交给执行器处理，再按原顺序拼接结果，使单个批次可以用满所有核
+    :param fn: 接收一个切块、返回等长结果列表的函数
+    :param items:
+    :param chunk_size:
+    :return:
+    """
+    if not items:
+        return []
+
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = await asyncio.gather(*(run_cpu_bound(fn, chunk) for chunk in chunks))
+    return [r for chunk_result in results for r in chunk_result]
@@ -0,0 +1,205 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from ..config import settings
+from ..dao.export_dao import EXPORT_COLUMNS, fetch_db_now, fetch_export_batch
+
+logger = logging.getLogger(__name__)
+
+EXPORT_TABLES = tuple(EXPORT_COLUMNS)
+# 增量导出的水位线，与导出文件放在同一目录
+_STATE_FILE = "_export_state.json"
+
+
+def export_available() -> bool:
+    """是否安装了可选依赖 pyarrow"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _arrow_schema(table_name: str):
+    import pyarrow as pa
+
+    ts = pa.timestamp("us", tz="UTC")
+    if table_name == "news_item":
+        return pa.schema([
+            ("id", pa.int64()),
+            ("item_id", pa.string()),
+            ("news_info_id", pa.int64()),
+            ("title", pa.string()),
+            ("url", pa.string()),
+            ("published_at", pa.date32()),
+            ("source", pa.string()),
+            ("content", pa.string()),
+            ("cluster_method", pa.string()),
+            ("cluster_id", pa.int64()),
+            ("created_at", ts),
+            ("updated_at", ts),
+        ])
+    return pa.schema([
+        ("id", pa.int64()),
+        ("news_id", pa.int64()),
+        ("published_at", pa.date32()),
+        ("keyword", pa.string()),
+        ("keyword_norm", pa.string()),
+        ("weight", pa.float64()),
+        ("method", pa.string()),
+        ("created_at", ts),
+        ("updated_at", ts),
+    ])
+
+
+def _state_key(table_name: str, start_date: date | None, end_date: date | None) -> str:
+    """
+     水位线按 (表, published_at 范围) 分别记录：只导出部分月份的运行不能推进全量导出的水位线，
+    否则范围外、水位线之前变更的行再也不会被增量导出。全量导出的键就是表名
+    """
+    if start_date is None and end_date is None:
+        return table_name
+    return f"{table_name}[{start_date or ''}..{end_date or ''}]"
+
+
+def load_export_state(out_dir: str) -> dict:
+    """{表名 或 表名[起..止]: {"updated_at": ISO 时间, "id": 最后一行 id}}"""
+    path = os.path.join(out_dir, _STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_export_state(out_dir: str, state: dict) -> None:
+    """原子写入：先写临时文件再 rename"""
+    path = os.path.join(out_dir, _STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ParquetExport:
+    """
+    news_item / news_keywords → Parquet（按 published_at 月份分目录，hive 风格）
+
+        <out_dir>/<表名>/published_month=YYYY-MM/<run_id>.parquet
+
+    - 按 (updated_at, id) keyset 分批从只读库读取，每批写成一个 row group，内存占用与总行数无关
+    - incremental=True 时从上次的水位线继续，只导出之后变更的行（同一行可能出现在多次导出中，
+      下游按 id 取 updated_at 最新的一条）；水位线按 (表, published_at 范围) 分别记录
+    - 文件先写为 .tmp，全部表导出完成后才改名并推进水位线；中途失败不会留下半份数据
+    - 通过 step() 逐批推进，CLI 和后台作业（JOB_EXPORT_PARQUET）共用
+    """
+
+    def __init__(
+            self,
+            out_dir: str,
+            start_date: date | None = None,
+            end_date: date | None = None,
+            tables: list[str] | None = None,
+            incremental: bool = False,
+            batch_size: int | None = None,
+    ):
+        if not export_available():
+            raise RuntimeError("Parquet 导出需要安装 pyarrow：pip install 'news-analytics-web[export]'")
+
+        unknown = set(tables or ()) - set(EXPORT_TABLES)
+        if unknown:
+            raise ValueError(f"unknown export tables: {', '.join(sorted(unknown))}")
+
+        self.out_dir = out_dir
+        self.start_date = start_date
+        self.end_date = end_date
+        self.batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        self.run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+
+        self._pending = list(tables or EXPORT_TABLES)
+        self._state = load_export_state(out_dir)
+        self._after: dict[str, tuple[datetime, int] | None] = {}
+        for table_name in self._pending:
+            mark = self._state.get(_state_key(table_name, start_date, end_date)) if incremental else None
+            self._after[table_name] = (datetime.fromisoformat(mark["updated_at"]), mark["id"]) if mark else None
+        self._until: datetime | None = None
+        # (表名, 月份) → (ParquetWriter, 临时文件路径)
+        self._writers: dict[tuple[str, str], tuple[object, str]] = {}
+        self.rows: dict[str, int] = defaultdict(int)
+
+    async def step(self) -> int:
+        """
+         导出下一批，返回本批行数；全部导出完成时提交文件和水位线并返回 0
+        """
+        try:
+            if self._until is None:
+                self._until = await fetch_db_now() - timedelta(seconds=settings.EXPORT_WATERMARK_LAG_SECONDS)
+
+            while self._pending:
+                table_name = self._pending[0]
+                rows = await fetch_export_batch(
+                    table_name, self.start_date, self.end_date, self._after[table_name], self._until, self.batch_size
+                )
+                if rows:
+                    self._after[table_name] = (rows[-1]["updated_at"], rows[-1]["id"])
+                    await asyncio.to_thread(self._write, table_name, rows)
+                    self.rows[table_name] += len(rows)
+                    return len(rows)
+                self._pending.pop(0)
+
+            await asyncio.to_thread(self._commit)
+            return 0
+        except BaseException:
+            self._abort()
+            raise
+
+    async def run(self) -> dict[str, int]:
+        """一次导出到底，返回各表导出行数"""
+        while await self.step():
+            pass
+        return dict(self.rows)
+
+    def _write(self, table_name: str, rows: list[dict]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(table_name)
+        by_month: dict[str, list[dict]] = defaultdict(list)
+        for r in rows:
+            by_month[f"{r['published_at']:%Y-%m}"].append(r)
+
+        for month, month_rows in by_month.items():
+            key = (table_name, month)
+            if key not in self._writers:
+                directory = os.path.join(self.out_dir, table_name, f"published_month={month}")
+                os.makedirs(directory, exist_ok=True)
+                tmp_path = os.path.join(directory, f"{self.run_id}.parquet.tmp")
+                self._writers[key] = (pq.ParquetWriter(tmp_path, schema, compression="zstd"), tmp_path)
+            writer, _ = self._writers[key]
+            writer.write_table(pa.Table.from_pylist(month_rows, schema=schema))
+
+    def _commit(self) -> None:
+        """关闭文件、去掉 .tmp 后缀，最后推进水位线"""
+        for writer, tmp_path in self._writers.values():
+            writer.close()
+            os.replace(tmp_path, tmp_path.removesuffix(".tmp"))
+        self._writers.clear()
+
+        for table_name, after in self._after.items():
+            if after is not None:
+                key = _state_key(table_name, self.start_date, self.end_date)
+                self._state[key] = {"updated_at": after[0].isoformat(), "id": after[1]}
+        os.makedirs(self.out_dir, exist_ok=True)
+        _save_export_state(self.out_dir, self._state)
+        logger.info(f"Export {self.run_id} finished: {dict(self.rows)}")
+
+    def _abort(self) -> None:
+        """删除未完成的临时文件，水位线不变"""
+        for writer, tmp_path in self._writers.values():
+            try:
+                writer.close()
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self._writers.clear()
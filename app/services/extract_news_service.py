@@ -1,22 +1,162 @@
 from app.dao import save_news_keywords, update_news_item_extracted_state
 from app.dao.news_info_dao import update_news_info_extracted_state
-from app.dao.news_item_dao import save_news_items
+from app.config import settings
+from app.dao.news_item_dao import save_news_items, update_news_item_title_tsv, update_news_item_clusters
+from app.dao.cluster_model_dao import (
+    lock_cluster_model_state, add_cluster_model_pending, fetch_cluster_model_pending, delete_cluster_model_pending,
+)
+from app.dao.cluster_summary_dao import fetch_news_item_clusters, update_cluster_summaries
+from app.dao.idf_dao import merge_idf_doc_freq
+from app.dao.keyword_stats_dao import fetch_keyword_stat_contributions, rollup_keyword_stats
+from app.dao.news_embedding_dao import update_news_item_embeddings
+from app.dao.news_related_dao import refresh_news_related
 from app.db import AsyncSessionLocal
+from app.metrics import stage_timer
+from app.services.analysis_service import async_fit_online_cluster, async_online_cluster
+from app.services.cluster_model import cluster_method, load_cluster_model, store_cluster_model
+from app.services.keyword_index import keyword_index
+from app.services.search_cache import search_cache
+from app.services.trending_service import trending_cache
+from app.services.wordcloud_service import wordcloud_renderer
 
 
-async def extract_keywords_task(items: list[dict]):
+async def save_extracted_keywords(session, items: list[dict], doc_terms: dict[int, list[str]] | None = None) -> list[dict]:
+    """
+     在调用方事务中写入关键词并更新新闻item状态
+    :param session:
+    :param items:
+    :param doc_terms: {news_id: 分词结果}（async_tfidf_top 的第二个返回值），在同一事务中合并进语料 DF
+    :return: 关键词汇总表的增量行（事务提交后交给 on_keywords_committed）
+    """
+    news_ids = [item["news_id"] for item in items]
+
+    with stage_timer("upsert"):
+        # 重新提取的新闻此前已计入汇总表的量，汇总表只累加差值
+        before = await fetch_keyword_stat_contributions(session, news_ids)
+        await save_news_keywords(session, items)
+        await update_news_item_extracted_state(session, items)
+        # 语料 DF 随关键词一起提交；按 news_id 登记，重试、重新提取不会重复计数
+        await merge_idf_doc_freq(session, doc_terms or {})
+        # 预计算相关新闻，/related 接口只做索引查找
+        await refresh_news_related(session, news_ids, top_n=settings.RELATED_TOP_N)
+        # 增量累加按天汇总
+        return await rollup_keyword_stats(session, news_ids, before)
+
+
+def on_keywords_committed(deltas: list[dict]) -> None:
+    """
+     关键词事务提交后的回调：刷新依赖关键词数据的缓存
+    :param deltas: save_extracted_keywords 返回的增量行
+    :return:
+    """
+    if not deltas:
+        return
+    # 本副本的增量立即生效；其他副本的提交由定期同步合并
+    keyword_index.apply(deltas)
+    trending_cache.refresh()
+    # 搜索结果缓存整体失效（代数加一）
+    search_cache.invalidate()
+    # 受影响日期的词云后台重新渲染
+    wordcloud_renderer.schedule({d["day"] for d in deltas})
+
+
+async def extract_keywords_task(items: list[dict], doc_terms: dict[int, list[str]] | None = None):
     """
      提取新闻关键字
     :param items:
+    :param doc_terms: 见 save_extracted_keywords
     :return:
     """
 
     async with AsyncSessionLocal() as session:
         async with session.begin():   # ← ★ 事务开始
-            await save_news_keywords(session, items)
-            await update_news_item_extracted_state(session, items)
+            deltas = await save_extracted_keywords(session, items, doc_terms)
 
         # async with session.begin() 会自动 commit 或 rollback
+    on_keywords_committed(deltas)
+
+
+async def _assign_online_clusters(session, items: list[dict]) -> list[dict]:
+    """
+     在调用方事务中按数据库中的在线聚类模型为新闻items分配 cluster_id，并把模型更新写回同一事务：
+    - 先锁定模型状态行，并发写入的事务在此串行；事务回滚（超时、写入失败、逐条重试）时模型更新一并撤销
+    - 此前已按当前模型分配过的新闻（重新提取）只分配、不再计入质心
+    - 预热阶段的新闻写入预热缓冲区，数量达到 n_clusters 时首次拟合，为缓冲区中此前批次的新闻补分配
+    :param items: 已分词的新闻items（见 cluster_news_items），写回 cluster_id / cluster_method / cluster_distance
+    :return: 补分配的此前批次的新闻 [{"item_id", "published_at", "title", "url", "title_tokens", "cluster_*"}]
+    """
+    method = cluster_method()
+    for item in items:
+        item.update(cluster_id=None, cluster_method=None, cluster_distance=None)
+    candidates = [item for item in items if item.get("title_tokens")]
+    if not candidates:
+        return []
+
+    state = await lock_cluster_model_state(session, method)
+    model = await load_cluster_model(session, method, state)
+
+    if model is None:
+        await add_cluster_model_pending(session, method, candidates)
+        pending = await fetch_cluster_model_pending(session, method)
+        if len(pending) < settings.CLUSTER_N_CLUSTERS:
+            return []
+
+        model, cluster_ids, distances = await async_fit_online_cluster([row["title_tokens"] for row in pending])
+        assigned = {
+            (row["item_id"], row["published_at"]): {
+                **row, "cluster_id": cid, "cluster_distance": distance, "cluster_method": method,
+            }
+            for row, cid, distance in zip(pending, cluster_ids, distances)
+        }
+        keys = set()
+        for item in candidates:
+            key = (item["item_id"], item["published_at"])
+            keys.add(key)
+            item.update(cluster_id=assigned[key]["cluster_id"], cluster_method=method,
+                        cluster_distance=assigned[key]["cluster_distance"])
+        await delete_cluster_model_pending(session, method)
+        await store_cluster_model(session, method, model)
+        return [row for key, row in assigned.items() if key not in keys]
+
+    previous = await fetch_news_item_clusters(session, candidates)
+    # 同一批次中重复的新闻也只计一次
+    learn, seen = [], set()
+    for item in candidates:
+        key = (item["item_id"], item["published_at"])
+        learn.append(key not in seen and previous.get(key, (None, None))[0] != method)
+        seen.add(key)
+    cluster_ids, distances, updated = await async_online_cluster(
+        model, [item["title_tokens"] for item in candidates], learn,
+    )
+    for item, cid, distance in zip(candidates, cluster_ids, distances):
+        item.update(cluster_id=cid, cluster_method=method, cluster_distance=distance)
+    if updated is not None:
+        await store_cluster_model(session, method, updated)
+    return []
+
+
+async def save_extracted_news_items(session, items: list[dict]):
+    """
+     在调用方事务中写入新闻items并更新新闻info状态
+    CLUSTER_MODE=online 时在同一事务中分配 cluster_id 并更新模型状态（见 _assign_online_clusters），超时抛出 TimeoutError
+    :param session:
+    :param items:
+    :return:
+    """
+    backfill = []
+    if settings.CLUSTER_MODE == "online":
+        backfill = await _assign_online_clusters(session, items)
+
+    with stage_timer("upsert"):
+        # 增量维护簇摘要（先于写入 news_item，按原来的簇分配计算增量）
+        await update_cluster_summaries(session, items + backfill)
+        await save_news_items(session, items)
+        await update_news_info_extracted_state(session, items)
+        await update_news_item_clusters(session, backfill)
+        # 标题向量（见 embed_news_items）
+        await update_news_item_embeddings(session, items)
+        # 标题全文索引（混合搜索）
+        await update_news_item_title_tsv(session, items)
 
 
 async def extract_news_items_task(items: list[dict]):
@@ -28,5 +168,6 @@ async def extract_news_items_task(items: list[dict]):
 
     async with AsyncSessionLocal() as session:
         async with session.begin():   # ← ★ 事务开始
-            await save_news_items(session, items)
-            await update_news_info_extracted_state(session, items)
\ No newline at end of file
+            await save_extracted_news_items(session, items)
+    # 新标题进入全文索引，搜索结果缓存失效
+    search_cache.invalidate()
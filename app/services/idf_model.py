@@ -0,0 +1,73 @@
+import math
+from collections import Counter
+
+from .executor import run_cpu_bound
+from ..dao.idf_dao import fetch_idf_stats
+
+
+class IdfModel:
+    """
+    语料级 IDF 模型（内存中的计算部分）
+
+    - 文档频率（DF）持久化在数据库中（idf_term / idf_corpus，见 idf_dao），各副本共享，
+      与关键词在同一事务中按 news_id 幂等合并
+    - 提取时只加载本批用到的词的 DF
+    - idf 公式与 sklearn 的 smooth_idf 一致：ln((1 + n) / (1 + df)) + 1
+    """
+
+    def __init__(self, doc_freq: dict[str, int] | None = None, n_docs: int = 0):
+        self.doc_freq: Counter[str] = Counter(doc_freq or {})
+        self.n_docs = n_docs
+
+    def partial_fit(self, docs: list[list[str]]) -> None:
+        """
+         合并一批文档的 DF 统计
+        :param docs: 已分词的文档
+        """
+        for tokens in docs:
+            self.doc_freq.update(set(tokens))
+        self.n_docs += len(docs)
+
+    def idf(self, term: str) -> float:
+        return math.log((1 + self.n_docs) / (1 + self.doc_freq.get(term, 0))) + 1
+
+    def top_k(self, tokens: list[str], k: int = 5) -> list[tuple[str, float]]:
+        """
+         单篇文档的 top_k 关键词（tf * idf，L2 归一化）
+        """
+        if not tokens:
+            return []
+
+        weights = {term: tf * self.idf(term) for term, tf in Counter(tokens).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        top = sorted(weights.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(term, w / norm) for term, w in top]
+
+
+def top_k_batch(model: IdfModel, docs: list[list[str]], k: int = 5) -> list[list[tuple[str, float]]]:
+    """
+     一批文档的 top_k 关键词（供执行器调用；model 只含本批用到的词的 DF，进程池模式下随任务发送）
+    """
+    return [model.top_k(tokens, k) for tokens in docs]
+
+
+async def extract_top_keywords(
+        docs: list[list[str]],
+        news_ids: list[int],
+        top_n: int = 5,
+) -> list[list[tuple[str, float]]]:
+    """
+     按数据库中的 DF 计算每篇 top_n 关键词（不写入 DF，合并见 idf_dao.merge_idf_doc_freq）
+    本批中尚未计入 DF 的新闻先在本地合并，权重与提交后的 DF 一致；已计入的（重新提取）不再重复合并
+    :param docs: 已分词的文档
+    :param news_ids: 与 docs 一一对应的新闻 id
+    :param top_n:
+    :return:
+    """
+    terms = sorted({term for tokens in docs for term in tokens})
+    doc_freq, n_docs, known = await fetch_idf_stats(terms, list(set(news_ids)))
+
+    model = IdfModel(doc_freq, n_docs)
+    model.partial_fit([tokens for tokens, news_id in zip(docs, news_ids) if news_id not in known])
+    return await run_cpu_bound(top_k_batch, model, docs, top_n)
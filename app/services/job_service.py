@@ -0,0 +1,332 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Awaitable, Callable
+
+from sqlalchemy import func
+
+from .analysis_service import async_tfidf_top, build_news_item_from_news_info, cluster_news_items, embed_news_items
+from .embedding_model import embed, fit_and_save, get_embedding_model
+from .executor import run_cpu_bound
+from .export_service import ParquetExport
+from .extract_news_service import save_extracted_keywords, save_extracted_news_items, on_keywords_committed
+from .idf_model import IdfModel
+from .search_cache import search_cache
+from .segment_cache import tokenize_cached
+from ..config import settings
+from ..dao.idf_dao import fetch_top_idf_terms
+from ..dao.job_dao import create_job, update_job, add_job_progress, claim_stale_jobs
+from ..dao.news_embedding_dao import fetch_news_item_titles, update_news_item_embeddings_by_id
+from ..dao.news_info_dao import claim_news_info_rows, mark_news_info_extracted, record_news_info_failure
+from ..dao.news_item_dao import (
+    claim_news_item_rows_not_extracted, mark_news_item_extracted, record_news_item_failure,
+    update_news_item_title_tsv_by_id,
+)
+from ..db import AsyncSessionLocal
+from ..metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+JOB_EXTRACT_NEWS = "extract_news"
+JOB_EXTRACT_KEYWORDS = "extract_keywords"
+JOB_EMBED_NEWS = "embed_news"
+JOB_INDEX_TITLES = "index_titles"
+JOB_EXPORT_PARQUET = "export_parquet"
+
+# 本副本同时运行的作业数上限
+_job_semaphore = asyncio.Semaphore(settings.JOB_MAX_CONCURRENCY)
+# 持有后台任务引用，防止被垃圾回收
+_running_tasks: set[asyncio.Task] = set()
+
+
+def _parse_date(value: str | None) -> date | None:
+    return date.fromisoformat(value) if value else None
+
+
+async def _process_claimed(
+        rows: list[dict],
+        process: Callable[[list[dict]], Awaitable[None]],
+        record_failure: Callable[[list[dict], str], Awaitable[None]],
+) -> None:
+    """
+     处理一批已认领的行；整批失败时逐条重试，把导致失败的行（poison rows）隔离出来：
+    记录错误并不再认领，其余行正常写入，作业继续
+    """
+    try:
+        await process(rows)
+        return
+    except Exception as e:
+        if len(rows) == 1:
+            logger.error(f"Row {rows[0]['id']} failed, skipped: {e}", exc_info=True)
+            await record_failure(rows, str(e))
+            return
+        logger.warning(f"Chunk of {len(rows)} rows failed, retrying row by row: {e}")
+
+    for row in rows:
+        try:
+            await process([row])
+        except Exception as e:
+            logger.error(f"Row {row['id']} failed, skipped: {e}", exc_info=True)
+            await record_failure([row], str(e))
+
+
+async def _extract_news_chunk(params: dict) -> int:
+    """
+     认领并处理一批 news_info → news_item，返回本批认领的行数（0 表示积压已清空）
+    - 认领在短事务中提交（行上记录租约），聚类、向量等 CPU 计算在事务外进行，结果在第二个事务中写入，
+      计算期间不持有行锁和连接；进程崩溃时租约到期后可被重新认领
+    - 失败的行见 _process_claimed
+    """
+    chunk_size = params["chunk_size"]
+
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            with stage_timer("dao_fetch"):
+                rows = await claim_news_info_rows(
+                    session,
+                    _parse_date(params.get("start_date")),
+                    _parse_date(params.get("end_date")),
+                    limit=chunk_size,
+                )
+    if not rows:
+        return 0
+
+    async def process(batch: list[dict]) -> None:
+        news_items = build_news_item_from_news_info(batch)
+        if news_items:
+            await cluster_news_items(news_items, n_clusters=chunk_size)
+            await embed_news_items(news_items)
+
+        async with AsyncSessionLocal() as write_session:
+            async with write_session.begin():
+                if news_items:
+                    # 在线聚类的 cluster_id 分配与模型更新在本事务中完成，随事务提交或回滚
+                    await save_extracted_news_items(write_session, news_items)
+                await mark_news_info_extracted(write_session, [r["id"] for r in batch])
+
+        if news_items:
+            search_cache.invalidate()
+
+    await _process_claimed(rows, process, record_news_info_failure)
+    return len(rows)
+
+
+async def _extract_keywords_chunk(params: dict) -> int:
+    """
+     认领并处理一批 news_item → news_keywords，返回本批认领的行数（事务划分同 _extract_news_chunk）
+    """
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            with stage_timer("dao_fetch"):
+                rows = await claim_news_item_rows_not_extracted(
+                    session,
+                    _parse_date(params.get("start_date")),
+                    _parse_date(params.get("end_date")),
+                    limit=params["chunk_size"],
+                )
+    if not rows:
+        return 0
+
+    async def process(batch: list[dict]) -> None:
+        tops, doc_terms = await async_tfidf_top(batch, top_n=params["top_k"])
+
+        async with AsyncSessionLocal() as write_session:
+            async with write_session.begin():
+                deltas = await save_extracted_keywords(write_session, tops, doc_terms)
+                await mark_news_item_extracted(write_session, batch)
+
+        on_keywords_committed(deltas)
+
+    await _process_claimed(rows, process, record_news_item_failure)
+    return len(rows)
+
+
+async def _setup_embed_news(params: dict) -> None:
+    """
+     向量模型尚未拟合或要求重新拟合时，用最新的 EMBEDDING_FIT_SAMPLE 条标题拟合
+    """
+    if not params.get("refit") and await asyncio.to_thread(get_embedding_model) is not None:
+        return
+
+    rows = await fetch_news_item_titles(settings.EMBEDDING_FIT_SAMPLE, latest=True)
+    docs = await tokenize_cached([r["title"] or "" for r in rows])
+    doc_freq, n_docs = await fetch_top_idf_terms(settings.EMBEDDING_MAX_TERMS)
+    with stage_timer("embed"):
+        model = await run_cpu_bound(fit_and_save, docs, IdfModel(doc_freq, n_docs))
+    logger.info(f"Embedding model fitted on {len(docs)} titles, version {model.version}")
+
+
+async def _embed_news_chunk(params: dict) -> int:
+    """
+     按主键正序扫描一批 news_item，为向量版本不是当前模型版本的行重新生成向量，返回本批扫描的行数
+    翻页位置记录在 params["after_id"]（只在本进程内有效）
+    """
+    rows = await fetch_news_item_titles(params["chunk_size"], after_id=params.get("after_id"))
+    if not rows:
+        return 0
+    params["after_id"] = rows[-1]["id"]
+
+    model = await asyncio.to_thread(get_embedding_model)
+    pending = [r for r in rows if r["embedding_version"] != model.version]
+    if pending:
+        docs = await tokenize_cached([r["title"] or "" for r in pending])
+        with stage_timer("embed"):
+            vectors, version = await run_cpu_bound(embed, docs)
+        with stage_timer("upsert"):
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    # 词表外的标题写入 NULL 向量，同样标记为已处理
+                    await update_news_item_embeddings_by_id(session, [
+                        {
+                            "id": r["id"],
+                            "published_at": r["published_at"],
+                            "embedding": vector,
+                            "embedding_version": version,
+                        }
+                        for r, vector in zip(pending, vectors)
+                    ])
+
+    return len(rows)
+
+
+async def _index_titles_chunk(params: dict) -> int:
+    """
+     按主键正序扫描一批 news_item，为尚未生成 title_tsv 的行（rebuild 时为全部）写入标题全文索引，
+    返回本批扫描的行数；翻页位置同 _embed_news_chunk
+    """
+    rows = await fetch_news_item_titles(params["chunk_size"], after_id=params.get("after_id"))
+    if not rows:
+        return 0
+    params["after_id"] = rows[-1]["id"]
+
+    pending = rows if params.get("rebuild") else [r for r in rows if not r["has_title_tsv"]]
+    if pending:
+        with stage_timer("tokenize"):
+            docs = await tokenize_cached([r["title"] or "" for r in pending])
+        with stage_timer("upsert"):
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    await update_news_item_title_tsv_by_id(session, [
+                        {"id": r["id"], "published_at": r["published_at"], "title_tokens": tokens}
+                        for r, tokens in zip(pending, docs)
+                    ])
+        search_cache.invalidate()
+
+    return len(rows)
+
+
+async def _setup_export_parquet(params: dict) -> None:
+    """创建导出器，放在 params["_export"]（只在本进程内有效，不写入作业记录）"""
+    params["_export"] = ParquetExport(
+        settings.EXPORT_DIR,
+        start_date=_parse_date(params.get("start_date")),
+        end_date=_parse_date(params.get("end_date")),
+        tables=params.get("tables"),
+        incremental=params.get("incremental", False),
+        batch_size=params["chunk_size"],
+    )
+
+
+async def _export_parquet_chunk(params: dict) -> int:
+    """导出一批，返回本批行数；全部完成时提交文件和水位线并返回 0"""
+    return await params["_export"].step()
+
+
+_CHUNK_HANDLERS: dict[str, Callable[[dict], Awaitable[int]]] = {
+    JOB_EXTRACT_NEWS: _extract_news_chunk,
+    JOB_EXTRACT_KEYWORDS: _extract_keywords_chunk,
+    JOB_EMBED_NEWS: _embed_news_chunk,
+    JOB_INDEX_TITLES: _index_titles_chunk,
+    JOB_EXPORT_PARQUET: _export_parquet_chunk,
+}
+
+# 分块处理前执行一次的准备步骤
+_JOB_SETUP: dict[str, Callable[[dict], Awaitable[None]]] = {
+    JOB_EMBED_NEWS: _setup_embed_news,
+    JOB_EXPORT_PARQUET: _setup_export_parquet,
+}
+
+
+async def _heartbeat(job_id: int) -> None:
+    """定期刷新作业 updated_at（包括排队等待和单个分块耗时较长时），超过 JOB_STALE_SECONDS 未刷新的作业会被接管"""
+    while True:
+        await asyncio.sleep(settings.JOB_STALE_SECONDS / 3)
+        try:
+            await update_job(job_id)
+        except Exception as e:
+            logger.warning(f"Job {job_id} heartbeat failed: {e}")
+
+
+async def _run_job(job_id: int, kind: str, params: dict) -> None:
+    """按分块循环处理，直到没有可认领的行"""
+    handler = _CHUNK_HANDLERS[kind]
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+
+    try:
+        async with _job_semaphore:
+            await update_job(job_id, status="running", started_at=func.current_timestamp())
+            try:
+                if setup := _JOB_SETUP.get(kind):
+                    await setup(params)
+                while processed := await handler(params):
+                    await add_job_progress(job_id, processed)
+            except asyncio.CancelledError:
+                await update_job(job_id, status="cancelled", finished_at=func.current_timestamp())
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} ({kind}) failed: {e}", exc_info=True)
+                await update_job(job_id, status="failed", error=str(e), finished_at=func.current_timestamp())
+                return
+
+            await update_job(job_id, status="succeeded", finished_at=func.current_timestamp())
+    finally:
+        heartbeat.cancel()
+
+
+def _start_job(job_id: int, kind: str, params: dict) -> None:
+    task = asyncio.create_task(_run_job(job_id, kind, params), name=f"analysis-job-{job_id}")
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+
+
+async def submit_job(kind: str, params: dict) -> int:
+    """
+     创建作业并在本进程后台执行，立即返回作业 ID
+    :param kind: JOB_EXTRACT_NEWS / JOB_EXTRACT_KEYWORDS / JOB_EMBED_NEWS / JOB_INDEX_TITLES / JOB_EXPORT_PARQUET
+    :param params: 作业参数（JSON 可序列化），必须包含 chunk_size
+    :return:
+    """
+    if kind not in _CHUNK_HANDLERS:
+        raise ValueError(f"unknown job kind: {kind}")
+
+    job_id = await create_job(kind, params)
+    _start_job(job_id, kind, params)
+    return job_id
+
+
+async def resume_stale_jobs() -> list[int]:
+    """
+     接管所在进程已退出的作业（见 claim_stale_jobs）并在本进程继续执行
+    已处理的行在库中已标记，继续执行只会认领剩余的积压数据；导出等作业从头开始
+    :return: 接管的作业 ID
+    """
+    resumed = []
+    for job in await claim_stale_jobs(settings.JOB_STALE_SECONDS):
+        if job["kind"] not in _CHUNK_HANDLERS:
+            await update_job(job["id"], status="failed", error=f"unknown job kind: {job['kind']}",
+                             finished_at=func.current_timestamp())
+            continue
+        logger.warning(f"Resuming stale job {job['id']} ({job['kind']})")
+        _start_job(job["id"], job["kind"], dict(job["params"] or {}))
+        resumed.append(job["id"])
+    return resumed
+
+
+async def run_job_recovery() -> None:
+    """应用启动后常驻的循环：定期接管失联的作业"""
+    while True:
+        try:
+            await resume_stale_jobs()
+        except Exception as e:
+            logger.error(f"Resume stale jobs failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.JOB_STALE_SECONDS / 2)
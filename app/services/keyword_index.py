@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from ..config import settings
+from ..dao.keyword_stats_dao import stream_keyword_stats
+
+logger = logging.getLogger(__name__)
+
+
+class _Slice:
+    """某一天、某一来源的关键词向量：按关键词 ID 升序的稀疏数组"""
+
+    __slots__ = ("ids", "weights", "counts")
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int32)
+        self.weights = np.empty(0, dtype=np.float32)
+        self.counts = np.empty(0, dtype=np.int32)
+
+    def merge(self, ids: np.ndarray, weights: np.ndarray, counts: np.ndarray, replace: bool) -> None:
+        """
+         合并一批关键词
+        :param replace: True 时用新值覆盖（来自汇总表的绝对值），False 时累加（提交时的增量）
+        """
+        n_old = len(self.ids)
+        uniq, inverse = np.unique(np.concatenate([self.ids, ids]), return_inverse=True)
+
+        if replace:
+            new_weights = np.zeros(len(uniq), dtype=np.float32)
+            new_counts = np.zeros(len(uniq), dtype=np.int32)
+            new_weights[inverse[:n_old]] = self.weights
+            new_counts[inverse[:n_old]] = self.counts
+            new_weights[inverse[n_old:]] = weights
+            new_counts[inverse[n_old:]] = counts
+        else:
+            new_weights = np.bincount(
+                inverse, weights=np.concatenate([self.weights, weights]), minlength=len(uniq)
+            ).astype(np.float32)
+            new_counts = np.bincount(
+                inverse, weights=np.concatenate([self.counts, counts]), minlength=len(uniq)
+            ).astype(np.int32)
+
+        self.ids, self.weights, self.counts = uniq.astype(np.int32), new_weights, new_counts
+
+
+class KeywordIndex:
+    """
+    进程内关键词分析索引：{日期: {来源 ID: _Slice}}
+
+    - 关键词、来源都映射为整数 ID，向量只存 int32 / float32 数组
+    - 只保留最近 KEYWORD_INDEX_DAYS 天，内存有上限
+    - 范围查询把涉及的向量拼接后用 np.bincount 一次性求和，再 argpartition 取 top-k
+    """
+
+    __slots__ = ("_keyword_ids", "_keywords", "_source_ids", "_days", "_lock", "loaded", "watermark")
+
+    def __init__(self):
+        self._keyword_ids: dict[str, int] = {}
+        self._keywords: list[str] = []
+        self._source_ids: dict[str, int] = {}
+        self._days: dict[date, dict[int, _Slice]] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        # 已同步到的 keyword_daily_stats.updated_at
+        self.watermark: datetime | None = None
+
+    def _intern(self, keyword: str) -> int:
+        kid = self._keyword_ids.get(keyword)
+        if kid is None:
+            kid = self._keyword_ids[keyword] = len(self._keywords)
+            self._keywords.append(keyword)
+        return kid
+
+    def _source_id(self, source: str) -> int:
+        return self._source_ids.setdefault(source, len(self._source_ids))
+
+    def apply(self, rows: list[dict], replace: bool = False) -> None:
+        """
+         写入汇总行 {"day", "source", "keyword", "doc_count", "weight_sum"}
+        :param rows:
+        :param replace: True 覆盖（全量/定期同步），False 累加（提交回调的增量）
+        """
+        oldest = date.today() - timedelta(days=settings.KEYWORD_INDEX_DAYS)
+
+        groups: dict[tuple[date, str], list[dict]] = {}
+        for row in rows:
+            if row["day"] >= oldest:
+                groups.setdefault((row["day"], row["source"]), []).append(row)
+
+        with self._lock:
+            for (day, source), group in groups.items():
+                ids = np.fromiter((self._intern(r["keyword"]) for r in group), dtype=np.int32, count=len(group))
+                weights = np.fromiter((r["weight_sum"] for r in group), dtype=np.float32, count=len(group))
+                counts = np.fromiter((r["doc_count"] for r in group), dtype=np.int32, count=len(group))
+
+                slices = self._days.setdefault(day, {})
+                slices.setdefault(self._source_id(source), _Slice()).merge(ids, weights, counts, replace)
+
+    def evict(self) -> None:
+        """删除超出保留窗口的日期"""
+        oldest = date.today() - timedelta(days=settings.KEYWORD_INDEX_DAYS)
+        with self._lock:
+            for day in [d for d in self._days if d < oldest]:
+                del self._days[day]
+
+    def top(
+            self,
+            start_date: date,
+            end_date: date,
+            source: str | None = None,
+            limit: int = 20,
+            metric: str = "weight",
+    ) -> list[dict]:
+        """
+         日期范围内（含首尾）按权重和 / 出现新闻数排序的关键词
+        :param start_date:
+        :param end_date:
+        :param source: 只统计指定来源
+        :param limit:
+        :param metric: "weight" 或 "count"
+        :return:
+        """
+        with self._lock:
+            source_id = self._source_ids.get(source) if source else None
+            if source and source_id is None:
+                return []
+
+            slices = [
+                s
+                for day, by_source in self._days.items()
+                if start_date <= day <= end_date
+                for sid, s in by_source.items()
+                if source_id is None or sid == source_id
+            ]
+            if not slices:
+                return []
+
+            ids = np.concatenate([s.ids for s in slices])
+            weights = np.bincount(ids, weights=np.concatenate([s.weights for s in slices]))
+            counts = np.bincount(ids, weights=np.concatenate([s.counts for s in slices]))
+            keywords = self._keywords
+
+        scores = weights if metric == "weight" else counts
+        k = min(limit, np.count_nonzero(scores))
+        if k == 0:
+            return []
+
+        top_ids = np.argpartition(-scores, k - 1)[:k]
+        top_ids = top_ids[np.argsort(-scores[top_ids])]
+        return [
+            {"keyword": keywords[i], "weight": float(weights[i]), "count": int(counts[i])}
+            for i in top_ids
+        ]
+
+
+keyword_index = KeywordIndex()
+
+
+async def sync_keyword_index() -> None:
+    """
+     从 keyword_daily_stats 同步 updated_at 晚于水位线的行（覆盖写入，幂等）。
+    首次调用即全量加载；之后定期调用以合并其他副本的提交
+    """
+    since = keyword_index.watermark
+    # 回退一点，避免与并发提交的事务擦肩而过（覆盖写入，重复读取无副作用）
+    if since is not None:
+        since -= timedelta(seconds=settings.KEYWORD_INDEX_SYNC_SECONDS)
+    start_date = date.today() - timedelta(days=settings.KEYWORD_INDEX_DAYS)
+
+    async for batch in stream_keyword_stats(start_date, since):
+        await asyncio.to_thread(keyword_index.apply, batch, True)
+        watermark = max(r["updated_at"] for r in batch)
+        if keyword_index.watermark is None or watermark > keyword_index.watermark:
+            keyword_index.watermark = watermark
+
+    keyword_index.evict()
+    keyword_index.loaded = True
+
+
+async def run_keyword_index_sync() -> None:
+    """应用启动后常驻的同步循环"""
+    while True:
+        try:
+            await sync_keyword_index()
+        except Exception as e:
+            logger.error(f"Sync keyword index failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.KEYWORD_INDEX_SYNC_SECONDS)
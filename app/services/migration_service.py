@@ -0,0 +1,190 @@
+import hashlib
+import logging
+import os
+import re
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..dao.schema_dao import ensure_schema_migrations_table, fetch_applied_migrations, record_migration
+from ..db import engine
+
+logger = logging.getLogger(__name__)
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_VERSION_RE = re.compile(r"^\d{1,4}$")
+_DOLLAR_TAG_RE = re.compile(r"\$[A-Za-z_]*\$")
+# 多个副本同时执行迁移时串行化
+_ADVISORY_LOCK_KEY = 7_301_000_001
+
+
+def discover_migrations(directory: str | None = None) -> list[dict]:
+    """
+     按编号顺序列出迁移脚本
+    :param directory: 默认 settings.MIGRATIONS_DIR
+    :return: [{"version", "name", "path", "sql", "checksum"}]
+    """
+    directory = directory or settings.MIGRATIONS_DIR
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        m = _FILE_RE.match(filename)
+        if not m:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, encoding="utf-8") as f:
+            sql = f.read()
+        migrations.append({
+            "version": m.group(1),
+            "name": m.group(2),
+            "path": path,
+            "sql": sql,
+            "checksum": hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+        })
+    return migrations
+
+
+def parse_migration_version(value: str | int) -> int:
+    """
+     解析迁移编号（"0011" / "11" / 11），按整数比较，避免字符串比较时 "11" > "0012" 之类的错误
+    :raises ValueError: 不是 1~4 位数字
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    if not isinstance(value, str) or not _VERSION_RE.match(value.strip()):
+        raise ValueError(f"迁移编号应为 4 位以内的数字：{value!r}")
+    return int(value)
+
+
+def split_sql(script: str) -> list[str]:
+    """
+     把迁移脚本拆成单条语句（识别注释、引号和 $$ 包裹的函数体）
+    逐条执行是因为 CREATE INDEX CONCURRENTLY 不能出现在多语句查询中（隐式事务）
+    """
+    statements, buf = [], []
+    i, n = 0, len(script)
+    while i < n:
+        ch = script[i]
+        if script.startswith("--", i):
+            end = script.find("\n", i)
+            i = n if end < 0 else end + 1
+            continue
+        if script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if ch in ("'", '"'):
+            end = i + 1
+            while end < n:
+                if script[end] == ch:
+                    # 连续两个引号是转义
+                    if end + 1 < n and script[end + 1] == ch:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            buf.append(script[i:end + 1])
+            i = end + 1
+            continue
+        if ch == "$" and (m := _DOLLAR_TAG_RE.match(script, i)):
+            tag = m.group(0)
+            end = script.find(tag, m.end())
+            end = n if end < 0 else end + len(tag)
+            buf.append(script[i:end])
+            i = end
+            continue
+        if ch == ";":
+            statement = "".join(buf).strip()
+            if statement:
+                statements.append(statement)
+            buf = []
+            i += 1
+            continue
+        buf.append(ch)
+        i += 1
+
+    statement = "".join(buf).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+async def migration_status() -> list[dict]:
+    """
+     每个迁移脚本的状态：applied / pending / modified（执行后文件被修改）
+    """
+    async with engine.connect() as conn:
+        await ensure_schema_migrations_table(conn)
+        applied = await fetch_applied_migrations(conn)
+        await conn.commit()
+
+    result = []
+    for m in discover_migrations():
+        record = applied.get(m["version"])
+        if record is None:
+            status = "pending"
+        elif record["checksum"] != m["checksum"]:
+            status = "modified"
+        else:
+            status = "applied"
+        result.append({
+            "version": m["version"],
+            "name": m["name"],
+            "status": status,
+            "applied_at": record["applied_at"] if record else None,
+        })
+    return result
+
+
+async def migrate(baseline: str | int | None = None, dry_run: bool = False) -> list[str]:
+    """
+     按顺序执行尚未执行的迁移，每个脚本执行成功后记录到 schema_migrations
+    - 语句逐条以自动提交方式执行，脚本自带的 BEGIN / COMMIT 原样生效
+    - 已执行的脚本被修改时报错停止，不会重复执行
+    :param baseline: 把编号 <= baseline 的脚本标记为已执行而不实际执行（接入此前手工执行过迁移的库）
+    :param dry_run: 只返回将要执行的脚本
+    :return: 执行（或标记）的脚本版本号
+    """
+    if baseline is not None:
+        baseline = parse_migration_version(baseline)
+    migrations = discover_migrations()
+    done = []
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text(f"SELECT pg_advisory_lock({_ADVISORY_LOCK_KEY})"))
+        try:
+            await ensure_schema_migrations_table(conn)
+            applied = await fetch_applied_migrations(conn)
+
+            modified = [
+                m["version"] for m in migrations
+                if m["version"] in applied and applied[m["version"]]["checksum"] != m["checksum"]
+            ]
+            if modified:
+                raise RuntimeError(f"已执行的迁移被修改：{', '.join(modified)}")
+
+            driver_conn = (await conn.get_raw_connection()).driver_connection
+            for m in migrations:
+                if m["version"] in applied:
+                    continue
+                done.append(m["version"])
+                if dry_run:
+                    continue
+
+                if baseline is not None and int(m["version"]) <= baseline:
+                    logger.info(f"Baseline migration {m['version']}_{m['name']}")
+                else:
+                    logger.info(f"Applying migration {m['version']}_{m['name']}")
+                    for statement in split_sql(m["sql"]):
+                        try:
+                            await driver_conn.execute(statement)
+                        except Exception:
+                            logger.error(f"Migration {m['version']} failed at:\n{statement}")
+                            if driver_conn.is_in_transaction():
+                                await driver_conn.execute("ROLLBACK")
+                            raise
+                await record_migration(conn, m["version"], m["name"], m["checksum"])
+        finally:
+            await conn.execute(text(f"SELECT pg_advisory_unlock({_ADVISORY_LOCK_KEY})"))
+
+    return done
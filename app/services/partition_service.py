@@ -0,0 +1,122 @@
+import logging
+from collections import Counter
+from datetime import date
+
+from .segment_cache import tokenize_cached
+from ..dao.cluster_model_dao import delete_cluster_model_pending_before
+from ..dao.cluster_summary_dao import remove_from_cluster_summaries, trim_cluster_summaries
+from ..dao.idf_dao import remove_idf_documents, subtract_idf_doc_freq
+from ..dao.partition_dao import (
+    PARTITIONED_TABLES, add_months, partition_name, list_month_partitions, create_month_partition,
+    delete_related_of_partition, detach_month_partition, fetch_partition_news,
+)
+from ..db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 分离前扫描月分区扣减汇总量时每批读取的新闻数
+_SCAN_BATCH_SIZE = 1000
+
+
+def _current_month() -> date:
+    return date.today().replace(day=1)
+
+
+async def list_partitions() -> dict[str, list[date]]:
+    """{父表: 已挂载的月份（升序）}"""
+    async with AsyncSessionLocal() as session:
+        return {parent: sorted(await list_month_partitions(session, parent)) for parent in PARTITIONED_TABLES}
+
+
+async def ensure_partitions(months_ahead: int) -> list[str]:
+    """
+     为当月及之后 months_ahead 个月创建缺失的分区（两张表同月创建），每个月一个事务
+    :param months_ahead:
+    :return: 新建的分区名
+    """
+    created = []
+    current = _current_month()
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                for parent in PARTITIONED_TABLES:
+                    existing = await list_month_partitions(session, parent)
+                    if month in existing:
+                        continue
+                    await create_month_partition(session, parent, month)
+                    created.append(partition_name(parent, month))
+                    logger.info(f"Created partition {created[-1]}")
+    return created
+
+
+async def _subtract_partition_aggregates(session, month: date) -> None:
+    """
+     在分离分区的事务中，把该月新闻从跨分区的汇总量中扣减，归档后的新闻不再计入：
+    - 语料 DF（idf_document / idf_term / idf_corpus）：只扣减登记过的新闻，词集合按标题重新分词得到
+      （与提取关键词时的分词一致，命中分词缓存）
+    - 簇摘要：大小、词频、代表新闻（见 remove_from_cluster_summaries），之后删除空簇、推进 first_published_at
+    - 在线聚类的预热缓冲区中该月及更早的新闻
+    在线聚类模型的质心与累计样本数是学到的参数，不随归档扣减
+    """
+    n_docs = 0
+    doc_freq = Counter()
+    after_id = None
+    while rows := await fetch_partition_news(session, month, after_id, _SCAN_BATCH_SIZE):
+        after_id = rows[-1]["id"]
+        counted = set(await remove_idf_documents(session, [r["id"] for r in rows]))
+        needed = [r for r in rows if r["id"] in counted or r["cluster_id"] is not None]
+        docs = await tokenize_cached([(r["title"] or "").strip() for r in needed])
+
+        clustered = []
+        for row, tokens in zip(needed, docs):
+            if row["id"] in counted:
+                n_docs += 1
+                doc_freq.update(set(tokens))
+            if row["cluster_id"] is not None:
+                clustered.append({**row, "title_tokens": tokens})
+        await remove_from_cluster_summaries(session, clustered)
+
+    await subtract_idf_doc_freq(session, doc_freq, n_docs)
+    next_month = add_months(month, 1)
+    await trim_cluster_summaries(session, next_month)
+    await delete_cluster_model_pending_before(session, next_month)
+    logger.info(f"Subtracted {n_docs} documents of {month:%Y-%m} from corpus DF and cluster summaries")
+
+
+async def detach_old_partitions(retain_months: int, archive_schema: str | None, dry_run: bool = False) -> list[date]:
+    """
+     分离早于保留期的月分区，每个月一个事务：
+    先扣减跨分区的汇总量（见 _subtract_partition_aggregates）、清理 news_related，
+    再按外键依赖顺序分离 news_keywords、news_item
+    :param retain_months: 保留的月份数（含当月），必须 >= 1
+    :param archive_schema: 分离后移动到的 schema；为空时直接删除
+    :param dry_run: 只返回将要处理的月份
+    :return: 处理的月份
+    """
+    if retain_months < 1:
+        raise ValueError("retain_months must be >= 1")
+
+    cutoff = add_months(_current_month(), -(retain_months - 1))
+    async with AsyncSessionLocal() as session:
+        months = sorted({
+            month
+            for parent in PARTITIONED_TABLES
+            for month in await list_month_partitions(session, parent)
+            if month < cutoff
+        })
+    if dry_run:
+        return months
+
+    for month in months:
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                if month in await list_month_partitions(session, "news_item"):
+                    await _subtract_partition_aggregates(session, month)
+                    await delete_related_of_partition(session, month)
+                for parent in reversed(PARTITIONED_TABLES):
+                    if month not in await list_month_partitions(session, parent):
+                        continue
+                    name = await detach_month_partition(session, parent, month, archive_schema)
+                    logger.info(f"Detached partition of {parent} for {month:%Y-%m} -> {name}")
+    return months
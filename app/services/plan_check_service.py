@@ -0,0 +1,193 @@
+import json
+import logging
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Iterator, NamedTuple
+
+from sqlalchemy import event
+
+from ..db import AsyncSessionLocal, engine, read_engine
+
+logger = logging.getLogger(__name__)
+
+# 出现 Seq Scan 即视为缺索引的大表；小表（analysis_job、news_cluster_summary 等）不检查
+LARGE_TABLES = {
+    "news_info", "news_item", "news_keywords", "news_related", "keyword_daily_stats", "segment_cache",
+    "idf_term", "idf_document",
+}
+# 分区名还原为父表名：news_item_p2025_01 / news_item_default → news_item
+_PARTITION_RE = re.compile(r"^(.+)_(p\d{4}_\d{2}|default)$")
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+@contextmanager
+def _capture_statements() -> Iterator[list[tuple[str, tuple]]]:
+    """记录期间主库和只读库上执行的全部语句及参数（executemany 只取第一组参数）"""
+    captured: list[tuple[str, tuple]] = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        captured.append((statement, tuple(parameters or ())))
+
+    engines = {engine.sync_engine, read_engine.sync_engine}
+    for e in engines:
+        event.listen(e, "after_cursor_execute", listener)
+    try:
+        yield captured
+    finally:
+        for e in engines:
+            event.remove(e, "after_cursor_execute", listener)
+
+
+class _Scenario(NamedTuple):
+    name: str
+    run: Callable[[], Awaitable[object]]
+    # 必须被捕获到的语句片段（每个片段至少出现在一条语句中）；为空时至少捕获一条语句
+    expect: tuple[str, ...] = ()
+    # 依赖库中已有数据（例如 id=1 的新闻已生成向量），空库上捕获不到时只记为跳过
+    needs_data: bool = False
+
+
+def _scenarios() -> list[_Scenario]:
+    """
+     以代表性参数调用的 DAO 查询路径；写路径在回滚的事务中执行（只用于捕获语句，EXPLAIN 不会执行它们）
+    """
+    from ..dao.export_dao import fetch_export_batch
+    from ..dao.idf_dao import fetch_idf_stats, merge_idf_doc_freq
+    from ..dao.cluster_model_dao import lock_cluster_model_state, fetch_cluster_model_pending
+    from ..dao.cluster_summary_dao import fetch_cluster_summaries, fetch_cluster_members, fetch_news_item_clusters
+    from ..dao.keyword_stats_dao import fetch_trending_keywords, fetch_keyword_weights_by_day, stream_keyword_stats
+    from ..dao.news_embedding_dao import fetch_news_item_titles, fetch_similar_news, update_news_item_embeddings_by_id
+    from ..dao.news_info_dao import (
+        fetch_news_info_rows, claim_news_info_rows, fetch_news_info_by_id,
+    )
+    from ..dao.news_item_dao import (
+        fetch_news_item_by_keywords, fetch_news_item_by_id, fetch_news_item_rows_not_extracted,
+        claim_news_item_rows_not_extracted, mark_news_item_extracted, update_news_item_title_tsv_by_id,
+        update_news_item_extracted_state,
+    )
+    from ..dao.news_related_dao import fetch_related_news, refresh_news_related
+    from ..dao.segment_cache_dao import fetch_segment_cache
+
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+
+    async def first_batch(stream):
+        try:
+            async for batch in stream:
+                return batch
+        finally:
+            await stream.aclose()
+
+    async def write_paths():
+        async with AsyncSessionLocal() as session:
+            transaction = await session.begin()
+            try:
+                await claim_news_info_rows(session, month_ago, today, limit=100)
+                await claim_news_item_rows_not_extracted(session, month_ago, today, limit=100)
+                await mark_news_item_extracted(session, [{"id": -1, "published_at": today}])
+                await update_news_item_title_tsv_by_id(session, [{"id": -1, "published_at": today, "title_tokens": ["测试"]}])
+                await update_news_item_embeddings_by_id(
+                    session, [{"id": -1, "published_at": today, "embedding": None, "embedding_version": None}],
+                )
+                await update_news_item_extracted_state(session, [{"news_id": -1, "published_at": today}])
+                await refresh_news_related(session, [-1])
+                await merge_idf_doc_freq(session, {-1: ["测试"]})
+                await lock_cluster_model_state(session, "plan-check")
+                await fetch_cluster_model_pending(session, "plan-check")
+                await fetch_news_item_clusters(session, [{"item_id": "-1", "published_at": today}])
+            finally:
+                await transaction.rollback()
+
+    return [
+        _Scenario("search_exact", lambda: fetch_news_item_by_keywords(["测试", "新闻"], limit=20, substring=False)),
+        _Scenario("search_substring", lambda: fetch_news_item_by_keywords(["测试"], limit=20, substring=True)),
+        _Scenario("search_cursor", lambda: fetch_news_item_by_keywords(["测试"], limit=20, after=(1.0, 100))),
+        _Scenario("news_item_by_id", lambda: fetch_news_item_by_id(1, today)),
+        _Scenario("news_info_by_id", lambda: fetch_news_info_by_id(1)),
+        _Scenario("news_item_not_extracted", lambda: fetch_news_item_rows_not_extracted(month_ago, today, limit=100)),
+        _Scenario("news_info_not_extracted", lambda: fetch_news_info_rows(month_ago, today, limit=100)),
+        _Scenario("cluster_summaries", lambda: fetch_cluster_summaries("online")),
+        _Scenario("cluster_members", lambda: fetch_cluster_members("online", 1, limit=20, before_id=1000)),
+        _Scenario("related_news", lambda: fetch_related_news(1)),
+        # 目标新闻没有向量时 DAO 提前返回，不会执行向量近邻查询（<=> 为余弦距离运算符）
+        _Scenario("similar_news", lambda: fetch_similar_news(1), expect=("<=>",), needs_data=True),
+        _Scenario("trending_keywords", lambda: fetch_trending_keywords(today)),
+        _Scenario("keyword_weights_by_day", lambda: fetch_keyword_weights_by_day(today)),
+        _Scenario("keyword_stats_stream",
+                  lambda: first_batch(stream_keyword_stats(month_ago, None, batch_size=100))),
+        _Scenario("news_item_titles", lambda: fetch_news_item_titles(100, after_id=0)),
+        _Scenario("export_news_item",
+                  lambda: fetch_export_batch("news_item", month_ago, today, (datetime.now(timezone.utc), 0),
+                                             datetime.now(timezone.utc), 100)),
+        _Scenario("export_news_keywords",
+                  lambda: fetch_export_batch("news_keywords", None, None, None, datetime.now(timezone.utc), 100)),
+        _Scenario("segment_cache", lambda: fetch_segment_cache([b"\x00" * 16])),
+        _Scenario("idf_stats", lambda: fetch_idf_stats(["测试", "新闻"], [1])),
+        _Scenario("write_paths", write_paths,
+                  expect=("news_related", "idf_document", "idf_term", "idf_corpus", "title_tsv", "cluster_model_state")),
+    ]
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    """执行计划树中对大表（或其分区）的 Seq Scan"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        relation = plan.get("Relation Name", "")
+        m = _PARTITION_RE.match(relation)
+        if relation in LARGE_TABLES or (m and m.group(1) in LARGE_TABLES):
+            found.append(relation)
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def _missing(scenario: _Scenario, statements: list[tuple[str, tuple]]) -> list[str]:
+    """场景期望捕获、实际没有执行的语句片段"""
+    if not scenario.expect:
+        return [] if statements else ["<any statement>"]
+    return [fragment for fragment in scenario.expect if not any(fragment in sql for sql, _ in statements)]
+
+
+async def check_plans(strict: bool = False) -> tuple[int, list[dict]]:
+    """
+     执行各 DAO 查询路径并捕获 SQL，在 enable_seqscan = off 下逐条 EXPLAIN：
+    关闭顺序扫描后规划器仍然选择 Seq Scan，说明没有可用的索引（与表中数据量无关，空库也能检查）
+    场景期望的语句没有被捕获（未检查到）同样记为问题；依赖数据的场景（needs_data）只有 strict 时才记为问题
+    :param strict: 依赖数据的场景未捕获到期望语句时也记为问题（在有样例数据的库上使用）
+    :return: (检查的语句数, 问题列表 [{"scenario", "kind": "seq_scan" | "missing", "relations", "statement"}])
+    """
+    captured: list[tuple[str, str, tuple]] = []
+    problems = []
+    for scenario in _scenarios():
+        with _capture_statements() as statements:
+            await scenario.run()
+        if missing := _missing(scenario, statements):
+            if scenario.needs_data and not strict:
+                logger.warning(f"Scenario {scenario.name} needs data, not captured: {', '.join(missing)}")
+            else:
+                problems.append({
+                    "scenario": scenario.name, "kind": "missing", "relations": [], "statement": ", ".join(missing),
+                })
+        captured.extend((scenario.name, sql, params) for sql, params in statements)
+
+    seen = set()
+    async with engine.connect() as conn:
+        driver_conn = (await conn.get_raw_connection()).driver_connection
+        await driver_conn.execute("SET enable_seqscan = off")
+        try:
+            for name, sql, params in captured:
+                if not sql.lstrip().lower().startswith(_EXPLAINABLE) or sql in seen:
+                    continue
+                seen.add(sql)
+                plan = json.loads(await driver_conn.fetchval(f"EXPLAIN (FORMAT JSON) {sql}", *params))
+                if relations := _seq_scans(plan[0]["Plan"]):
+                    problems.append({
+                        "scenario": name, "kind": "seq_scan", "relations": sorted(set(relations)), "statement": sql,
+                    })
+        finally:
+            await driver_conn.execute("RESET enable_seqscan")
+
+    return len(seen), problems
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from ..config import settings
+from ..utils.cleaner import normalize_keyword
+
+logger = logging.getLogger(__name__)
+
+
+class SearchCacheBackend(ABC):
+    """
+    搜索结果缓存后端
+
+    缓存键包含"代数"（generation），关键词提交后 invalidate() 使代数加一，
+    旧代数的条目不再被命中，等待 TTL / LRU 自然淘汰
+    """
+
+    @abstractmethod
+    async def generation(self) -> int:
+        ...
+
+    @abstractmethod
+    def invalidate(self) -> None:
+        """代数加一（在同步的提交回调中调用，不能阻塞）"""
+
+    @abstractmethod
+    async def get(self, key: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: dict) -> None:
+        ...
+
+
+class MemorySearchCache(SearchCacheBackend):
+    """进程内缓存：OrderedDict 实现 LRU，条目带过期时间"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._generation = 0
+
+    async def generation(self) -> int:
+        return self._generation
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        # 旧代数的条目不会再被命中，直接清空释放内存
+        self._entries.clear()
+
+    async def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisSearchCache(SearchCacheBackend):
+    """
+    Redis 共享缓存：多个副本共享命中结果和代数计数器（INCR），条目用 SETEX 设置 TTL，
+    LRU 淘汰交给 Redis 的 maxmemory-policy。需要安装可选依赖 redis
+    """
+
+    _GENERATION_KEY = "news-analytics:search:generation"
+    _ENTRY_PREFIX = "news-analytics:search:entry:"
+
+    def __init__(self, url: str, ttl: int):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("SEARCH_CACHE_BACKEND=redis 需要安装 redis：pip install 'news-analytics-web[redis]'")
+
+        self._client = redis.from_url(url)
+        self._ttl = ttl
+        # 持有后台任务引用，防止被垃圾回收
+        self._tasks: set[asyncio.Task] = set()
+
+    async def generation(self) -> int:
+        return int(await self._client.get(self._GENERATION_KEY) or 0)
+
+    def invalidate(self) -> None:
+        task = asyncio.create_task(self._client.incr(self._GENERATION_KEY))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get(self, key: str) -> dict | None:
+        payload = await self._client.get(self._ENTRY_PREFIX + key)
+        return json.loads(payload) if payload is not None else None
+
+    async def set(self, key: str, value: dict) -> None:
+        await self._client.setex(self._ENTRY_PREFIX + key, self._ttl, json.dumps(value, ensure_ascii=False))
+
+
+class SearchCache:
+    """
+    搜索结果缓存：
+
+    - 键：归一化、去重、排序后的关键词集合 + 翻页参数 + 当前代数
+    - 同一个键的并发未命中只查询一次数据库（热点查询在突发新闻期间高度重复）
+    - 后端读写失败只记录日志，退化为直接查询
+    - 代数变化后 SEARCH_CACHE_PRIMARY_READ_SECONDS 内改从主库查询：只读副本有复制延迟，
+      否则可能把提交前的结果缓存在新代数下，直到 TTL 过期
+    """
+
+    def __init__(self, backend: SearchCacheBackend | None):
+        self.backend = backend
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._generation: int | None = None
+        # 本进程最近一次观察到代数变化的时间（其他副本的 invalidate 在读取代数时才能观察到）
+        self._changed_at = float("-inf")
+
+    def invalidate(self) -> None:
+        self._changed_at = time.monotonic()
+        if self.backend is not None:
+            self.backend.invalidate()
+
+    def _observe(self, generation: int) -> None:
+        if generation != self._generation:
+            if self._generation is not None:
+                self._changed_at = time.monotonic()
+            self._generation = generation
+
+    def _read_primary(self) -> bool:
+        return time.monotonic() - self._changed_at < settings.SEARCH_CACHE_PRIMARY_READ_SECONDS
+
+    async def get_or_load(
+            self,
+            keywords: list[str],
+            params: dict,
+            loader: Callable[[bool], Awaitable[dict]],
+    ) -> dict:
+        """
+        :param keywords:
+        :param params: 参与缓存键的其他查询参数
+        :param loader: 未命中时查询数据库，参数表示是否应从主库读取
+        :return:
+        """
+        if self.backend is None:
+            return await loader(False)
+
+        try:
+            generation = await self.backend.generation()
+            self._observe(generation)
+            key = _cache_key(generation, keywords, params)
+            if (value := await self.backend.get(key)) is not None:
+                return value
+        except Exception as e:
+            logger.warning(f"Read search cache failed: {e}")
+            return await loader(self._read_primary())
+
+        if (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 发起查询的请求被取消（客户端断开）时自行查询
+                if not future.cancelled():
+                    raise
+                return await loader(self._read_primary())
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader(self._read_primary())
+            future.set_result(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有并发等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"Write search cache failed: {e}")
+        return value
+
+
+def _cache_key(generation: int, keywords: list[str], params: dict) -> str:
+    normalized = sorted({k for k in map(normalize_keyword, keywords) if k})
+    payload = json.dumps([generation, normalized, params], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _create_backend() -> SearchCacheBackend | None:
+    if settings.SEARCH_CACHE_BACKEND == "redis":
+        return RedisSearchCache(settings.REDIS_URL, settings.SEARCH_CACHE_TTL_SECONDS)
+    if settings.SEARCH_CACHE_BACKEND == "memory":
+        return MemorySearchCache(settings.SEARCH_CACHE_MAX_ENTRIES, settings.SEARCH_CACHE_TTL_SECONDS)
+    return None
+
+
+search_cache = SearchCache(_create_backend())
@@ -0,0 +1,52 @@
+import logging
+
+from .executor import map_cpu_bound
+from .segmenter import content_hash, filter_tokens, segment_raw_batch
+from ..config import settings
+from ..dao.segment_cache_dao import fetch_segment_cache, save_segment_cache
+from ..utils.cleaner import clean_html_batch
+
+logger = logging.getLogger(__name__)
+
+
+async def tokenize_cached(texts: list[str]) -> list[list[str]]:
+    """
+     批量分词，结果与 tokenize_batch 相同，但先查持久化分词缓存：
+    - 整批清洗后按内容哈希查 segment_cache，命中的文本跳过 pkuseg
+    - 未命中的（去重后）交给执行器分词，并写回缓存
+    - 停词等过滤在读取后进行
+    缓存读写失败只记录日志，退化为直接分词
+    """
+    if not texts:
+        return []
+
+    cleaned = clean_html_batch(texts)
+    if not settings.SEGMENT_CACHE_ENABLED:
+        raw = await map_cpu_bound(segment_raw_batch, cleaned, settings.ANALYTICS_CHUNK_SIZE)
+        return [filter_tokens(tokens) for tokens in raw]
+
+    hashes = [content_hash(t) for t in cleaned]
+
+    try:
+        cached = await fetch_segment_cache(list(set(hashes)))
+    except Exception as e:
+        logger.warning(f"Fetch segment cache failed: {e}")
+        cached = {}
+
+    # 未命中的文本去重后分词
+    missing: dict[bytes, str] = {}
+    for h, text in zip(hashes, cleaned):
+        if h not in cached and h not in missing:
+            missing[h] = text
+
+    if missing:
+        raw = await map_cpu_bound(segment_raw_batch, list(missing.values()), settings.ANALYTICS_CHUNK_SIZE)
+        fresh = dict(zip(missing.keys(), raw))
+        try:
+            await save_segment_cache(fresh)
+        except Exception as e:
+            logger.warning(f"Save segment cache failed: {e}")
+        cached.update(fresh)
+
+    logger.debug(f"Segment cache: {len(texts) - len(missing)}/{len(texts)} hit")
+    return [filter_tokens(cached[h]) for h in hashes]
@@ -0,0 +1,68 @@
+import hashlib
+import os
+from functools import lru_cache
+
+import wordfreq_cn
+
+from ..config import settings
+from ..utils.cleaner import clean_html, clean_html_batch
+
+
+@lru_cache(maxsize=1)
+def load_stopwords() -> frozenset[str]:
+    """加载停词表（文件不存在时返回空集合），每个进程只读取一次"""
+    if not os.path.exists(settings.STOPWORDS_FILE):
+        return frozenset()
+    with open(settings.STOPWORDS_FILE, encoding="utf-8") as f:
+        return frozenset(line.strip() for line in f if line.strip())
+
+
+def tokenize(text: str) -> list[str]:
+    """
+     文本 → 关键词候选 token
+    清洗 HTML 后使用 wordfreq_cn 分词，过滤停词、单字和纯数字
+    """
+    return _segment(clean_html(text))
+
+
+def _segment(cleaned: str) -> list[str]:
+    """对已清洗的文本分词并过滤"""
+    return filter_tokens(segment_raw(cleaned))
+
+
+def segment_raw(cleaned: str) -> list[str]:
+    """对已清洗的文本调用 wordfreq_cn 分词，不做过滤（分词缓存存放的就是这一结果）"""
+    if not cleaned:
+        return []
+    return [t for t in (t.strip() for t in wordfreq_cn.segment_text(cleaned)) if t]
+
+
+def segment_raw_batch(cleaned: list[str]) -> list[list[str]]:
+    """segment_raw 的批量版本，供执行器分块调用"""
+    return [segment_raw(t) for t in cleaned]
+
+
+def filter_tokens(tokens: list[str]) -> list[str]:
+    """过滤停词、单字和纯数字"""
+    stopwords = load_stopwords()
+    return [t for t in tokens if len(t) > 1 and not t.isdigit() and t not in stopwords]
+
+
+def content_hash(cleaned: str) -> bytes:
+    """分词缓存的键：缓存版本 + 清洗后文本的 blake2b-128 摘要"""
+    payload = f"{settings.SEGMENT_CACHE_VERSION}\x00{cleaned}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+@lru_cache(maxsize=settings.SEGMENT_QUERY_CACHE_SIZE)
+def segment_query(q: str) -> tuple[str, ...]:
+    """
+     搜索词分词（进程内 LRU，热门搜索词不重复调用 pkuseg）
+    返回 tuple，防止调用方修改缓存中的结果
+    """
+    return tuple(wordfreq_cn.segment_text(q))
+
+
+def tokenize_batch(texts: list[str]) -> list[list[str]]:
+    """批量分词：整批一次清洗（见 clean_html_batch），再逐条分词"""
+    return [_segment(t) for t in clean_html_batch(texts)]
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import date
+
+from ..config import settings
+from ..dao.keyword_stats_dao import fetch_trending_keywords
+
+logger = logging.getLogger(__name__)
+
+TrendingKey = tuple[date, int, int, int, str | None]
+
+
+class TrendingCache:
+    """
+    趋势关键词的进程内缓存
+
+    - 读：命中直接返回，未命中时查询汇总表并缓存（同一个 key 只会有一个并发查询，不同 key 的查询互不阻塞）
+    - 写：本进程的关键词提交后调用 refresh()，后台重新计算所有已缓存的 key 并原地替换，
+      刷新期间仍返回旧结果，读请求永远不等待数据库
+    - 其他 worker / 副本的提交：缓存超过 ttl 秒后，读请求照常返回旧结果并触发同样的后台刷新
+    """
+
+    def __init__(self, max_entries: int = 64, ttl: float | None = None):
+        # key → (加载时间, 结果)
+        self._entries: OrderedDict[TrendingKey, tuple[float, list[dict]]] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = settings.TRENDING_CACHE_TTL_SECONDS if ttl is None else ttl
+        # 正在加载的 key → 结果 future，同一个 key 的并发未命中共用一次查询，不同 key 互不等待
+        self._inflight: dict[TrendingKey, asyncio.Future] = {}
+        self._refresh_task: asyncio.Task | None = None
+        self._dirty = False
+
+    async def get(self, key: TrendingKey) -> list[dict]:
+        if (entry := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            loaded_at, items = entry
+            # 过期：后台刷新（已在刷新时不再追加一轮）
+            if time.monotonic() - loaded_at > self._ttl and (self._refresh_task is None or self._refresh_task.done()):
+                self.refresh()
+            return items
+
+        if (future := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 发起查询的请求被取消（客户端断开）时自行查询
+                if not future.cancelled():
+                    raise
+                return await _load(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        loaded_at = time.monotonic()
+        try:
+            items = await _load(key)
+            future.set_result(items)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有并发等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self._put(key, loaded_at, items)
+        return items
+
+    def _put(self, key: TrendingKey, loaded_at: float, items: list[dict]) -> None:
+        self._entries[key] = (loaded_at, items)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def refresh(self) -> None:
+        """写入后（或缓存过期时）触发后台刷新；刷新进行中再次触发时，本轮结束后再刷新一次"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._dirty = True
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_all())
+
+    async def _refresh_all(self) -> None:
+        while True:
+            self._dirty = False
+            for key in list(self._entries):
+                loaded_at = time.monotonic()
+                try:
+                    items = await _load(key)
+                except Exception as e:
+                    logger.error(f"Refresh trending cache failed: {e}", exc_info=True)
+                    self._entries.pop(key, None)
+                    continue
+                if key in self._entries:
+                    self._entries[key] = (loaded_at, items)
+            if not self._dirty:
+                return
+
+
+async def _load(key: TrendingKey) -> list[dict]:
+    end_date, window_days, baseline_days, limit, source = key
+    return await fetch_trending_keywords(
+        end_date,
+        window_days=window_days,
+        baseline_days=baseline_days,
+        limit=limit,
+        source=source,
+        min_count=settings.TRENDING_MIN_COUNT,
+    )
+
+
+trending_cache = TrendingCache()
+
+
+async def get_trending_keywords(
+        end_date: date,
+        window_days: int,
+        baseline_days: int,
+        limit: int,
+        source: str | None,
+) -> list[dict]:
+    return await trending_cache.get((end_date, window_days, baseline_days, limit, source))
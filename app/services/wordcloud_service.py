@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from wordcloud import WordCloud
+
+from .executor import run_cpu_bound
+from ..config import settings
+from ..dao.keyword_stats_dao import fetch_keyword_weights_by_day
+
+logger = logging.getLogger(__name__)
+
+
+def render_wordcloud(frequencies: dict[str, float], out_path: str) -> None:
+    """按关键词权重渲染词云图片（CPU 密集型，在执行器中运行）"""
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    WordCloud(
+        font_path=settings.WORDCLOUD_FONT_PATH,
+        width=settings.WORDCLOUD_WIDTH,
+        height=settings.WORDCLOUD_HEIGHT,
+        background_color="white",
+        max_words=len(frequencies),
+    ).generate_from_frequencies(frequencies).to_file(out_path)
+
+
+def frequencies_etag(frequencies: dict[str, float]) -> str:
+    """权重内容哈希，作为文件名和 ETag；权重不变则不重新渲染"""
+    payload = json.dumps(sorted(frequencies.items()), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+class WordcloudManifest:
+    """
+    词云索引：{日期: {"file", "etag", "generated_at"}}
+
+    常驻内存，"最新" / "按日期" 查询不扫描文件系统；
+    读取时按 manifest.json 的 mtime 判断是否被其他 worker / 副本更新过，有变化时重新加载；
+    写入时先合并磁盘上的最新内容再原子写回
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self._mtime: float | None = None
+        self._reload()
+
+    def _reload(self) -> None:
+        """文件 mtime 变化时重新加载（调用方持有锁，或在构造时）"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            self._entries = json.load(f)
+        self._mtime = mtime
+
+    def get(self, day: str) -> dict | None:
+        with self._lock:
+            self._reload()
+            return self._entries.get(day)
+
+    def latest(self) -> tuple[str, dict] | None:
+        with self._lock:
+            self._reload()
+            if not self._entries:
+                return None
+            day = max(self._entries)
+            return day, self._entries[day]
+
+    def put(self, day: str, entry: dict) -> dict | None:
+        """写入新条目，返回被替换的旧条目"""
+        with self._lock:
+            self._reload()
+            previous = self._entries.get(day)
+            self._entries[day] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime
+        return previous
+
+
+def cleanup_day_files(day: str, keep: str | None = None) -> list[str]:
+    """
+     删除某一天目录下超过 WORDCLOUD_RETAIN_SECONDS 的旧图片
+    文件名为内容哈希，已发出的地址可能仍被客户端 / CDN 引用，替换后不立即删除，按时间清理
+    :param day: 日期目录（YYYY-MM-DD）
+    :param keep: 当前条目的文件（相对 WORDCLOUD_DIR），无论多旧都保留
+    :return: 删除的文件（相对 WORDCLOUD_DIR）
+    """
+    directory = os.path.join(settings.WORDCLOUD_DIR, day)
+    cutoff = time.time() - settings.WORDCLOUD_RETAIN_SECONDS
+    removed = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return removed
+
+    for name in names:
+        file = f"{day}/{name}"
+        path = os.path.join(directory, name)
+        if file == keep or not name.endswith(".png"):
+            continue
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+                removed.append(file)
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+manifest = WordcloudManifest(os.path.join(settings.WORDCLOUD_DIR, "manifest.json"))
+
+
+async def render_day(day: date, force: bool = False) -> dict | None:
+    """
+     渲染某一天的词云：从 keyword_daily_stats 读取关键词权重，内容未变化时直接返回已有条目
+    :param day:
+    :param force: 内容未变化也重新渲染
+    :return: manifest 条目，当天没有关键词时返回 None
+    """
+    frequencies = await fetch_keyword_weights_by_day(day, limit=settings.WORDCLOUD_MAX_WORDS)
+    if not frequencies:
+        return None
+
+    key = day.isoformat()
+    etag = frequencies_etag(frequencies)
+    current = manifest.get(key)
+    if current and current["etag"] == etag and not force:
+        return current
+
+    file = f"{key}/{etag}.png"
+    await run_cpu_bound(render_wordcloud, frequencies, os.path.join(settings.WORDCLOUD_DIR, file))
+
+    entry = {"file": file, "etag": etag, "generated_at": datetime.now().isoformat(timespec="seconds")}
+    previous = await asyncio.to_thread(manifest.put, key, entry)
+
+    # 被替换的旧图片保留到过期后再清理
+    if previous and previous["file"] != file:
+        await asyncio.to_thread(cleanup_day_files, key, file)
+    return entry
+
+
+class WordcloudRenderer:
+    """
+    后台渲染调度：关键词提交后登记受影响的日期，等待去抖间隔后统一渲染，
+    同一日期在一轮中只渲染一次
+    """
+
+    def __init__(self):
+        self._pending: set[date] = set()
+        self._task: asyncio.Task | None = None
+
+    def schedule(self, days: set[date]) -> None:
+        self._pending |= days
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(settings.WORDCLOUD_RENDER_DELAY_SECONDS)
+            days, self._pending = self._pending, set()
+            for day in sorted(days):
+                try:
+                    await render_day(day)
+                except Exception as e:
+                    logger.error(f"Render wordcloud for {day} failed: {e}", exc_info=True)
+
+
+wordcloud_renderer = WordcloudRenderer()
@@ -1,5 +1,7 @@
-from .cleaner import clean_html
+from .cleaner import clean_html, clean_html_batch, normalize_keyword
 
 __all__ = [
-    "clean_html"
+    "clean_html",
+    "clean_html_batch",
+    "normalize_keyword",
 ]
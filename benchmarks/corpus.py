@@ -0,0 +1,102 @@
+"""
+合成中文新闻语料：生成与线上 news_info.data 结构一致的数据（固定随机种子，结果可复现）
+
+    {"id", "name", "news_from", "news_date", "data": {"items": [{"id", "title", "url", "extra": {"hover"}}]}}
+"""
+import random
+from datetime import date, timedelta
+
+SOURCES = ["weibo", "zhihu", "baidu", "toutiao", "douyin", "bilibili", "thepaper", "ithome"]
+
+# 词表按主题分组，同一标题大多从同一主题取词，聚类和关键词提取才有结构可言
+TOPICS = {
+    "科技": ["人工智能", "大模型", "芯片", "半导体", "智能手机", "发布会", "操作系统", "开源", "算力", "自动驾驶"],
+    "财经": ["股市", "央行", "利率", "人民币", "汇率", "基金", "上市公司", "财报", "消费", "房地产"],
+    "体育": ["国足", "世界杯", "决赛", "冠军", "球迷", "主教练", "联赛", "奥运会", "金牌", "转会"],
+    "社会": ["高考", "暴雨", "交通", "地铁", "医院", "学校", "志愿者", "警方", "通报", "调查"],
+    "娱乐": ["电影", "票房", "综艺", "演唱会", "明星", "导演", "首映", "电视剧", "热播", "粉丝"],
+    "国际": ["峰会", "外交部", "谈判", "选举", "总统", "联合国", "制裁", "冲突", "访问", "协议"],
+}
+CONNECTORS = ["宣布", "回应", "曝光", "引发热议", "最新消息", "官方", "突发", "正式", "首次", "再创新高"]
+HOVER_TEMPLATES = [
+    "<p>{a}{b}相关话题持续发酵，<b>{c}</b>成为网友关注焦点。</p>",
+    "据报道，{a}方面{b}，详情见 https://example.com/news/{n} 。",
+    "{a}、{b}与{c}：阅读数 {n} 万，讨论 {m} 条",
+    "",
+]
+
+
+def _title(rng: random.Random, words: list[str]) -> str:
+    a, b, c = rng.sample(words, 3)
+    parts = [a, rng.choice(CONNECTORS), b]
+    if rng.random() < 0.5:
+        parts.append(c)
+    if rng.random() < 0.2:
+        parts.append(str(rng.randint(1, 2025)))
+    return "".join(parts)
+
+
+def generate_news_info_rows(
+        n_items: int,
+        items_per_row: int = 50,
+        seed: int = 42,
+        start_date: date = date(2025, 1, 1),
+) -> list[dict]:
+    """
+     生成合计 n_items 条新闻的 news_info 行；每行是某来源某天的热榜，
+    约 10% 标题与之前的标题重复（模拟同一条新闻在多个榜单 / 多天重复上榜）
+    :param n_items: 新闻总数
+    :param items_per_row: 每个榜单的条目数
+    :param seed:
+    :param start_date:
+    :return:
+    """
+    rng = random.Random(seed)
+    topics = list(TOPICS.values())
+    rows: list[dict] = []
+    titles: list[str] = []
+
+    for row_id in range((n_items + items_per_row - 1) // items_per_row):
+        source = SOURCES[row_id % len(SOURCES)]
+        news_date = start_date + timedelta(days=row_id // len(SOURCES))
+        count = min(items_per_row, n_items - row_id * items_per_row)
+
+        items = []
+        for i in range(count):
+            words = rng.choice(topics)
+            if titles and rng.random() < 0.1:
+                title = rng.choice(titles)
+            else:
+                title = _title(rng, words)
+                titles.append(title)
+
+            a, b, c = rng.sample(words, 3)
+            hover = rng.choice(HOVER_TEMPLATES).format(
+                a=a, b=b, c=c, n=rng.randint(1, 99999), m=rng.randint(1, 9999)
+            )
+            items.append({
+                "id": f"{source}-{row_id}-{i}",
+                "title": title,
+                "url": f"https://{source}.example.com/item/{row_id}/{i}",
+                "extra": {"hover": hover},
+            })
+
+        rows.append({
+            "id": row_id + 1,
+            "name": source,
+            "news_from": source,
+            "news_date": news_date,
+            "data": {"items": items},
+        })
+
+    return rows
+
+
+def sample_queries(n: int, seed: int = 7) -> list[str]:
+    """从词表中抽取搜索词（单词或两个词的组合）"""
+    rng = random.Random(seed)
+    words = [w for topic in TOPICS.values() for w in topic]
+    return [
+        rng.choice(words) if rng.random() < 0.6 else " ".join(rng.sample(words, 2))
+        for _ in range(n)
+    ]
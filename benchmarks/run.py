@@ -0,0 +1,265 @@
+"""
+分析 / 搜索热点路径基准测试
+
+每个 (用例, 规模) 在独立的 spawn 子进程中运行，峰值 RSS 互不干扰；
+计时不含语料生成等准备工作，取 --repeat 次中最快的一次。
+
+    python -m benchmarks.run                                    # 全部 CPU 用例，1k / 10k / 100k
+    python -m benchmarks.run --cases clean_html tfidf --sizes 1000 10000
+    python -m benchmarks.run --save benchmarks/baselines/local.json
+    python -m benchmarks.run --compare benchmarks/baselines/local.json --threshold 0.2
+    python -m benchmarks.run --database-url postgresql://... --cases dao_upsert dao_search
+
+数据库用例只在指定 --database-url 时运行：dao_upsert 在事务中写入后回滚，不留数据；
+dao_search 查询库中已有数据。SQL 依赖 PostgreSQL（ON CONFLICT、COPY、pg_trgm），没有 SQLite 替代。
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable
+
+from benchmarks.corpus import generate_news_info_rows, sample_queries
+
+CPU_CASES = ["clean_html", "clean_html_batch", "build_news_items", "tfidf", "cluster"]
+DB_CASES = ["dao_upsert", "dao_search"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+# dao_search 每轮执行的查询数（与规模无关，只在最小规模上运行一次）
+SEARCH_QUERIES = 200
+
+
+def _peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _prepare(case: str, size: int) -> tuple[Callable[[], object], int]:
+    """构造用例输入，返回 (被测函数, 本轮处理的条目数)"""
+    from app.services.analysis_service import (
+        build_news_item_from_news_info, compute_tfidf_top, embedding_cluster_pipeline,
+    )
+    from app.utils.cleaner import clean_html, clean_html_batch
+
+    rows = generate_news_info_rows(size)
+
+    if case in ("clean_html", "clean_html_batch"):
+        texts = [
+            f"{item['title']} {item['extra']['hover']}"
+            for row in rows for item in row["data"]["items"]
+        ]
+        if case == "clean_html":
+            return lambda: [clean_html(t) for t in texts], len(texts)
+        return lambda: clean_html_batch(texts), len(texts)
+
+    if case == "build_news_items":
+        return lambda: build_news_item_from_news_info(rows), size
+
+    items = build_news_item_from_news_info(rows)
+
+    if case == "tfidf":
+        corpus = [{"id": i, "title": item["title"]} for i, item in enumerate(items)]
+        # 预热：加载 pkuseg 模型，不计入耗时
+        compute_tfidf_top(corpus[:10])
+        return lambda: compute_tfidf_top(corpus, top_n=5), len(corpus)
+
+    if case == "cluster":
+        titles = [item["title"] for item in items]
+        return lambda: embedding_cluster_pipeline(titles, n_clusters=50), len(titles)
+
+    if case == "dao_upsert":
+        return _dao_upsert(items), len(items)
+
+    if case == "dao_search":
+        queries = sample_queries(SEARCH_QUERIES)
+        return _dao_search(queries), len(queries)
+
+    raise ValueError(f"unknown case: {case}")
+
+
+def _dao_upsert(items: list[dict]) -> Callable[[], object]:
+    from sqlalchemy import select
+
+    from app.dao import save_news_keywords
+    from app.dao.news_item_dao import save_news_items
+    from app.db import AsyncSessionLocal, engine
+    from app.models import news_item
+
+    # 合成数据不对应真实的 news_info 行
+    items = [{**item, "news_info_id": None, "item_id": f"bench-{item['item_id']}"} for item in items]
+
+    async def upsert():
+        async with AsyncSessionLocal() as session:
+            transaction = await session.begin()
+            try:
+                await save_news_items(session, items)
+                # 条目数可能超过单条语句的参数上限，按前缀取回本轮写入的 id
+                written = (await session.execute(
+                    select(news_item.c.id, news_item.c.published_at).where(news_item.c.item_id.startswith("bench-"))
+                )).all()
+                keywords = [
+                    {
+                        "news_id": r.id,
+                        "published_at": r.published_at,
+                        "keyword": f"基准{k}",
+                        "weight": 0.1 * k,
+                        "method": "tfidf",
+                    }
+                    for r in written for k in range(5)
+                ]
+                await save_news_keywords(session, keywords)
+            finally:
+                await transaction.rollback()
+        await engine.dispose()
+
+    return lambda: asyncio.run(upsert())
+
+
+def _dao_search(queries: list[str]) -> Callable[[], object]:
+    import wordfreq_cn
+
+    from app.dao import fetch_news_item_by_keywords
+    from app.db import engine
+
+    keyword_lists = [wordfreq_cn.segment_text(q) for q in queries]
+
+    async def search():
+        for keywords in keyword_lists:
+            await fetch_news_item_by_keywords(keywords, limit=20)
+        await engine.dispose()
+
+    return lambda: asyncio.run(search())
+
+
+def _run_case(case: str, size: int, repeat: int, database_url: str | None) -> dict:
+    """在子进程中执行：先设置环境变量再导入 app，模型文件写到临时目录"""
+    tmp_dir = tempfile.mkdtemp(prefix="news-bench-")
+    os.environ["DATA_DIR"] = tmp_dir
+    os.environ["SEGMENT_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("APP_ENV", "benchmark")
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+
+    fn, n_items = _prepare(case, size)
+    setup_rss = _peak_rss_mb()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    seconds = min(timings)
+    return {
+        "case": case,
+        "size": size,
+        "items": n_items,
+        "seconds": round(seconds, 6),
+        "items_per_sec": round(n_items / seconds, 2) if seconds > 0 else None,
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _meta() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """
+     与基线比较，吞吐下降或峰值 RSS 增长超过 threshold 的记为回归
+    :return: 回归描述列表
+    """
+    base = {(r["case"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+
+    for r in results:
+        b = base.get((r["case"], r["size"]))
+        if b is None:
+            print(f"  {r['case']:<18} {r['size']:>8}  (基线中没有该用例)")
+            continue
+
+        speed = r["items_per_sec"] / b["items_per_sec"] if b["items_per_sec"] else 1.0
+        rss = r["peak_rss_mb"] / b["peak_rss_mb"] if b["peak_rss_mb"] else 1.0
+        flag = ""
+        if speed < 1 - threshold:
+            flag += " 吞吐回归"
+            regressions.append(f"{r['case']}@{r['size']}: 吞吐为基线的 {speed:.2f} 倍")
+        if rss > 1 + threshold:
+            flag += " 内存回归"
+            regressions.append(f"{r['case']}@{r['size']}: 峰值 RSS 为基线的 {rss:.2f} 倍")
+        print(f"  {r['case']:<18} {r['size']:>8}  吞吐 ×{speed:.2f}  峰值RSS ×{rss:.2f}{flag}")
+
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="news-analytics 热点路径基准测试")
+    parser.add_argument("--cases", nargs="+", choices=CPU_CASES + DB_CASES,
+                        help="要运行的用例，默认全部 CPU 用例（指定 --database-url 时包括数据库用例）")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database-url", help="数据库用例使用的 PostgreSQL（建议使用独立的测试库）")
+    parser.add_argument("--save", help="结果写入该 JSON 文件，作为基线")
+    parser.add_argument("--compare", help="与该基线 JSON 比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回归阈值（比例），默认 0.2")
+    args = parser.parse_args(argv)
+
+    cases = args.cases or (CPU_CASES + DB_CASES if args.database_url else CPU_CASES)
+    if any(c in DB_CASES for c in cases) and not args.database_url:
+        parser.error("数据库用例需要 --database-url")
+
+    results = []
+    print(f"{'case':<18} {'size':>8} {'seconds':>10} {'items/s':>12} {'setup RSS':>10} {'peak RSS':>10}")
+    for case in cases:
+        sizes = [min(args.sizes)] if case == "dao_search" else args.sizes
+        for size in sizes:
+            # 每个用例一个新进程，峰值 RSS 只反映本用例
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                r = pool.submit(_run_case, case, size, args.repeat, args.database_url).result()
+            results.append(r)
+            print(f"{r['case']:<18} {r['size']:>8} {r['seconds']:>10.4f} {r['items_per_sec']:>12.1f} "
+                  f"{r['setup_rss_mb']:>9.1f}M {r['peak_rss_mb']:>9.1f}M")
+
+    report = {"meta": _meta(), "results": results}
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"与基线 {args.compare}（commit {baseline['meta'].get('commit')}）比较：")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("发现回归：\n  " + "\n  ".join(regressions))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,47 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
+from prometheus_client import make_asgi_app
 from starlette.responses import RedirectResponse
 
 from app import settings
+from app.db import engine, read_engine
+from app.metrics import http_metrics_middleware
 from app.routers import analysis, search, news
+from app.services.executor import shutdown_executor
+from app.services.job_service import run_job_recovery
+from app.services.keyword_index import run_keyword_index_sync
 
-app = FastAPI(title="News Analytics API")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # 加载并定期同步进程内关键词索引
+    sync_task = asyncio.create_task(run_keyword_index_sync())
+    # 接管其他（已退出的）进程遗留的后台作业
+    recovery_task = asyncio.create_task(run_job_recovery())
+    yield
+    sync_task.cancel()
+    recovery_task.cancel()
+    # 关闭分析任务执行器（进程池模式下回收子进程）
+    shutdown_executor()
+    # 关闭连接池
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
+
+
+app = FastAPI(title="News Analytics API", lifespan=lifespan)
 
 # 创建静态文件夹
 os.makedirs(settings.WORDCLOUD_DIR, exist_ok=True)
 # 挂载静态目录
 app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
+# Prometheus 指标
+app.mount("/metrics", make_asgi_app())
+app.middleware("http")(http_metrics_middleware)
 
 # include routers
 app.include_router(analysis.router, tags=["分析模块"])
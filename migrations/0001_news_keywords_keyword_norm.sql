@@ -0,0 +1,42 @@
+-- 0001: news_keywords 关键词倒排索引
+--
+-- 搜索原先使用 keyword ILIKE '%k%'，前导通配符无法使用 B-tree，每次搜索都要全表扫描 news_keywords。
+-- 本迁移新增归一化列 keyword_norm（与 app.utils.normalize_keyword 规则一致），
+-- 并建立：
+--   1. B-tree (keyword_norm, news_id) INCLUDE (weight)：精确匹配，聚合可走 index-only scan
+--   2. pg_trgm GIN：可选的子串匹配（SEARCH_SUBSTRING_MATCH=true 时使用）
+--
+-- 注意：CREATE INDEX CONCURRENTLY 不能在事务中执行，请用 psql 直接执行本文件（不要加 -1 / --single-transaction）。
+
+ALTER TABLE news_keywords ADD COLUMN IF NOT EXISTS keyword_norm TEXT;
+
+-- 回填历史数据（NFKC + trim + lower，与应用侧一致）
+UPDATE news_keywords
+SET keyword_norm = lower(btrim(normalize(keyword, NFKC)))
+WHERE keyword_norm IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_keywords_keyword_norm
+    ON news_keywords (keyword_norm, news_id) INCLUDE (weight);
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_keywords_keyword_norm_trgm
+    ON news_keywords USING gin (keyword_norm gin_trgm_ops);
+
+ANALYZE news_keywords;
+
+-- 执行计划验证（精确匹配应为 Index Only Scan / Bitmap Index Scan on ix_news_keywords_keyword_norm，
+-- 不应出现 Seq Scan on news_keywords）：
+--
+-- EXPLAIN (ANALYZE, BUFFERS)
+-- SELECT news_id, coalesce(sum(weight), 0) AS score
+-- FROM news_keywords
+-- WHERE keyword_norm = ANY (ARRAY['人工智能', '芯片'])
+-- GROUP BY news_id
+-- ORDER BY score DESC
+-- LIMIT 20;
+--
+-- 子串匹配（长度 >= 3 个字符时才能有效利用三元组索引，更短的词会退化为 Bitmap Heap 过滤）：
+--
+-- EXPLAIN (ANALYZE, BUFFERS)
+-- SELECT news_id FROM news_keywords WHERE keyword_norm ILIKE '%人工智能%';
@@ -0,0 +1,36 @@
+-- 0002: 预计算相关新闻
+--
+-- /api/news/{news_id}/related 改为查询 news_related 表（一次索引查找），
+-- 相似度在 extract_keywords_task 提交关键词时通过 news_keywords.keyword_norm 自连接计算：
+--   score(a, b) = Σ min(weight_a(k), weight_b(k))，k 为两篇新闻共同的关键词
+
+CREATE TABLE IF NOT EXISTS news_related (
+    news_id    BIGINT NOT NULL REFERENCES news_item (id) ON DELETE CASCADE,
+    related_id BIGINT NOT NULL REFERENCES news_item (id) ON DELETE CASCADE,
+    score      DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_news_related PRIMARY KEY (news_id, related_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_news_related_news_id_score
+    ON news_related (news_id, score);
+
+-- related_id 上的外键级联删除需要索引
+CREATE INDEX IF NOT EXISTS ix_news_related_related_id
+    ON news_related (related_id);
+
+-- 历史数据回填（可选，数据量大时请按 news_id 区间分批执行）：
+--
+-- INSERT INTO news_related (news_id, related_id, score)
+-- SELECT news_id, related_id, score
+-- FROM (
+--     SELECT t.news_id, o.news_id AS related_id,
+--            sum(least(coalesce(t.weight, 0), coalesce(o.weight, 0))) AS score,
+--            row_number() OVER (PARTITION BY t.news_id
+--                               ORDER BY sum(least(coalesce(t.weight, 0), coalesce(o.weight, 0))) DESC, o.news_id DESC) AS rn
+--     FROM news_keywords t
+--     JOIN news_keywords o ON o.keyword_norm = t.keyword_norm AND o.method = t.method AND o.news_id <> t.news_id
+--     GROUP BY t.news_id, o.news_id
+-- ) ranked
+-- WHERE rn <= 20
+-- ON CONFLICT (news_id, related_id) DO UPDATE SET score = excluded.score;
@@ -0,0 +1,18 @@
+-- 0003: 后台作业表
+--
+-- /api/analysis/jobs/* 创建的积压数据提取作业，状态和进度落库，任意副本都可以查询。
+-- 积压数据通过 SELECT ... FOR UPDATE SKIP LOCKED 认领，多个副本可以并行处理。
+
+CREATE TABLE IF NOT EXISTS analysis_job (
+    id          BIGSERIAL PRIMARY KEY,
+    kind        TEXT        NOT NULL,
+    status      TEXT        NOT NULL DEFAULT 'pending',
+    params      JSON,
+    processed   BIGINT      NOT NULL DEFAULT 0,
+    chunks      BIGINT      NOT NULL DEFAULT 0,
+    error       TEXT,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at  TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
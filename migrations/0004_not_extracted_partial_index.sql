@@ -0,0 +1,22 @@
+-- 0004: 待提取积压数据的部分索引
+--
+-- stream_news_info_rows / stream_news_item_rows_not_extracted 以及作业认领
+-- 均按 (created_at DESC, id DESC) 做 keyset 翻页，只扫描 extracted = false 的行。
+-- 部分索引只包含未提取的行，已处理数据再多也不会拖慢扫描。
+--
+-- keyset 翻页要求 created_at 非空：回填 news_info.created_at 并补上默认值。
+-- 注意：CREATE INDEX CONCURRENTLY 不能在事务中执行。
+
+UPDATE news_info
+SET created_at = coalesce(updated_at, news_date::timestamptz)
+WHERE created_at IS NULL;
+
+ALTER TABLE news_info ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_info_not_extracted
+    ON news_info (created_at DESC, id DESC)
+    WHERE extracted = false;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_item_not_extracted
+    ON news_item (created_at DESC, id DESC)
+    WHERE extracted = false;
@@ -0,0 +1,24 @@
+-- 0005: 关键词按天 / 来源汇总表
+--
+-- 趋势关键词从汇总表计算（当前窗口 vs 历史基线），不再扫描 news_keywords 原始行。
+-- 提取关键词提交时按批次增量累加；news_item.published_at 只有日期精度，因此只汇总到天。
+
+CREATE TABLE IF NOT EXISTS keyword_daily_stats (
+    day        DATE             NOT NULL,
+    source     VARCHAR(50)      NOT NULL DEFAULT '',
+    keyword    TEXT             NOT NULL,
+    doc_count  INTEGER          NOT NULL DEFAULT 0,
+    weight_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ      NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_keyword_daily_stats PRIMARY KEY (day, source, keyword)
+);
+
+-- 历史数据回填
+INSERT INTO keyword_daily_stats (day, source, keyword, doc_count, weight_sum)
+SELECT i.published_at, coalesce(i.source, ''), k.keyword_norm, count(*), coalesce(sum(k.weight), 0)
+FROM news_keywords k
+JOIN news_item i ON i.id = k.news_id
+WHERE i.published_at IS NOT NULL AND k.keyword_norm IS NOT NULL
+GROUP BY i.published_at, coalesce(i.source, ''), k.keyword_norm
+ON CONFLICT (day, source, keyword) DO UPDATE
+    SET doc_count = excluded.doc_count, weight_sum = excluded.weight_sum;
@@ -0,0 +1,27 @@
+-- 0006: 簇摘要表
+--
+-- 在线聚类的簇大小、代表标题、高频词、时间跨度，由 extract_news_items_task 按批次增量维护；
+-- /api/news/cluster 直接分页读取该表，不在查询时对 news_item 做 GROUP BY。
+-- 注意：CREATE INDEX CONCURRENTLY 不能在事务中执行。
+
+CREATE TABLE IF NOT EXISTS news_cluster_summary (
+    cluster_method          TEXT        NOT NULL,
+    cluster_id              BIGINT      NOT NULL,
+    size                    BIGINT      NOT NULL DEFAULT 0,
+    representative_item_id  TEXT,
+    representative_title    TEXT,
+    representative_url      TEXT,
+    representative_distance DOUBLE PRECISION,
+    top_keywords            JSONB       NOT NULL DEFAULT '{}',
+    first_published_at      DATE,
+    last_published_at       DATE,
+    updated_at              TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_news_cluster_summary PRIMARY KEY (cluster_method, cluster_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_news_cluster_summary_size
+    ON news_cluster_summary (cluster_method, size);
+
+-- 簇成员分页
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_item_cluster
+    ON news_item (cluster_method, cluster_id, id);
@@ -0,0 +1,7 @@
+-- 0007: keyword_daily_stats.updated_at 索引
+--
+-- 进程内关键词索引启动时全量加载，之后按 updated_at 水位线定期增量同步（合并其他副本的提交）。
+-- CREATE INDEX CONCURRENTLY 不能在事务中执行，请直接用 psql -f 运行本文件。
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_keyword_daily_stats_updated_at
+    ON keyword_daily_stats (updated_at);
@@ -0,0 +1,11 @@
+-- 0008: 分词结果缓存表
+--
+-- content_hash = blake2b-128(分词缓存版本 + 清洗后文本)，tokens 为 wordfreq_cn 原始分词结果，
+-- 停词、单字、纯数字的过滤在读取时进行，修改停词表不需要清空缓存。
+-- 升级 wordfreq_cn / pkuseg 模型后请调大 SEGMENT_CACHE_VERSION（旧行可直接 TRUNCATE）。
+
+CREATE TABLE IF NOT EXISTS segment_cache (
+    content_hash BYTEA       PRIMARY KEY,
+    tokens       TEXT[]      NOT NULL,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,14 @@
+-- 0009: news_item 标题向量（pgvector）
+--
+-- embedding 为标题的 LSA 向量（TF-IDF → TruncatedSVD，维度 = EMBEDDING_DIM，默认 128），
+-- embedding_version 为生成它的模型版本。/api/news/{news_id}/similar 通过 HNSW 索引做余弦近邻检索。
+-- 执行后通过 POST /api/analysis/jobs/embed_news 拟合模型并回填历史数据。
+-- 注意：CREATE INDEX CONCURRENTLY 不能在事务中执行。
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE news_item ADD COLUMN IF NOT EXISTS embedding vector(128);
+ALTER TABLE news_item ADD COLUMN IF NOT EXISTS embedding_version BIGINT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_item_embedding_hnsw
+    ON news_item USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
@@ -0,0 +1,12 @@
+-- 0010: news_item 标题全文索引（混合搜索）
+--
+-- title_tsv 由应用侧分词（wordfreq_cn，与关键词提取同一套过滤规则）后以空格连接，
+-- 再用 'simple' 配置生成：to_tsvector('simple', '分词 结果 ...')。PostgreSQL 自带的解析器不会切分中文，
+-- 因此不使用生成列 / 触发器。/api/search/news 通过 GIN 索引匹配 title_tsv 并与关键词权重融合打分。
+-- 执行后通过 POST /api/analysis/jobs/index_titles 回填历史数据。
+-- 注意：CREATE INDEX CONCURRENTLY 不能在事务中执行。
+
+ALTER TABLE news_item ADD COLUMN IF NOT EXISTS title_tsv TSVECTOR;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_news_item_title_tsv
+    ON news_item USING gin (title_tsv);
@@ -0,0 +1,107 @@
+-- 0011: news_item / news_keywords 按 published_at 月度范围分区
+--
+-- - 分区表的主键 / 唯一约束必须包含分区键：news_item 主键改为 (id, published_at)，
+--   news_keywords 新增 published_at（与所属新闻一致），主键改为 (id, published_at)，
+--   唯一约束改为 (news_id, keyword, method, published_at)，外键改为 (news_id, published_at) → news_item
+-- - news_related 不再有指向 news_item 的外键（被引用列必须包含分区键），归档分区时由维护命令清理
+-- - published_at 为空的历史行用 created_at 的日期回填（主键列不能为空）
+-- - 月分区命名 <表名>_pYYYY_MM，另有 <表名>_default 接收超出已建分区范围的行；
+--   之后的分区由 `python -m app.cli partitions ensure` 提前创建，过期分区由 `partitions detach` 分离 / 归档
+--
+-- 注意：本迁移重写两张表，执行期间持有排他锁，请在维护窗口内用 psql 执行（本文件自带事务）。
+
+BEGIN;
+
+LOCK TABLE news_item, news_keywords, news_related IN ACCESS EXCLUSIVE MODE;
+
+-- 1) 回填分区键
+UPDATE news_item SET published_at = created_at::date WHERE published_at IS NULL;
+
+ALTER TABLE news_keywords ADD COLUMN IF NOT EXISTS published_at DATE;
+UPDATE news_keywords k
+SET published_at = n.published_at
+FROM news_item n
+WHERE n.id = k.news_id AND k.published_at IS NULL;
+
+-- 2) 去掉引用 news_item(id) 的外键
+ALTER TABLE news_related DROP CONSTRAINT IF EXISTS news_related_news_id_fkey;
+ALTER TABLE news_related DROP CONSTRAINT IF EXISTS news_related_related_id_fkey;
+ALTER TABLE news_keywords DROP CONSTRAINT IF EXISTS news_keywords_news_id_fkey;
+
+-- 3) 旧表改名，按原列定义创建分区表；自增序列改挂到新表上
+ALTER TABLE news_keywords RENAME TO news_keywords_old;
+ALTER TABLE news_item RENAME TO news_item_old;
+
+CREATE TABLE news_item (LIKE news_item_old INCLUDING DEFAULTS) PARTITION BY RANGE (published_at);
+ALTER TABLE news_item ALTER COLUMN published_at SET NOT NULL;
+
+CREATE TABLE news_keywords (LIKE news_keywords_old INCLUDING DEFAULTS) PARTITION BY RANGE (published_at);
+ALTER TABLE news_keywords ALTER COLUMN published_at SET NOT NULL;
+
+DO $$
+DECLARE
+    seq TEXT;
+BEGIN
+    seq := pg_get_serial_sequence('news_item_old', 'id');
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY news_item.id', seq);
+    seq := pg_get_serial_sequence('news_keywords_old', 'id');
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY news_keywords.id', seq);
+END $$;
+
+-- 4) 为已有数据所在月份到未来 3 个月创建分区，另建默认分区
+DO $$
+DECLARE
+    first_month DATE;
+    last_month DATE := date_trunc('month', current_date + interval '3 months')::date;
+    month DATE;
+    parent TEXT;
+BEGIN
+    SELECT date_trunc('month', coalesce(min(published_at), current_date))::date INTO first_month FROM news_item_old;
+    FOREACH parent IN ARRAY ARRAY['news_item', 'news_keywords'] LOOP
+        month := first_month;
+        WHILE month <= last_month LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_p' || to_char(month, 'YYYY_MM'), parent, month, (month + interval '1 month')::date
+            );
+            month := (month + interval '1 month')::date;
+        END LOOP;
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END LOOP;
+END $$;
+
+-- 5) 迁移数据（先建表后建索引，写入更快）
+INSERT INTO news_item SELECT * FROM news_item_old;
+INSERT INTO news_keywords SELECT * FROM news_keywords_old WHERE published_at IS NOT NULL;
+
+DROP TABLE news_keywords_old;
+DROP TABLE news_item_old;
+
+-- 6) 约束与索引（在父表上创建，自动作用于现有及之后创建的分区）
+ALTER TABLE news_item ADD CONSTRAINT news_item_pkey PRIMARY KEY (id, published_at);
+ALTER TABLE news_item ADD CONSTRAINT uq_news_date UNIQUE (item_id, published_at);
+ALTER TABLE news_item ADD CONSTRAINT news_item_news_info_id_fkey
+    FOREIGN KEY (news_info_id) REFERENCES news_info (id) ON DELETE CASCADE;
+CREATE INDEX ix_news_item_cluster ON news_item (cluster_method, cluster_id, id);
+CREATE INDEX ix_news_item_embedding_hnsw
+    ON news_item USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX ix_news_item_title_tsv ON news_item USING gin (title_tsv);
+CREATE INDEX ix_news_item_not_extracted ON news_item (created_at DESC, id DESC) WHERE extracted = false;
+
+ALTER TABLE news_keywords ADD CONSTRAINT news_keywords_pkey PRIMARY KEY (id, published_at);
+ALTER TABLE news_keywords ADD CONSTRAINT uq_news_keywords UNIQUE (news_id, keyword, method, published_at);
+ALTER TABLE news_keywords ADD CONSTRAINT news_keywords_news_id_fkey
+    FOREIGN KEY (news_id, published_at) REFERENCES news_item (id, published_at) ON DELETE CASCADE;
+CREATE INDEX ix_news_keywords_keyword_norm ON news_keywords (keyword_norm, news_id) INCLUDE (weight);
+CREATE INDEX ix_news_keywords_keyword_norm_trgm ON news_keywords USING gin (keyword_norm gin_trgm_ops);
+
+COMMIT;
+
+ANALYZE news_item;
+ANALYZE news_keywords;
+
+-- 分区裁剪验证（只应出现 news_item_p2025_01 一个分区）：
+--
+--   EXPLAIN SELECT id FROM news_item
+--   WHERE extracted = false AND published_at >= '2025-01-01' AND published_at <= '2025-01-31'
+--   ORDER BY created_at DESC, id DESC LIMIT 500;
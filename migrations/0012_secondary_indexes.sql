@@ -0,0 +1,19 @@
+-- 0012: 补齐 DAO 查询路径上的二级索引
+--
+-- 各查询路径对应的索引（python -m app.cli check-plans 会对 DAO 语句逐条 EXPLAIN 验证）：
+--   news_info  extracted = false + created_at 倒序  → ix_news_info_not_extracted（0004，部分索引）
+--   news_item  extracted = false + created_at 倒序  → ix_news_item_not_extracted（0004 / 0011，部分索引）
+--   news_item  cluster_method + cluster_id          → ix_news_item_cluster
+--   news_item  news_info_id（删除 news_info 时的级联外键） → ix_news_item_news_info_id（本迁移）
+--   news_keywords news_id                           → uq_news_keywords 前缀
+--   news_keywords keyword_norm 自连接（相关新闻）     → ix_news_keywords_keyword_norm，本迁移改为 INCLUDE (weight, method)，
+--                                                     自连接条件中的 method 也能走 index-only scan
+--
+-- 注意：分区表上不支持 CREATE INDEX CONCURRENTLY，本迁移建索引期间会阻塞写入，请在低峰期执行。
+
+CREATE INDEX IF NOT EXISTS ix_news_item_news_info_id ON news_item (news_info_id);
+
+CREATE INDEX IF NOT EXISTS ix_news_keywords_keyword_norm_cover
+    ON news_keywords (keyword_norm, news_id) INCLUDE (weight, method);
+DROP INDEX IF EXISTS ix_news_keywords_keyword_norm;
+ALTER INDEX ix_news_keywords_keyword_norm_cover RENAME TO ix_news_keywords_keyword_norm;
@@ -0,0 +1,11 @@
+-- 0013: 增量导出水位线索引
+--
+-- Parquet 导出（app.services.export_service）按 (updated_at, id) keyset 扫描 news_item / news_keywords，
+-- 增量导出只读取水位线之后变更的行。upsert 冲突更新时同时刷新 updated_at。
+-- 注意：分区表上不支持 CREATE INDEX CONCURRENTLY，请在低峰期执行。
+
+UPDATE news_item SET updated_at = created_at WHERE updated_at IS NULL;
+UPDATE news_keywords SET updated_at = created_at WHERE updated_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_news_item_updated_at ON news_item (updated_at, id);
+CREATE INDEX IF NOT EXISTS ix_news_keywords_updated_at ON news_keywords (updated_at, id);
@@ -0,0 +1,25 @@
+-- 0014: 语料级 IDF 统计（文档频率）移入数据库
+--
+-- 此前 DF 保存在每个进程各自的 JSON 文件中（IDF_MODEL_PATH），且在调用方事务提交之前就已写盘：
+-- 失败重试、重新提取会重复计数，多个副本之间相互覆盖。现在 DF 与关键词在同一事务中合并，
+-- idf_document 记录已计入的新闻，同一篇新闻无论处理几次只计一次。
+--
+-- 旧的 idf_model.json 不再读取；DF 随新的提取作业重新累积（可对已提取的新闻重新执行关键词提取）。
+
+CREATE TABLE IF NOT EXISTS idf_document (
+    news_id    BIGINT      PRIMARY KEY,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 按 doc_freq 排序取词表只在拟合向量模型时执行，不建索引，避免每次合并 DF 都维护一份
+CREATE TABLE IF NOT EXISTS idf_term (
+    term     TEXT   PRIMARY KEY,
+    doc_freq BIGINT NOT NULL
+);
+
+-- 单行计数器：语料中的文档总数
+CREATE TABLE IF NOT EXISTS idf_corpus (
+    id     SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    n_docs BIGINT   NOT NULL DEFAULT 0
+);
+INSERT INTO idf_corpus (id, n_docs) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
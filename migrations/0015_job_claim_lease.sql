@@ -0,0 +1,19 @@
+-- 0015: 积压数据认领改为租约 + 尝试次数
+--
+-- 作业不再在持有 FOR UPDATE 行锁的事务中做聚类、向量、TF-IDF 等 CPU 计算：
+-- 先在短事务中认领（claimed_until = now() + JOB_CLAIM_LEASE_SECONDS，attempts + 1）并提交，
+-- 事务外计算，再在第二个事务中写入结果并标记 extracted。
+--   - 进程崩溃时租约到期，其他副本可重新认领
+--   - attempts 达到 JOB_MAX_ATTEMPTS 的行不再认领；逐条重试仍失败的行（poison rows）直接记满次数，
+--     错误写入 error 列。排查修复后把 attempts 置 0 即可重新处理
+--
+-- 带常量默认值的 ADD COLUMN 只修改元数据，不重写表。
+
+ALTER TABLE news_info
+    ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS attempts      INTEGER NOT NULL DEFAULT 0;
+
+ALTER TABLE news_item
+    ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS attempts      INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS error         TEXT;
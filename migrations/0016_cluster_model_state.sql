@@ -0,0 +1,33 @@
+-- 0016: 在线聚类模型状态移入数据库
+--
+-- 此前质心、样本数和预热缓冲区保存在每个进程各自的 joblib 文件中（CLUSTER_MODEL_PATH），
+-- 且在写入新闻items的事务之前就已更新：多个 worker / 副本各自漂移、互相覆盖，
+-- 超时、写入失败、逐条重试都会重复拟合和计数，预热缓冲区的补分配也会丢失。
+-- 现在模型状态与新闻items在同一事务中更新（先 SELECT ... FOR UPDATE 锁住状态行），随事务提交或回滚。
+--
+-- 旧的 cluster_model.joblib 不再读取；新模型的 cluster_method 带 "-v2" 后缀，
+-- 与旧模型的簇分配、簇摘要互不混淆，簇随新的提取作业重新积累。
+
+CREATE TABLE IF NOT EXISTS cluster_model_state (
+    cluster_method TEXT        PRIMARY KEY,
+    -- n_clusters × n_features 的 float32 矩阵（行优先），首次拟合之前为 NULL
+    centers        BYTEA,
+    -- 各簇累计样本数（质心为累计均值，增量更新时的权重）
+    counts         BIGINT[],
+    version        BIGINT      NOT NULL DEFAULT 0,
+    -- 每次写入随机生成，进程内缓存的质心与之一致时不再重新读取
+    revision       UUID,
+    updated_at     TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 预热缓冲区：首次拟合之前到达的新闻（不足 n_clusters 条），首次拟合时补分配 cluster_id 后删除
+CREATE TABLE IF NOT EXISTS cluster_model_pending (
+    cluster_method TEXT        NOT NULL,
+    item_id        TEXT        NOT NULL,
+    published_at   DATE        NOT NULL,
+    title          TEXT,
+    url            TEXT,
+    title_tokens   TEXT[]      NOT NULL,
+    created_at     TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_cluster_model_pending PRIMARY KEY (cluster_method, item_id, published_at)
+);
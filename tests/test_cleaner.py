@@ -0,0 +1,62 @@
+import pytest
+
+from app.utils import clean_html, clean_html_batch, normalize_keyword
+
+SAMPLES = [
+    "",
+    None,
+    "纯文本，没有标签",
+    "<p>第一段</p><p>第二段</p>",
+    '<a href="https://example.com/a?b=1">链接</a> 见 https://example.com/path?x=1&y=2 结束',
+    "  多个   空白\t\n换行  ",
+    "百分比 50%，价格 $1,000 / 吨 - 上涨",
+    "<div>未闭合的标签",
+    "1 < 2 且 3 > 2",
+    "全角ＡＢＣ与半角abc",
+    "含有\x00分隔符的\x00文本",
+    "<b>\x00</b>",
+    "http://a.com",
+    "emoji 🙂 和符号 ©",
+]
+
+
+class TestCleanHtmlBatch:
+    def test_matches_clean_html(self):
+        assert clean_html_batch(SAMPLES) == [clean_html(t) for t in SAMPLES]
+
+    @pytest.mark.parametrize("text", SAMPLES)
+    def test_single_item_matches(self, text):
+        assert clean_html_batch([text]) == [clean_html(text)]
+
+    def test_patterns_do_not_cross_items(self):
+        # 前一条未闭合的标签 / URL 不能吞掉后一条的内容
+        texts = ["<div class=", "正文> 保留", "https://example.com", "后一条"]
+        assert clean_html_batch(texts) == [clean_html(t) for t in texts]
+        assert clean_html_batch(texts)[3] == "后一条"
+
+    def test_empty_input(self):
+        assert clean_html_batch([]) == []
+
+    def test_accepts_iterables(self):
+        assert clean_html_batch(t for t in ["<p>a</p>", "b"]) == ["a", "b"]
+
+    def test_clean_html(self):
+        assert clean_html("<p>Hello, 世界!</p> https://x.cn/y") == "Hello 世界"
+
+
+class TestNormalizeKeyword:
+    @pytest.mark.parametrize("keyword, expected", [
+        ("ＡＩ", "ai"),
+        ("  芯片  ", "芯片"),
+        ("OpenAI", "openai"),
+        ("５Ｇ网络", "5g网络"),
+        ("", ""),
+        (None, ""),
+    ])
+    def test_normalize(self, keyword, expected):
+        assert normalize_keyword(keyword) == expected
+
+    def test_idempotent(self):
+        for keyword in ["ＡＢＣ", " Mixed Case ", "中文"]:
+            once = normalize_keyword(keyword)
+            assert normalize_keyword(once) == once
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.services.cluster_model import OnlineClusterModel
+
+DOCS = [
+    ["芯片", "半导体", "出口"],
+    ["芯片", "半导体", "工厂"],
+    ["足球", "联赛", "冠军"],
+    ["足球", "联赛", "转会"],
+]
+
+
+@pytest.fixture
+def model():
+    model, labels, _ = OnlineClusterModel.fit(DOCS, n_clusters=2, n_features=64)
+    assert labels[0] == labels[1] != labels[2] == labels[3]
+    return model
+
+
+class TestOnlineClusterModel:
+    def test_fit_counts(self, model):
+        assert model.counts.sum() == len(DOCS)
+        assert model.centers.shape == (2, 64)
+        assert model.centers.dtype == np.float32
+
+    def test_assign_nearest_center(self, model):
+        cluster_ids, distances, _ = model.assign([["芯片", "出口"], ["足球", "冠军"]], [True, True])
+        fitted_ids, _, _ = model.assign(DOCS, [False] * len(DOCS))
+        assert cluster_ids == [fitted_ids[0], fitted_ids[2]]
+        assert all(d is not None and d >= 0 for d in distances)
+
+    def test_assign_returns_updated_copy(self, model):
+        centers, counts = model.centers.copy(), model.counts.copy()
+        cluster_ids, _, updated = model.assign([["芯片", "出口"]], [True])
+
+        # 原模型不变（事务回滚时进程内缓存仍然有效）
+        assert np.array_equal(model.centers, centers)
+        assert np.array_equal(model.counts, counts)
+        assert updated.counts[cluster_ids[0]] == counts[cluster_ids[0]] + 1
+        assert not np.array_equal(updated.centers[cluster_ids[0]], centers[cluster_ids[0]])
+
+    def test_assign_without_learning(self, model):
+        cluster_ids, _, updated = model.assign([["芯片", "出口"]], [False])
+        assert cluster_ids[0] is not None
+        assert updated is None
+
+    def test_empty_docs(self, model):
+        cluster_ids, distances, updated = model.assign([[], ["足球"]], [True, True])
+        assert cluster_ids[0] is None and distances[0] is None
+        assert cluster_ids[1] is not None
+        assert updated.counts.sum() == len(DOCS) + 1
+
+    def test_center_is_running_mean(self):
+        model = OnlineClusterModel(np.zeros((1, 4), dtype=np.float32), np.array([1], dtype=np.int64))
+        _, _, updated = model.assign([["a"]], [True])
+        # 累计均值：(0 × 1 + x) / 2
+        assert updated.counts[0] == 2
+        assert updated.centers[0].sum() == pytest.approx(0.5)
@@ -0,0 +1,55 @@
+import json
+from datetime import date
+
+from app.dao.cluster_summary_dao import _batch_summaries, _removal_rows, _removals
+
+DAY = date(2025, 1, 1)
+
+
+def _item(item_id, cluster_id, tokens, distance=0.5, method="m"):
+    return {
+        "item_id": item_id,
+        "published_at": DAY,
+        "title": f"title {item_id}",
+        "url": f"https://example.com/{item_id}",
+        "cluster_method": method,
+        "cluster_id": cluster_id,
+        "cluster_distance": distance,
+        "title_tokens": tokens,
+    }
+
+
+class TestRemovalRows:
+    def test_groups_by_cluster(self):
+        rows = _removal_rows([
+            _item("a", 1, ["芯片", "出口"]),
+            _item("b", 1, ["芯片"]),
+            _item("c", 2, ["足球"]),
+        ])
+        assert [(r["cluster_id"], r["removed"], r["removed_item_ids"]) for r in rows] == [
+            (1, 2, ["a", "b"]),
+            (2, 1, ["c"]),
+        ]
+        assert json.loads(rows[0]["removed_keywords"]) == {"芯片": 2, "出口": 1}
+
+    def test_empty(self):
+        assert _removal_rows([]) == []
+
+
+class TestRemovals:
+    def test_only_reassigned_items_are_removed_from_old_cluster(self):
+        previous = {("a", DAY): ("m", 1), ("b", DAY): ("m", 2)}
+        rows = _removals([_item("a", 1, ["芯片"]), _item("b", 3, ["足球"]), _item("new", 1, ["电池"])], previous)
+        assert [(r["cluster_id"], r["removed_item_ids"]) for r in rows] == [(2, ["b"])]
+
+
+class TestBatchSummaries:
+    def test_representative_is_closest_item(self):
+        rows = _batch_summaries([_item("a", 1, ["芯片"], distance=0.8), _item("b", 1, ["芯片"], distance=0.2)])
+        assert len(rows) == 1
+        assert rows[0]["size"] == 2
+        assert rows[0]["representative_item_id"] == "b"
+        assert rows[0]["top_keywords"] == {"芯片": 2}
+
+    def test_skips_items_without_distance(self):
+        assert _batch_summaries([_item("a", 1, ["芯片"], distance=None), _item("b", None, [])]) == []
@@ -0,0 +1,57 @@
+import math
+
+import pytest
+
+from app.services.idf_model import IdfModel
+
+
+class TestIdfModel:
+    def test_partial_fit_counts_documents_once_per_term(self):
+        model = IdfModel()
+        model.partial_fit([["a", "a", "b"], ["b", "c"]])
+        assert model.n_docs == 2
+        assert model.doc_freq == {"a": 1, "b": 2, "c": 1}
+
+    def test_partial_fit_accumulates(self):
+        model = IdfModel({"a": 3}, n_docs=5)
+        model.partial_fit([["a"], ["b"]])
+        assert model.n_docs == 7
+        assert model.doc_freq["a"] == 4
+        assert model.doc_freq["b"] == 1
+
+    def test_incremental_fit_equals_single_fit(self):
+        docs = [["a", "b"], ["b", "c"], ["c", "d", "a"], ["a"]]
+        whole = IdfModel()
+        whole.partial_fit(docs)
+        parts = IdfModel()
+        parts.partial_fit(docs[:1])
+        parts.partial_fit(docs[1:])
+        assert parts.doc_freq == whole.doc_freq
+        assert parts.n_docs == whole.n_docs
+
+    def test_idf_matches_smooth_idf(self):
+        model = IdfModel({"a": 2}, n_docs=10)
+        assert model.idf("a") == pytest.approx(math.log(11 / 3) + 1)
+        # 未出现过的词 df=0
+        assert model.idf("unseen") == pytest.approx(math.log(11) + 1)
+
+    def test_rare_terms_weigh_more(self):
+        model = IdfModel({"common": 90, "rare": 1}, n_docs=100)
+        assert model.idf("rare") > model.idf("common")
+
+    def test_top_k_orders_by_tfidf(self):
+        model = IdfModel({"common": 90, "rare": 1, "mid": 10}, n_docs=100)
+        top = model.top_k(["common", "common", "rare", "mid"], k=2)
+        assert [term for term, _ in top] == ["rare", "mid"]
+
+    def test_top_k_weights_are_l2_normalized(self):
+        model = IdfModel({"a": 1, "b": 5, "c": 20}, n_docs=50)
+        tokens = ["a", "b", "b", "c"]
+        all_terms = model.top_k(tokens, k=10)
+        assert len(all_terms) == 3
+        assert math.sqrt(sum(w * w for _, w in all_terms)) == pytest.approx(1.0)
+        # 截断 k 不改变权重（归一化基于全部词）
+        assert model.top_k(tokens, k=1) == all_terms[:1]
+
+    def test_top_k_empty(self):
+        assert IdfModel().top_k([], k=5) == []
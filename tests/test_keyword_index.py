@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.keyword_index import KeywordIndex
+
+TODAY = date.today()
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def _row(day, source, keyword, doc_count, weight_sum):
+    return {"day": day, "source": source, "keyword": keyword, "doc_count": doc_count, "weight_sum": weight_sum}
+
+
+@pytest.fixture
+def index():
+    index = KeywordIndex()
+    index.apply([
+        _row(TODAY, "新华网", "芯片", 3, 1.5),
+        _row(TODAY, "新华网", "AI", 1, 0.4),
+        _row(TODAY, "人民网", "芯片", 2, 1.0),
+        _row(YESTERDAY, "人民网", "AI", 3, 2.0),
+        _row(YESTERDAY, "人民网", "电池", 1, 0.2),
+    ], replace=True)
+    return index
+
+
+class TestKeywordIndex:
+    def test_top_sums_across_days_and_sources(self, index):
+        top = index.top(YESTERDAY, TODAY)
+        assert [r["keyword"] for r in top] == ["芯片", "AI", "电池"]
+        assert top[0]["weight"] == pytest.approx(2.5)
+        assert top[0]["count"] == 5
+        assert top[1]["weight"] == pytest.approx(2.4)
+
+    def test_top_by_count(self, index):
+        top = index.top(YESTERDAY, TODAY, metric="count")
+        assert [(r["keyword"], r["count"]) for r in top] == [("芯片", 5), ("AI", 4), ("电池", 1)]
+
+    def test_top_date_range(self, index):
+        top = index.top(TODAY, TODAY)
+        assert [r["keyword"] for r in top] == ["芯片", "AI"]
+        assert top[1]["weight"] == pytest.approx(0.4)
+
+    def test_top_source_filter(self, index):
+        top = index.top(YESTERDAY, TODAY, source="新华网")
+        assert [r["keyword"] for r in top] == ["芯片", "AI"]
+        assert top[0]["weight"] == pytest.approx(1.5)
+        assert index.top(YESTERDAY, TODAY, source="不存在的来源") == []
+
+    def test_top_limit(self, index):
+        assert len(index.top(YESTERDAY, TODAY, limit=1)) == 1
+
+    def test_empty_range(self, index):
+        assert index.top(TODAY - timedelta(days=30), TODAY - timedelta(days=10)) == []
+
+    def test_delta_apply_accumulates(self, index):
+        index.apply([_row(TODAY, "新华网", "AI", 2, 1.0)])
+        top = index.top(TODAY, TODAY, source="新华网")
+        ai = next(r for r in top if r["keyword"] == "AI")
+        assert ai["weight"] == pytest.approx(1.4)
+        assert ai["count"] == 3
+
+    def test_replace_apply_overwrites(self, index):
+        index.apply([_row(TODAY, "新华网", "AI", 2, 1.0)], replace=True)
+        top = index.top(TODAY, TODAY, source="新华网")
+        ai = next(r for r in top if r["keyword"] == "AI")
+        assert ai["weight"] == pytest.approx(1.0)
+        assert ai["count"] == 2
+        # 同一切片中的其他关键词不受影响
+        assert next(r for r in top if r["keyword"] == "芯片")["weight"] == pytest.approx(1.5)
+
+    def test_zero_scores_are_skipped(self, index):
+        index.apply([_row(YESTERDAY, "人民网", "电池", -1, -0.2)])
+        assert "电池" not in [r["keyword"] for r in index.top(YESTERDAY, TODAY)]
+
+    def test_rows_outside_retention_are_ignored(self, index, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "KEYWORD_INDEX_DAYS", 7)
+        old = TODAY - timedelta(days=30)
+        index.apply([_row(old, "新华网", "旧闻", 1, 1.0)])
+        assert index.top(old, old) == []
+
+    def test_evict(self, index, monkeypatch):
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "KEYWORD_INDEX_DAYS", 0)
+        index.evict()
+        assert index.top(YESTERDAY, YESTERDAY) == []
+        assert index.top(TODAY, TODAY) != []
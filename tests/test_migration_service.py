@@ -0,0 +1,72 @@
+import pytest
+
+from app.services.migration_service import split_sql, parse_migration_version
+
+
+class TestSplitSql:
+    def test_splits_on_semicolons(self):
+        script = "CREATE TABLE a (id int);\nCREATE TABLE b (id int);\n"
+        assert split_sql(script) == ["CREATE TABLE a (id int)", "CREATE TABLE b (id int)"]
+
+    def test_last_statement_without_semicolon(self):
+        assert split_sql("SELECT 1;\nSELECT 2") == ["SELECT 1", "SELECT 2"]
+
+    def test_skips_empty_statements(self):
+        assert split_sql(";;\n  ;SELECT 1;;") == ["SELECT 1"]
+
+    def test_semicolon_in_single_quotes(self):
+        assert split_sql("INSERT INTO t VALUES ('a;b');SELECT 1;") == ["INSERT INTO t VALUES ('a;b')", "SELECT 1"]
+
+    def test_doubled_quote_escape(self):
+        script = "INSERT INTO t VALUES ('it''s; fine');SELECT 1;"
+        assert split_sql(script) == ["INSERT INTO t VALUES ('it''s; fine')", "SELECT 1"]
+
+    def test_semicolon_in_quoted_identifier(self):
+        assert split_sql('SELECT 1 AS "a;""b";') == ['SELECT 1 AS "a;""b"']
+
+    def test_dollar_quoted_body(self):
+        script = (
+            "CREATE FUNCTION f() RETURNS trigger AS $$\n"
+            "BEGIN\n  NEW.updated_at = now();\n  RETURN NEW;\nEND;\n"
+            "$$ LANGUAGE plpgsql;\n"
+            "SELECT 1;"
+        )
+        statements = split_sql(script)
+        assert len(statements) == 2
+        assert statements[0].startswith("CREATE FUNCTION f()")
+        assert statements[0].endswith("$$ LANGUAGE plpgsql")
+        assert "RETURN NEW;" in statements[0]
+
+    def test_tagged_dollar_quote(self):
+        script = "DO $body$ BEGIN PERFORM 1; PERFORM '$$'; END $body$;SELECT 1;"
+        assert split_sql(script) == ["DO $body$ BEGIN PERFORM 1; PERFORM '$$'; END $body$", "SELECT 1"]
+
+    def test_line_comment(self):
+        script = "-- header; not a statement\nSELECT 1; -- trailing; comment\nSELECT 2;"
+        assert split_sql(script) == ["SELECT 1", "SELECT 2"]
+
+    def test_block_comment(self):
+        script = "/* multi\n line; comment */ SELECT 1 /* inline; */ + 1;"
+        assert split_sql(script) == ["SELECT 1  + 1"]
+
+    def test_comment_markers_inside_quotes_are_kept(self):
+        script = "SELECT '-- not a comment', '/* nor this */';"
+        assert split_sql(script) == ["SELECT '-- not a comment', '/* nor this */'"]
+
+    def test_unterminated_block_comment(self):
+        assert split_sql("SELECT 1; /* never closed; SELECT 2;") == ["SELECT 1"]
+
+
+class TestParseMigrationVersion:
+    @pytest.mark.parametrize("value, expected", [("0011", 11), ("11", 11), ("0001", 1), (12, 12), (" 0009 ", 9)])
+    def test_valid(self, value, expected):
+        assert parse_migration_version(value) == expected
+
+    @pytest.mark.parametrize("value", ["", "abc", "00011", "0011_partition", "-1", "1.5", True])
+    def test_invalid(self, value):
+        with pytest.raises(ValueError):
+            parse_migration_version(value)
+
+    def test_compares_numerically(self):
+        # 字符串比较时 "11" > "0012"
+        assert parse_migration_version("11") < parse_migration_version("0012")
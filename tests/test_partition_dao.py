@@ -0,0 +1,33 @@
+from datetime import date
+
+import pytest
+
+from app.dao.partition_dao import add_months, partition_name
+
+
+class TestAddMonths:
+    @pytest.mark.parametrize("month, n, expected", [
+        (date(2025, 1, 1), 0, date(2025, 1, 1)),
+        (date(2025, 1, 1), 1, date(2025, 2, 1)),
+        (date(2025, 11, 1), 2, date(2026, 1, 1)),
+        (date(2025, 12, 1), 1, date(2026, 1, 1)),
+        (date(2025, 1, 1), -1, date(2024, 12, 1)),
+        (date(2025, 3, 1), -14, date(2024, 1, 1)),
+        (date(2025, 1, 1), 24, date(2027, 1, 1)),
+    ])
+    def test_add_months(self, month, n, expected):
+        assert add_months(month, n) == expected
+
+    def test_returns_first_of_month(self):
+        assert add_months(date(2025, 1, 31), 1) == date(2025, 2, 1)
+
+    def test_inverse(self):
+        month = date(2025, 7, 1)
+        for n in range(-30, 31):
+            assert add_months(add_months(month, n), -n) == month
+
+
+class TestPartitionName:
+    def test_partition_name(self):
+        assert partition_name("news_item", date(2025, 1, 1)) == "news_item_p2025_01"
+        assert partition_name("news_keywords", date(2024, 12, 15)) == "news_keywords_p2024_12"
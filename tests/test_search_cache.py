@@ -0,0 +1,120 @@
+import asyncio
+
+from app.config import settings
+from app.services.search_cache import MemorySearchCache, SearchCache
+
+
+class TestMemorySearchCache:
+    def test_get_set(self):
+        async def run():
+            cache = MemorySearchCache(max_entries=10, ttl=60)
+            assert await cache.get("k") is None
+            await cache.set("k", {"total": 1})
+            assert await cache.get("k") == {"total": 1}
+
+        asyncio.run(run())
+
+    def test_invalidate_bumps_generation_and_clears(self):
+        async def run():
+            cache = MemorySearchCache(max_entries=10, ttl=60)
+            await cache.set("k", {"total": 1})
+            before = await cache.generation()
+            cache.invalidate()
+            assert await cache.generation() == before + 1
+            assert await cache.get("k") is None
+
+        asyncio.run(run())
+
+    def test_lru_eviction(self):
+        async def run():
+            cache = MemorySearchCache(max_entries=2, ttl=60)
+            await cache.set("a", {"v": "a"})
+            await cache.set("b", {"v": "b"})
+            # 访问 a 后 b 成为最久未使用
+            assert await cache.get("a") == {"v": "a"}
+            await cache.set("c", {"v": "c"})
+            assert await cache.get("b") is None
+            assert await cache.get("a") == {"v": "a"}
+            assert await cache.get("c") == {"v": "c"}
+
+        asyncio.run(run())
+
+    def test_expired_entries_are_not_returned(self):
+        async def run():
+            cache = MemorySearchCache(max_entries=10, ttl=-1)
+            await cache.set("k", {"total": 1})
+            assert await cache.get("k") is None
+
+        asyncio.run(run())
+
+
+class TestSearchCache:
+    def test_key_ignores_keyword_order_case_and_duplicates(self):
+        async def run():
+            cache = SearchCache(MemorySearchCache(max_entries=10, ttl=60))
+            calls = []
+
+            async def loader(primary):
+                calls.append(primary)
+                return {"total": len(calls)}
+
+            first = await cache.get_or_load(["芯片", "AI"], {"limit": 20}, loader)
+            second = await cache.get_or_load(["ａｉ", "芯片", "芯片"], {"limit": 20}, loader)
+            assert first == second == {"total": 1}
+            assert len(calls) == 1
+
+            await cache.get_or_load(["芯片", "AI"], {"limit": 50}, loader)
+            assert len(calls) == 2
+
+        asyncio.run(run())
+
+    def test_concurrent_misses_load_once(self):
+        async def run():
+            cache = SearchCache(MemorySearchCache(max_entries=10, ttl=60))
+            calls = 0
+
+            async def loader(primary):
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0.01)
+                return {"total": 1}
+
+            results = await asyncio.gather(*[cache.get_or_load(["芯片"], {}, loader) for _ in range(5)])
+            assert results == [{"total": 1}] * 5
+            assert calls == 1
+
+        asyncio.run(run())
+
+    def test_invalidate_misses_and_reads_primary(self, monkeypatch):
+        monkeypatch.setattr(settings, "SEARCH_CACHE_PRIMARY_READ_SECONDS", 60)
+
+        async def run():
+            cache = SearchCache(MemorySearchCache(max_entries=10, ttl=60))
+            calls = []
+
+            async def loader(primary):
+                calls.append(primary)
+                return {"total": len(calls)}
+
+            assert await cache.get_or_load(["芯片"], {}, loader) == {"total": 1}
+            cache.invalidate()
+            assert await cache.get_or_load(["芯片"], {}, loader) == {"total": 2}
+            assert calls == [False, True]
+
+        asyncio.run(run())
+
+    def test_without_backend_always_loads(self):
+        async def run():
+            cache = SearchCache(None)
+            calls = []
+
+            async def loader(primary):
+                calls.append(primary)
+                return {"total": 0}
+
+            await cache.get_or_load(["芯片"], {}, loader)
+            await cache.get_or_load(["芯片"], {}, loader)
+            assert calls == [False, False]
+            cache.invalidate()
+
+        asyncio.run(run())
@@ -0,0 +1,27 @@
+import pytest
+
+from app.dao.news_item_dao import encode_search_cursor, decode_search_cursor
+
+
+class TestSearchCursor:
+    @pytest.mark.parametrize("score, news_id", [
+        (1.0, 100),
+        (0.0, 1),
+        (0.1 + 0.2, 42),
+        (-3.5, 7),
+        (1.2345678901234567e-12, 123456789012),
+        (9.87e20, 5),
+    ])
+    def test_round_trip(self, score, news_id):
+        assert decode_search_cursor(encode_search_cursor(score, news_id)) == (score, news_id)
+
+    def test_round_trip_is_exact(self):
+        # keyset 翻页要求分数无损还原，否则边界行会重复或丢失
+        score = 0.7071067811865476
+        decoded, _ = decode_search_cursor(encode_search_cursor(score, 1))
+        assert decoded == score
+
+    @pytest.mark.parametrize("cursor", ["", "abc", "1.0", "1.0_", "_5", "abc_5", "1.0_x", "1.0_5.5"])
+    def test_invalid(self, cursor):
+        with pytest.raises(ValueError):
+            decode_search_cursor(cursor)
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.services import trending_service
+from app.services.trending_service import TrendingCache
+
+KEY_A = (date(2025, 1, 1), 1, 7, 20, None)
+KEY_B = (date(2025, 1, 1), 1, 7, 20, "新华网")
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """记录每次查询的 key；key 在 gates 中时等到对应 Event 被 set 才返回"""
+    calls = []
+    gates: dict[tuple, asyncio.Event] = {}
+
+    async def fake_load(key):
+        calls.append(key)
+        if key in gates:
+            await gates[key].wait()
+        return [{"keyword": key[4] or "all", "calls": len(calls)}]
+
+    monkeypatch.setattr(trending_service, "_load", fake_load)
+    return calls, gates
+
+
+class TestTrendingCache:
+    def test_concurrent_misses_share_one_load(self, loads):
+        calls, _ = loads
+
+        async def run():
+            cache = TrendingCache(ttl=60)
+            results = await asyncio.gather(*(cache.get(KEY_A) for _ in range(5)))
+            assert len(calls) == 1
+            assert all(r == results[0] for r in results)
+            # 之后命中缓存
+            assert await cache.get(KEY_A) == results[0]
+            assert len(calls) == 1
+
+        asyncio.run(run())
+
+    def test_slow_key_does_not_block_other_keys(self, loads):
+        calls, gates = loads
+
+        async def run():
+            gates[KEY_A] = asyncio.Event()
+            cache = TrendingCache(ttl=60)
+            slow = asyncio.create_task(cache.get(KEY_A))
+            await asyncio.sleep(0)
+
+            assert (await asyncio.wait_for(cache.get(KEY_B), timeout=1))[0]["keyword"] == "新华网"
+            assert not slow.done()
+
+            gates[KEY_A].set()
+            assert (await slow)[0]["keyword"] == "all"
+
+        asyncio.run(run())
+
+    def test_failed_load_is_not_cached(self, monkeypatch):
+        attempts = []
+
+        async def failing_load(key):
+            attempts.append(key)
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(trending_service, "_load", failing_load)
+
+        async def run():
+            cache = TrendingCache(ttl=60)
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await cache.get(KEY_A)
+            assert len(attempts) == 2
+
+        asyncio.run(run())
+
+    def test_cancelled_loader_lets_waiters_retry(self, loads):
+        calls, gates = loads
+
+        async def run():
+            gates[KEY_A] = asyncio.Event()
+            cache = TrendingCache(ttl=60)
+            first = asyncio.create_task(cache.get(KEY_A))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(cache.get(KEY_A))
+            await asyncio.sleep(0)
+
+            first.cancel()
+            await asyncio.sleep(0)
+            gates[KEY_A].set()
+            assert (await waiter)[0]["keyword"] == "all"
+            assert len(calls) == 2
+
+        asyncio.run(run())
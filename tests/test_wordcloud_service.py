@@ -0,0 +1,95 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.config import settings
+from app.services.wordcloud_service import WordcloudManifest, cleanup_day_files, frequencies_etag
+
+
+def _touch(path, age_seconds: float = 0) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"png")
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+
+
+class TestCleanupDayFiles:
+    @pytest.fixture(autouse=True)
+    def wordcloud_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(settings, "WORDCLOUD_DIR", str(tmp_path))
+        monkeypatch.setattr(settings, "WORDCLOUD_RETAIN_SECONDS", 3600)
+        return tmp_path
+
+    def test_removes_only_expired_images(self, wordcloud_dir):
+        _touch(wordcloud_dir / "2025-01-01" / "old.png", age_seconds=7200)
+        _touch(wordcloud_dir / "2025-01-01" / "recent.png", age_seconds=60)
+
+        assert cleanup_day_files("2025-01-01") == ["2025-01-01/old.png"]
+        assert sorted(os.listdir(wordcloud_dir / "2025-01-01")) == ["recent.png"]
+
+    def test_keeps_current_file(self, wordcloud_dir):
+        _touch(wordcloud_dir / "2025-01-01" / "current.png", age_seconds=7200)
+        _touch(wordcloud_dir / "2025-01-01" / "replaced.png", age_seconds=7200)
+
+        assert cleanup_day_files("2025-01-01", keep="2025-01-01/current.png") == ["2025-01-01/replaced.png"]
+        assert os.listdir(wordcloud_dir / "2025-01-01") == ["current.png"]
+
+    def test_ignores_other_files(self, wordcloud_dir):
+        _touch(wordcloud_dir / "2025-01-01" / "notes.txt", age_seconds=7200)
+        assert cleanup_day_files("2025-01-01") == []
+
+    def test_missing_directory(self):
+        assert cleanup_day_files("1999-01-01") == []
+
+
+class TestWordcloudManifest:
+    def test_put_and_get(self, tmp_path):
+        manifest = WordcloudManifest(str(tmp_path / "manifest.json"))
+        assert manifest.get("2025-01-01") is None
+        assert manifest.latest() is None
+
+        entry = {"file": "2025-01-01/a.png", "etag": "a"}
+        assert manifest.put("2025-01-01", entry) is None
+        assert manifest.get("2025-01-01") == entry
+
+        replaced = manifest.put("2025-01-01", {"file": "2025-01-01/b.png", "etag": "b"})
+        assert replaced == entry
+
+    def test_latest(self, tmp_path):
+        manifest = WordcloudManifest(str(tmp_path / "manifest.json"))
+        manifest.put("2025-01-02", {"file": "2025-01-02/b.png", "etag": "b"})
+        manifest.put("2025-01-01", {"file": "2025-01-01/a.png", "etag": "a"})
+        assert manifest.latest()[0] == "2025-01-02"
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "manifest.json")
+        WordcloudManifest(path).put("2025-01-01", {"file": "2025-01-01/a.png", "etag": "a"})
+        assert WordcloudManifest(path).get("2025-01-01")["etag"] == "a"
+
+    def test_reloads_when_file_changes(self, tmp_path):
+        path = str(tmp_path / "manifest.json")
+        reader = WordcloudManifest(path)
+        writer = WordcloudManifest(path)
+        assert reader.get("2025-01-01") is None
+
+        writer.put("2025-01-01", {"file": "2025-01-01/a.png", "etag": "a"})
+        # 另一个 worker 写入后，mtime 变化，读取时重新加载
+        assert reader.get("2025-01-01")["etag"] == "a"
+
+    def test_put_merges_entries_written_elsewhere(self, tmp_path):
+        path = str(tmp_path / "manifest.json")
+        first = WordcloudManifest(path)
+        second = WordcloudManifest(path)
+        first.put("2025-01-01", {"file": "2025-01-01/a.png", "etag": "a"})
+        second.put("2025-01-02", {"file": "2025-01-02/b.png", "etag": "b"})
+
+        with open(path, encoding="utf-8") as f:
+            assert set(json.load(f)) == {"2025-01-01", "2025-01-02"}
+
+
+def test_frequencies_etag_is_order_independent():
+    assert frequencies_etag({"a": 1.0, "b": 2.0}) == frequencies_etag({"b": 2.0, "a": 1.0})
+    assert frequencies_etag({"a": 1.0}) != frequencies_etag({"a": 2.0})